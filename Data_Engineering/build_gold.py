@@ -0,0 +1,259 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# ----------------------------------------------------------------
+# Gold table layout
+# ----------------------------------------------------------------
+# The final_df table data_ingestion reads from the gold container, column for
+# column: orders, then the customer, product and return attributes joined on,
+# then the derived columns.
+GOLD_SCHEMA = pa.schema([
+    ("order_id", pa.string()),
+    ("product_id", pa.string()),
+    ("customer_id", pa.string()),
+    ("order_date", pa.date32()),
+    ("delivery_date", pa.date32()),
+    ("payment_type", pa.string()),
+    ("price", pa.float32()),
+    ("discount_percent", pa.float32()),
+    ("quantity", pa.int32()),
+    ("shipping_region", pa.string()),
+    ("expected_delivery_days", pa.int32()),
+    ("product_rating", pa.float32()),
+    ("product_category", pa.string()),
+    ("product_subcategory", pa.string()),
+    ("brand", pa.string()),
+    ("loyalty_points", pa.int32()),
+    ("is_first_order", pa.string()),
+    ("device_type", pa.string()),
+    ("referral", pa.string()),
+    ("join_date", pa.date32()),
+    ("age", pa.int32()),
+    ("gender", pa.string()),
+    ("location", pa.string()),
+    ("preferred_payment", pa.string()),
+    ("total_orders", pa.int32()),
+    ("total_returns", pa.int32()),
+    ("avg_order_value", pa.float32()),
+    ("product_name", pa.string()),
+    ("avg_rating", pa.float32()),
+    ("return_rate_category", pa.float32()),
+    ("return_id", pa.string()),
+    ("return_date", pa.string()),
+    ("return_reason", pa.string()),
+    ("pickup_delay_days", pa.int32()),
+    ("is_returned", pa.int32()),
+    ("order_month", pa.int32()),
+    ("order_year", pa.int32()),
+    ("order_dayofweek", pa.string()),
+    ("discount", pa.float64()),
+    ("revenue", pa.float64()),
+    pa.field("customer_age_group", pa.string(), nullable=False),
+    pa.field("is_expensive", pa.int32(), nullable=False),
+])
+
+CUSTOMER_COLUMNS = ["join_date", "age", "gender", "location", "preferred_payment",
+                    "total_orders", "total_returns", "avg_order_value"]
+PRODUCT_COLUMNS = ["product_name", "avg_rating", "return_rate_category"]
+RETURN_COLUMNS = ["return_id", "return_date", "return_reason", "pickup_delay_days"]
+
+# ids and dates stay text when read from CSV; they are parsed per column below
+STRING_COLUMNS = ["order_id", "customer_id", "product_id", "return_id",
+                  "order_date", "delivery_date", "join_date", "return_date"]
+
+EXPENSIVE_PRICE = 1000
+# upper bound (inclusive) of every age group but the last
+AGE_GROUP_UPPER = [24, 39, 59]
+AGE_GROUP_LABELS = pa.array(["18-24", "25-39", "40-59", "60+"])
+NOT_RETURNED = "Not Returned"
+DAY_NAMES = pa.array(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])
+
+
+# ----------------------------------------------------------------
+# Columnar sources: <source>/<name>/ Parquet parts or <source>/<name>.csv
+# ----------------------------------------------------------------
+def source_dataset(source, name):
+    parquet_dir = os.path.join(source, name)
+    if os.path.isdir(parquet_dir):
+        return ds.dataset(parquet_dir, format="parquet")
+
+    csv_path = os.path.join(source, f"{name}.csv")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Neither {parquet_dir}/ nor {csv_path} exists")
+    column_names = pv.open_csv(csv_path).schema.names
+    convert = pv.ConvertOptions(column_types={c: pa.string() for c in STRING_COLUMNS if c in column_names})
+    return ds.dataset(csv_path, format=ds.CsvFileFormat(convert_options=convert))
+
+
+class HashIndex:
+    """A dimension table held as Arrow columns, with a hash index on its key"""
+
+    def __init__(self, table, key):
+        self.key = key
+        self.table = table
+        self.index = pd.Index(table.column(key).to_numpy(zero_copy_only=False))
+        if not self.index.is_unique:
+            raise ValueError(f"Duplicate {key} values in the {key[:-3]} table")
+
+    @classmethod
+    def load(cls, source, name, key, columns):
+        return cls(source_dataset(source, name).to_table(columns=[key] + columns), key)
+
+    def join(self, keys: pa.ChunkedArray, columns) -> pa.Table:
+        """Columns of the row matching each key; nulls where there is none"""
+        positions = self.index.get_indexer(keys.to_numpy(zero_copy_only=False))
+        missing = positions < 0
+        indices = pa.array(np.where(missing, 0, positions), mask=missing)
+        return self.table.select(columns).take(indices)
+
+
+# ----------------------------------------------------------------
+# Derived columns
+# ----------------------------------------------------------------
+def round_half_up(values, decimals=2):
+    """Spark's round(): halves away from zero, on the decimal value rather than the binary one"""
+    scale = 10.0 ** decimals
+    scaled = np.round(np.abs(values) * scale, 6)
+    return np.sign(values) * np.floor(scaled + 0.5) / scale
+
+
+def to_timestamp(values):
+    """Timestamps from ISO text (CSV sources) or from native timestamps (Parquet sources)"""
+    if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+        return values.cast(pa.timestamp("s"))
+    return values
+
+
+def to_timestamp_text(values):
+    """'YYYY-MM-DD HH:MM:SS' text, as return_date is stored in gold"""
+    if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+        return values
+    return pc.strftime(values.cast(pa.timestamp("s")), format="%Y-%m-%d %H:%M:%S")
+
+
+def to_bool_text(values):
+    """'True'/'False', the way is_first_order is stored in gold"""
+    if pa.types.is_boolean(values.type):
+        return pc.if_else(values, "True", "False")
+    return values
+
+
+def build_chunk(orders: pa.Table, customers: HashIndex, products: HashIndex, returns: HashIndex) -> pa.Table:
+    """Join one chunk of orders to the dimension tables and derive the gold columns"""
+    columns = {name: orders.column(name) for name in orders.column_names}
+    for joined in (
+        customers.join(orders.column("customer_id"), CUSTOMER_COLUMNS),
+        products.join(orders.column("product_id"), PRODUCT_COLUMNS),
+        returns.join(orders.column("order_id"), RETURN_COLUMNS),
+    ):
+        columns.update({name: joined.column(name) for name in joined.column_names})
+
+    order_ts = to_timestamp(columns["order_date"])
+    is_returned = columns["return_id"].is_valid()
+
+    # price and discount_percent are single precision in gold and multiplied as such
+    price = columns["price"].cast(pa.float32()).to_numpy()
+    discount_percent = columns["discount_percent"].cast(pa.float32()).to_numpy()
+    discount = round_half_up((price * discount_percent).astype(np.float64) / 100)
+    revenue = round_half_up((price.astype(np.float64) - discount) * columns["quantity"].to_numpy())
+
+    age_group = np.digitize(columns["age"].to_numpy(), AGE_GROUP_UPPER, right=True)
+
+    columns.update({
+        "order_date": order_ts,
+        "delivery_date": to_timestamp(columns["delivery_date"]),
+        "join_date": to_timestamp(columns["join_date"]),
+        "is_first_order": to_bool_text(columns["is_first_order"]),
+        "return_date": to_timestamp_text(columns["return_date"]),
+        "return_reason": pc.coalesce(columns["return_reason"], NOT_RETURNED),
+        "is_returned": pc.cast(is_returned, pa.int32()),
+        "order_month": pc.month(order_ts),
+        "order_year": pc.year(order_ts),
+        "order_dayofweek": DAY_NAMES.take(pc.day_of_week(order_ts)),
+        "discount": pa.array(discount),
+        "revenue": pa.array(revenue),
+        "customer_age_group": AGE_GROUP_LABELS.take(pa.array(age_group)),
+        "is_expensive": pa.array((price > EXPENSIVE_PRICE).astype(np.int32)),
+    })
+
+    return pa.Table.from_arrays([columns[field.name].cast(field.type) for field in GOLD_SCHEMA], schema=GOLD_SCHEMA)
+
+
+# ----------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------
+def build_gold(source="./Data_Engineering/data", output="./Data_Engineering/gold/final_df", chunk_size=1_000_000):
+    """
+    Stream orders in chunks of chunk_size rows, hash-join each chunk to the
+    customer, product and return tables and write it as one
+    <output>/part-NNNNN.snappy.parquet. Only one chunk of orders is in memory
+    at a time; the three joined tables are held as Arrow columns.
+    """
+    started = time.perf_counter()
+    customers = HashIndex.load(source, "customers", "customer_id", CUSTOMER_COLUMNS)
+    products = HashIndex.load(source, "products", "product_id", PRODUCT_COLUMNS)
+    returns = HashIndex.load(source, "returns", "order_id", RETURN_COLUMNS)
+    print(f"Indexed {customers.table.num_rows} customers, {products.table.num_rows} products, "
+          f"{returns.table.num_rows} returns")
+
+    os.makedirs(output, exist_ok=True)
+    # parts left by an earlier, differently chunked run would be read back too
+    for file_name in os.listdir(output):
+        if file_name.startswith("part-") and file_name.endswith(".parquet"):
+            os.remove(os.path.join(output, file_name))
+
+    n_rows = n_parts = 0
+    scanner = source_dataset(source, "orders").scanner(batch_size=chunk_size)
+    pending = []
+    pending_rows = 0
+
+    def flush():
+        nonlocal n_rows, n_parts, pending, pending_rows
+        table = build_chunk(pa.Table.from_batches(pending), customers, products, returns)
+        pq.write_table(table, os.path.join(output, f"part-{n_parts:05d}.snappy.parquet"), compression="snappy")
+        n_rows += table.num_rows
+        n_parts += 1
+        pending, pending_rows = [], 0
+        print(f"gold {n_rows} rows")
+
+    # CSV blocks and Parquet row groups come in their own sizes; regroup them
+    for batch in scanner.to_batches():
+        while batch.num_rows:
+            take = min(batch.num_rows, chunk_size - pending_rows)
+            pending.append(batch.slice(0, take))
+            pending_rows += take
+            batch = batch.slice(take)
+            if pending_rows == chunk_size:
+                flush()
+    if pending_rows:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Built {n_rows} gold rows in {n_parts} part(s) at {output} "
+          f"in {elapsed:.1f}s ({n_rows / elapsed:,.0f} rows/s)")
+    return n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the gold final_df table from the generated source tables")
+    parser.add_argument("--source", default="./Data_Engineering/data",
+                        help="directory with orders, returns, customers and products as CSV files or Parquet dirs")
+    parser.add_argument("--output", default="./Data_Engineering/gold/final_df",
+                        help="output directory; point data_ingestion.local_root at its grandparent")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="orders joined and written per part")
+    args = parser.parse_args()
+
+    build_gold(args.source, args.output, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
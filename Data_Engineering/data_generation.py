@@ -1,31 +1,27 @@
-import pandas as pd
+import argparse
+import os
+
 import numpy as np
-import random
-from datetime import datetime, timedelta
-
-# Set seed for reproducibility
-np.random.seed(42)
-random.seed(42)
-
-# Number of rows
-n_orders = 20000
-n_customers = 3000
-n_products = 1000
-
-# Generate customers
-customers = pd.DataFrame({
-    "customer_id": [f"C{str(i).zfill(5)}" for i in range(1, n_customers + 1)],
-    "join_date": pd.to_datetime(np.random.choice(pd.date_range("2020-01-01", "2024-12-31"), n_customers)),
-    "age": np.random.randint(18, 65, n_customers),
-    "gender": np.random.choice(["Male", "Female", "Other"], n_customers, p=[0.48, 0.48, 0.04]),
-    "location": np.random.choice(["Delhi", "Mumbai", "Bangalore", "Chennai", "Hyderabad", "Kolkata"], n_customers),
-    "preferred_payment": np.random.choice(["UPI", "CreditCard", "DebitCard", "COD", "Wallet"], n_customers),
-    "total_orders": np.random.randint(1, 100, n_customers),
-    "total_returns": np.random.randint(0, 20, n_customers),
-    "avg_order_value": np.round(np.random.uniform(300, 3000, n_customers), 2)
-})
-
-# Generate products
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows at scale 1.0
+N_ORDERS = 20000
+N_CUSTOMERS = 3000
+N_PRODUCTS = 1000
+
+RETURN_RATE = 0.2  # ~20% of orders are returned
+
+GENDERS = ["Male", "Female", "Other"]
+LOCATIONS = ["Delhi", "Mumbai", "Bangalore", "Chennai", "Hyderabad", "Kolkata"]
+PAYMENTS = ["UPI", "CreditCard", "DebitCard", "COD", "Wallet"]
+ORDER_PAYMENTS = ["CreditCard", "COD", "UPI", "DebitCard", "Wallet"]
+REGIONS = ["North", "South", "East", "West"]
+DEVICES = ["Mobile", "Desktop", "Tablet"]
+REFERRALS = ["CampaignA", "CampaignB", "Organic", "SocialMedia"]
+RETURN_REASONS = ["Size Issue", "Defective", "Changed Mind", "Wrong Item", "Other"]
+
 categories = ["Apparel", "Electronics", "Home", "Beauty", "Sports"]
 subcategories = {
     "Apparel": ["Shirts", "Shoes", "Jeans", "Dresses"],
@@ -36,84 +32,165 @@ subcategories = {
 }
 brands = ["Nike", "Adidas", "Samsung", "Apple", "Sony", "LG", "Levis", "Puma", "L'Oreal", "Philips"]
 
-products = []
-for i in range(1, n_products + 1):
-    cat = random.choice(categories)
-    subcat = random.choice(subcategories[cat])
-    brand = random.choice(brands)
-    products.append([
-        f"P{str(i).zfill(5)}",
-        f"{brand} {subcat}",
-        cat,
-        subcat,
-        brand,
-        round(np.random.uniform(3.0, 5.0), 1),
-        round(np.random.uniform(0.05, 0.3), 2)
-    ])
-
-products = pd.DataFrame(products, columns=["product_id", "product_name", "product_category",
-                                           "product_subcategory", "brand", "avg_rating", "return_rate_category"])
-
-# Generate orders
-order_dates = pd.date_range("2023-01-01", "2025-09-01", freq="h")
-orders = []
-for i in range(1, n_orders + 1):
-    cust = customers.sample(1).iloc[0]
-    prod = products.sample(1).iloc[0]
-    order_date = random.choice(order_dates)
-    delivery_days = random.randint(2, 10)
-    delivery_date = order_date + timedelta(days=delivery_days)
-    price = round(np.random.uniform(300, 5000), 2)
-    discount = round(np.random.uniform(0, 50), 2)
-    quantity = np.random.randint(1, 5)
-    orders.append([
-        f"O{str(i).zfill(6)}",
-        cust.customer_id,
-        prod.product_id,
-        order_date,
-        delivery_date,
-        random.choice(["CreditCard", "COD", "UPI", "DebitCard", "Wallet"]),
-        price,
-        discount,
-        quantity,
-        random.choice(["North", "South", "East", "West"]),
-        delivery_days,
-        round(np.random.uniform(1.0, 5.0), 1),
-        prod.product_category,
-        prod.product_subcategory,
-        prod.brand,
-        np.random.randint(0, 500),
-        np.random.choice([True, False], p=[0.1, 0.9]),
-        random.choice(["Mobile", "Desktop", "Tablet"]),
-        random.choice(["CampaignA", "CampaignB", "Organic", "SocialMedia"])
-    ])
-
-orders = pd.DataFrame(orders, columns=[
-    "order_id", "customer_id", "product_id", "order_date", "delivery_date", "payment_type",
-    "price", "discount_percent", "quantity", "shipping_region", "expected_delivery_days",
-    "product_rating", "product_category", "product_subcategory", "brand", "loyalty_points",
-    "is_first_order", "device_type", "referral"
-])
-
-# Generate returns (~20% return rate)
-returns = []
-for i, row in orders.sample(frac=0.2, random_state=42).iterrows():
-    return_date = row.delivery_date + timedelta(days=np.random.randint(1, 15))
-    returns.append([
-        f"R{str(i).zfill(6)}",
-        row.order_id,
-        return_date,
-        random.choice(["Size Issue", "Defective", "Changed Mind", "Wrong Item", "Other"]),
-        row.price * row.quantity,
-        np.random.randint(1, 7)
-    ])
-
-returns = pd.DataFrame(returns, columns=["return_id", "order_id", "return_date",
-                                         "return_reason", "refund_amount", "pickup_delay_days"])
-
-# Save datasets
-orders.to_csv("./data/orders.csv", index=False)
-returns.to_csv("./data/returns.csv", index=False)
-customers.to_csv("./data/customers.csv", index=False)
-products.to_csv("./data/products.csv", index=False)
+JOIN_START, JOIN_END = np.datetime64("2020-01-01"), np.datetime64("2024-12-31")
+ORDER_START, ORDER_END = np.datetime64("2023-01-01T00", "h"), np.datetime64("2025-09-01T00", "h")
+
+
+def chunk_rng(seed, table, chunk_index):
+    """Independent, reproducible stream per (table, chunk)"""
+    return np.random.default_rng(np.random.SeedSequence([seed, table, chunk_index]))
+
+
+def make_ids(prefix, start, stop, width):
+    return prefix + pd.Series(np.arange(start, stop)).astype(str).str.zfill(width)
+
+
+def generate_customers(start, stop, rng) -> pd.DataFrame:
+    n = stop - start
+    n_days = int((JOIN_END - JOIN_START).astype(int)) + 1
+    return pd.DataFrame({
+        "customer_id": make_ids("C", start + 1, stop + 1, 5),
+        "join_date": JOIN_START + rng.integers(0, n_days, n).astype("timedelta64[D]"),
+        "age": rng.integers(18, 65, n),
+        "gender": rng.choice(GENDERS, n, p=[0.48, 0.48, 0.04]),
+        "location": rng.choice(LOCATIONS, n),
+        "preferred_payment": rng.choice(PAYMENTS, n),
+        "total_orders": rng.integers(1, 100, n),
+        "total_returns": rng.integers(0, 20, n),
+        "avg_order_value": np.round(rng.uniform(300, 3000, n), 2),
+    })
+
+
+def generate_products(n_products, rng) -> pd.DataFrame:
+    sub_table = np.array([subcategories[c] for c in categories])
+    cat_idx = rng.integers(0, len(categories), n_products)
+    sub_idx = rng.integers(0, sub_table.shape[1], n_products)
+    brand = np.asarray(brands)[rng.integers(0, len(brands), n_products)]
+    subcat = sub_table[cat_idx, sub_idx]
+
+    return pd.DataFrame({
+        "product_id": make_ids("P", 1, n_products + 1, 5),
+        "product_name": pd.Series(brand) + " " + pd.Series(subcat),
+        "product_category": np.asarray(categories)[cat_idx],
+        "product_subcategory": subcat,
+        "brand": brand,
+        "avg_rating": np.round(rng.uniform(3.0, 5.0, n_products), 1),
+        "return_rate_category": np.round(rng.uniform(0.05, 0.3, n_products), 2),
+    })
+
+
+def generate_orders(start, stop, n_customers, products, rng) -> pd.DataFrame:
+    """Orders start..stop (0-based), with every foreign key, date and price drawn as an array"""
+    n = stop - start
+    n_hours = int((ORDER_END - ORDER_START).astype(int)) + 1
+
+    prod_idx = rng.integers(0, len(products), n)
+    order_date = ORDER_START + rng.integers(0, n_hours, n).astype("timedelta64[h]")
+    delivery_days = rng.integers(2, 11, n)
+
+    return pd.DataFrame({
+        "order_id": make_ids("O", start + 1, stop + 1, 6),
+        "customer_id": "C" + pd.Series(rng.integers(1, n_customers + 1, n)).astype(str).str.zfill(5),
+        "product_id": products["product_id"].to_numpy()[prod_idx],
+        "order_date": order_date,
+        "delivery_date": order_date + delivery_days.astype("timedelta64[D]"),
+        "payment_type": rng.choice(ORDER_PAYMENTS, n),
+        "price": np.round(rng.uniform(300, 5000, n), 2),
+        "discount_percent": np.round(rng.uniform(0, 50, n), 2),
+        "quantity": rng.integers(1, 5, n),
+        "shipping_region": rng.choice(REGIONS, n),
+        "expected_delivery_days": delivery_days,
+        "product_rating": np.round(rng.uniform(1.0, 5.0, n), 1),
+        "product_category": products["product_category"].to_numpy()[prod_idx],
+        "product_subcategory": products["product_subcategory"].to_numpy()[prod_idx],
+        "brand": products["brand"].to_numpy()[prod_idx],
+        "loyalty_points": rng.integers(0, 500, n),
+        "is_first_order": rng.random(n) < 0.1,
+        "device_type": rng.choice(DEVICES, n),
+        "referral": rng.choice(REFERRALS, n),
+    })
+
+
+def generate_returns(orders, start, rng) -> pd.DataFrame:
+    """Returns for a chunk of orders; return ids follow the 0-based order row like the original script"""
+    mask = rng.random(len(orders)) < RETURN_RATE
+    returned = orders.loc[mask]
+    n = len(returned)
+    row_idx = start + np.flatnonzero(mask)
+
+    return pd.DataFrame({
+        "return_id": "R" + pd.Series(row_idx).astype(str).str.zfill(6),
+        "order_id": returned["order_id"].to_numpy(),
+        "return_date": returned["delivery_date"].to_numpy() + rng.integers(1, 15, n).astype("timedelta64[D]"),
+        "return_reason": rng.choice(RETURN_REASONS, n),
+        "refund_amount": returned["price"].to_numpy() * returned["quantity"].to_numpy(),
+        "pickup_delay_days": rng.integers(1, 7, n),
+    })
+
+
+class TableWriter:
+    """Appends chunks to <output>/<name>.csv or to <output>/<name>/part-NNNNN.parquet"""
+
+    def __init__(self, output, name, fmt):
+        self.output, self.name, self.fmt = output, name, fmt
+        self.n_parts = 0
+        if fmt == "parquet":
+            os.makedirs(os.path.join(output, name), exist_ok=True)
+            # parts left by an earlier, differently chunked run would be read back too
+            for file_name in os.listdir(os.path.join(output, name)):
+                if file_name.startswith("part-") and file_name.endswith(".parquet"):
+                    os.remove(os.path.join(output, name, file_name))
+        else:
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, df):
+        if self.fmt == "parquet":
+            path = os.path.join(self.output, self.name, f"part-{self.n_parts:05d}.parquet")
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, compression="snappy")
+        else:
+            path = os.path.join(self.output, f"{self.name}.csv")
+            df.to_csv(path, index=False, mode="w" if self.n_parts == 0 else "a", header=self.n_parts == 0)
+        self.n_parts += 1
+
+
+def generate(output="./data", scale=1.0, seed=42, chunk_size=1_000_000, fmt="parquet"):
+    n_orders = max(1, int(N_ORDERS * scale))
+    n_customers = max(1, int(N_CUSTOMERS * scale))
+    n_products = max(1, int(N_PRODUCTS * scale))
+
+    customer_writer = TableWriter(output, "customers", fmt)
+    for i, start in enumerate(range(0, n_customers, chunk_size)):
+        stop = min(start + chunk_size, n_customers)
+        customer_writer.write(generate_customers(start, stop, chunk_rng(seed, 0, i)))
+
+    # products are looked up by every order chunk, so they stay in memory
+    products = generate_products(n_products, chunk_rng(seed, 1, 0))
+    TableWriter(output, "products", fmt).write(products)
+
+    order_writer = TableWriter(output, "orders", fmt)
+    return_writer = TableWriter(output, "returns", fmt)
+    for i, start in enumerate(range(0, n_orders, chunk_size)):
+        stop = min(start + chunk_size, n_orders)
+        orders = generate_orders(start, stop, n_customers, products, chunk_rng(seed, 2, i))
+        order_writer.write(orders)
+        return_writer.write(generate_returns(orders, start, chunk_rng(seed, 3, i)))
+        print(f"orders {stop}/{n_orders}")
+
+    print(f"✅ Generated {n_orders} orders, {n_customers} customers, {n_products} products in {output} ({fmt})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic e-commerce source tables")
+    parser.add_argument("--output", default="./data", help="output directory")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"size multiplier; 1.0 = {N_ORDERS} orders, {N_CUSTOMERS} customers, {N_PRODUCTS} products")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="rows generated and written per chunk")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    args = parser.parse_args()
+
+    generate(args.output, args.scale, args.seed, args.chunk_size, args.format)
+
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+/predict latency and throughput through the Flask test client.
+
+Each concurrency level runs `n_requests` JSON requests spread over that many
+client threads, each with its own test client; latencies are per request.
+Every request sends a different order and the prediction cache is off unless
+asked for, so the numbers are scoring, not cache hits.
+"""
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLASK_APP_DIR = os.path.join(ROOT, "flask_app")
+
+
+def load_app(model_dir, prediction_cache="off"):
+    """Import flask_app/app.py against model_dir; the app loads its pipeline at import time"""
+    os.environ["MODEL_DIR"] = os.path.abspath(model_dir)
+    os.environ["PREDICTION_CACHE"] = prediction_cache
+    if FLASK_APP_DIR not in sys.path:
+        sys.path.insert(0, FLASK_APP_DIR)
+    return importlib.import_module("app")
+
+
+def load_payload(path=None):
+    path = path or os.path.join(FLASK_APP_DIR, "fixtures", "sample_order.json")
+    with open(path) as f:
+        return json.load(f)
+
+
+def make_payloads(payload, n, seed=42):
+    """n distinct orders around the fixture: price, discount and quantity vary per request"""
+    rng = np.random.default_rng(seed)
+    price = float(payload.get("price", 100.0))
+    return [
+        {**payload,
+         "price": round(price * float(rng.uniform(0.5, 1.5)), 2),
+         "discount_percent": int(rng.integers(0, 50)),
+         "quantity": int(rng.integers(1, 6))}
+        for _ in range(n)
+    ]
+
+
+def run_level(app, payloads, concurrency, n_requests):
+    per_thread = max(1, n_requests // concurrency)
+
+    def worker(thread):
+        client = app.test_client()
+        latencies, errors = [], 0
+        for i in range(per_thread):
+            payload = payloads[(thread * per_thread + i) % len(payloads)]
+            start = time.perf_counter()
+            response = client.post("/predict", json=payload)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        outcomes = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.concatenate([np.asarray(l) for l, _ in outcomes]) * 1000
+    return {
+        "name": "predict",
+        "concurrency": concurrency,
+        "requests": int(latencies.size),
+        "errors": int(sum(e for _, e in outcomes)),
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "requests_per_s": latencies.size / elapsed,
+    }
+
+
+def run(concurrency=(1, 4, 16, 64), n_requests=1000, model_dir="models", warmup=50,
+        prediction_cache="off") -> list:
+    module = load_app(model_dir, prediction_cache)
+    payload = load_payload()
+
+    client = module.app.test_client()
+    for warm_payload in make_payloads(payload, warmup, seed=0):
+        client.post("/predict", json=warm_payload)
+
+    results = []
+    for level in concurrency:
+        # fresh orders per level, so a cache never serves one level from another
+        payloads = make_payloads(payload, n_requests, seed=level)
+        results.append(run_level(module.app, payloads, level, n_requests))
+    for result in results:
+        # the path /predict actually took: the app drops the batcher for the kernel
+        result["scoring_path"] = module.pipeline.scoring_path
+        result["micro_batching"] = module.batcher is not None
+        result["prediction_cache"] = prediction_cache
+    return results
@@ -0,0 +1,87 @@
+"""
+Throughput and memory of the pipeline functions on synthetic data.
+
+Frames of any size are drawn, with replacement, from the gold sample tracked
+in data/, so every scale has exactly the schema the stages see in production.
+"""
+import glob
+import os
+
+import numpy as np
+
+from benchmarks.common import measure
+from source.utiles import load_parquet_data
+from source.utiles.dtypes import apply_dtype_plan, frame_bytes
+from source.data.data_preprocessing import preprocess_data
+from source.data.data_transformation import transform_data_obj
+from source.model.model_training import train_model
+from source.model.model_evaluation import evaluate_model, evaluate_model_chunked
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_GLOB = os.path.join(ROOT, "data", "part-*.parquet")
+
+
+def load_sample():
+    paths = sorted(glob.glob(SAMPLE_GLOB))
+    if not paths:
+        raise FileNotFoundError(f"No gold sample found at {SAMPLE_GLOB}")
+    return load_parquet_data(paths[0])
+
+
+def make_frame(sample, n_rows, seed=42):
+    """n_rows drawn from the sample, with fresh order ids"""
+    rng = np.random.default_rng(seed)
+    df = sample.iloc[rng.integers(0, len(sample), n_rows)].reset_index(drop=True)
+    df["order_id"] = "O" + np.arange(1, n_rows + 1).astype(str).astype(object)
+    return df
+
+
+def _result(name, scale, seconds, peak_mb, **extra):
+    return {
+        "name": name,
+        "scale": scale,
+        "seconds": seconds,
+        "rows_per_s": scale / seconds if seconds else None,
+        "peak_mb": peak_mb,
+        **extra,
+    }
+
+
+def run(scales=(1_000, 10_000, 100_000), repeat=3, seed=42) -> list:
+    sample = load_sample()
+    results = []
+
+    for scale in scales:
+        raw = make_frame(sample, scale, seed)
+
+        # as the stages load it: dtype plan first, then preprocessing
+        seconds, peak, planned = measure(lambda: apply_dtype_plan(raw.copy(), record=False), repeat)
+        results.append(_result("apply_dtype_plan", scale, seconds, peak,
+                               frame_mb_before=frame_bytes(raw) / 2**20, frame_mb_after=frame_bytes(planned) / 2**20))
+
+        seconds, peak, processed = measure(lambda: preprocess_data(planned.copy()), repeat)
+        results.append(_result("preprocess_data", scale, seconds, peak))
+
+        X = processed.drop("is_returned", axis=1)
+        y = np.asarray(processed["is_returned"])
+
+        def fit_transform():
+            preprocessor = transform_data_obj(X.copy(), sparse_output=True)
+            return preprocessor, preprocessor.fit_transform(X)
+
+        seconds, peak, (preprocessor, X_t) = measure(fit_transform, repeat)
+        results.append(_result("transform_data_obj+fit_transform", scale, seconds, peak))
+
+        seconds, peak, _ = measure(lambda: preprocessor.transform(X), repeat)
+        results.append(_result("transform", scale, seconds, peak))
+
+        seconds, peak, model = measure(lambda: train_model(X_t, y), repeat)
+        results.append(_result("train_model", scale, seconds, peak))
+
+        seconds, peak, _ = measure(lambda: evaluate_model(X_t, y, model), repeat)
+        results.append(_result("evaluate_model", scale, seconds, peak))
+
+        seconds, peak, _ = measure(lambda: evaluate_model_chunked(X_t, y, model), repeat)
+        results.append(_result("evaluate_model_chunked", scale, seconds, peak))
+
+    return results
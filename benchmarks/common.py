@@ -0,0 +1,128 @@
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# metric name -> True when higher is better; anything else is not compared
+COMPARED_METRICS = {
+    "seconds": False,
+    "rows_per_s": True,
+    "peak_mb": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "requests_per_s": True,
+}
+
+
+def measure(fn, repeat=3):
+    """
+    Best-of-`repeat` wall time of fn(), plus the peak Python/NumPy allocation
+    of one extra traced call (tracemalloc slows the call, so it is not timed).
+    Returns (seconds, peak_mb, result of the last call).
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak / (1024 * 1024), result
+
+
+def system_info() -> dict:
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def save_results(suite: str, results: list, path=None) -> str:
+    path = path or os.path.join(RESULTS_DIR, f"{suite}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"suite": suite, "system": system_info(), "results": results}, f, indent=4)
+    return path
+
+
+def load_results(path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _key(result):
+    return (result["name"], result.get("scale"), result.get("concurrency"))
+
+
+def compare(current: dict, baseline: dict, tolerance=0.10) -> list:
+    """
+    Compare every shared (name, scale/concurrency) result against the baseline.
+
+    A metric regresses when it is worse than the baseline by more than
+    `tolerance` (relative). Returns one row per compared metric.
+    """
+    baseline_results = {_key(r): r for r in baseline.get("results", [])}
+    rows = []
+    for result in current.get("results", []):
+        reference = baseline_results.get(_key(result))
+        if reference is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in result or not reference.get(metric):
+                continue
+            change = (result[metric] - reference[metric]) / reference[metric]
+            regressed = -change > tolerance if higher_is_better else change > tolerance
+            rows.append({
+                "name": result["name"],
+                "scale": result.get("scale"),
+                "concurrency": result.get("concurrency"),
+                "metric": metric,
+                "baseline": reference[metric],
+                "current": result[metric],
+                "change": change,
+                "regressed": regressed,
+            })
+    return rows
+
+
+def print_results(results: list) -> None:
+    for r in results:
+        where = f"scale={r['scale']}" if "scale" in r else f"concurrency={r['concurrency']}"
+        metrics = ", ".join(f"{k}={r[k]:.4g}" for k in COMPARED_METRICS if k in r)
+        print(f"{r['name']:<28} {where:<18} {metrics}")
+
+
+def print_comparison(rows: list) -> None:
+    for row in rows:
+        where = f"scale={row['scale']}" if row["scale"] is not None else f"concurrency={row['concurrency']}"
+        flag = "❌ REGRESSION" if row["regressed"] else "✅"
+        print(f"{row['name']:<28} {where:<18} {row['metric']:<16} "
+              f"{row['baseline']:>12.4g} -> {row['current']:<12.4g} {row['change']:+8.1%}  {flag}")
@@ -0,0 +1,78 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks.run pipeline --scales 1000 10000 100000
+    python -m benchmarks.run flask --concurrency 1 4 16 64
+    python -m benchmarks.run compare benchmarks/results/pipeline.json --baseline benchmarks/baseline/pipeline.json
+
+`pipeline` and `flask` write benchmarks/results/<suite>.json (or --output);
+given --baseline they also compare against it. `compare` exits with status 1
+when any metric regressed by more than --tolerance.
+"""
+import argparse
+import sys
+
+from benchmarks import common
+
+
+def _compare(current, baseline_path, tolerance) -> bool:
+    rows = common.compare(current, common.load_results(baseline_path), tolerance)
+    common.print_comparison(rows)
+    regressed = [row for row in rows if row["regressed"]]
+    if regressed:
+        print(f"❌ {len(regressed)} of {len(rows)} metric(s) regressed by more than {tolerance:.0%}")
+    else:
+        print(f"✅ No regressions beyond {tolerance:.0%} in {len(rows)} metric(s)")
+    return not regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline and scoring benchmarks")
+    subparsers = parser.add_subparsers(dest="suite", required=True)
+
+    pipeline = subparsers.add_parser("pipeline", help="pipeline function throughput and memory")
+    pipeline.add_argument("--scales", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    pipeline.add_argument("--repeat", type=int, default=3)
+    pipeline.add_argument("--seed", type=int, default=42)
+
+    flask = subparsers.add_parser("flask", help="/predict latency and throughput")
+    flask.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    flask.add_argument("--requests", type=int, default=1000, help="requests per concurrency level")
+    flask.add_argument("--model-dir", default="models")
+    flask.add_argument("--prediction-cache", choices=["off", "local"], default="off",
+                       help="/predict result cache; payloads never repeat, so it only adds its overhead")
+
+    for sub in (pipeline, flask):
+        sub.add_argument("--output", help="results file (default benchmarks/results/<suite>.json)")
+        sub.add_argument("--baseline", help="baseline results file to compare against")
+        sub.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+
+    compare = subparsers.add_parser("compare", help="compare a results file against a baseline")
+    compare.add_argument("current")
+    compare.add_argument("--baseline", required=True)
+    compare.add_argument("--tolerance", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.suite == "compare":
+        return 0 if _compare(common.load_results(args.current), args.baseline, args.tolerance) else 1
+
+    if args.suite == "pipeline":
+        from benchmarks import bench_pipeline
+        results = bench_pipeline.run(args.scales, args.repeat, args.seed)
+    else:
+        from benchmarks import bench_flask
+        results = bench_flask.run(args.concurrency, args.requests, args.model_dir,
+                                  prediction_cache=args.prediction_cache)
+
+    common.print_results(results)
+    path = common.save_results(args.suite, results, args.output)
+    print(f"✅ Results written to {path}")
+
+    if args.baseline:
+        return 0 if _compare(common.load_results(path), args.baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
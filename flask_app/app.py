@@ -1,9 +1,22 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify, Response
 import pandas as pd
-import joblib
+import numpy as np
 import time
 import os
-from prometheus_client import Counter, Histogram, generate_latest, CollectorRegistry, CONTENT_TYPE_LATEST
+import json
+import threading
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CollectorRegistry, CONTENT_TYPE_LATEST
+
+from batching import MicroBatcher
+from cache import LRUCache, PredictionCache, SharedCache
+from feature_index import FeatureIndex
+from pipeline import ScoringPipeline
+from registry import ModelRegistry, ServingModel
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow IPC bodies are optional for /predict/batch
+    pa = None
 
 import warnings
 warnings.filterwarnings("ignore")
@@ -14,16 +27,61 @@ warnings.filterwarnings("ignore")
 app = Flask(__name__)
 
 # ----------------------------------------------------------------
-# Load Model and Frequency Maps
+# Load Scoring Pipeline (preprocessor + model)
 # ----------------------------------------------------------------
-MODEL_PATH = "models/lr_model.pkl"
-FREQ_MAP_PATH = "models/freq_maps.joblib"
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+SELF_CHECK_FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "sample_order.json")
+
+# "auto" scores with the exported kernel when it exists, "kernel" requires it
+# and "sklearn" always uses the pickled preprocessor and model.
+SCORING_BACKEND = os.getenv("SCORING_BACKEND", "auto").lower()
+
+pipeline = ScoringPipeline.load(MODEL_DIR, backend=SCORING_BACKEND)
+freq_maps = pipeline.freq_maps
+
+# Fail fast on a bad preprocessor/model pairing instead of on the first request
+with open(SELF_CHECK_FIXTURE_PATH) as f:
+    SELF_CHECK_FIXTURE = json.load(f)
+pipeline.self_check(SELF_CHECK_FIXTURE)
+print(f"✅ Scoring pipeline {pipeline.version} loaded and self-checked")
+
+# Customer/product attributes looked up by id (built by the feature_index stage)
+FEATURE_INDEX_DIR = os.getenv("FEATURE_INDEX_DIR", "feature_index")
+feature_index = FeatureIndex.load(FEATURE_INDEX_DIR)
+if feature_index is not None:
+    print("✅ Feature index loaded: " + ", ".join(
+        f"{table.n_rows} by {key}" for key, table in feature_index.tables.items()))
+
+# Upper bound on rows accepted by /predict/batch in a single request
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "100000"))
 
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"Model not found at {MODEL_PATH}. Train the model first.")
+JSON_MIMETYPE = "application/json"
+NDJSON_MIMETYPE = "application/x-ndjson"
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MIMETYPE = "application/vnd.apache.arrow.file"
 
-model = joblib.load(MODEL_PATH)
-freq_maps = joblib.load(FREQ_MAP_PATH) if os.path.exists(FREQ_MAP_PATH) else {}
+# Opt-in micro-batching of concurrent /predict requests
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "64"))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "2"))
+# a request never waits longer than this on its micro-batch future
+MICRO_BATCH_TIMEOUT_S = float(os.getenv("MICRO_BATCH_TIMEOUT_S", "10"))
+
+# Hot reload of a retrained model written to MODEL_DIR, without a restart
+MODEL_RELOAD_ENABLED = os.getenv("MODEL_RELOAD_ENABLED", "false").lower() in ("1", "true", "yes")
+MODEL_POLL_INTERVAL_S = float(os.getenv("MODEL_POLL_INTERVAL_S", "30"))
+# > 0 shadow-scores that many sampled /predict requests with a new model before it is swapped in
+SHADOW_REQUESTS = int(os.getenv("SHADOW_REQUESTS", "0"))
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+
+# Opt-in cache of /predict results: "off", "local" (per worker) or "shared"
+# (one store for every worker, served on PREDICTION_CACHE_ADDRESS; see gunicorn.conf.py)
+PREDICTION_CACHE = os.getenv("PREDICTION_CACHE", "off").lower()
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "100000"))
+# 0 bounds the cache by entries only
+PREDICTION_CACHE_MAX_BYTES = int(os.getenv("PREDICTION_CACHE_MAX_BYTES", "0"))
+PREDICTION_CACHE_TTL_S = float(os.getenv("PREDICTION_CACHE_TTL_S", "300"))
+PREDICTION_CACHE_ADDRESS = os.getenv("PREDICTION_CACHE_ADDRESS", "/tmp/prediction-cache.sock")
 
 # ----------------------------------------------------------------
 # Prometheus Metrics
@@ -36,28 +94,318 @@ REQUEST_COUNT = Counter(
 REQUEST_LATENCY = Histogram(
     "app_request_latency_seconds", "Latency of requests in seconds", ["endpoint"], registry=registry
 )
+BATCH_ROW_LATENCY = Histogram(
+    "app_batch_row_latency_seconds", "/predict/batch request latency divided by its rows", registry=registry,
+    buckets=(0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+)
 PREDICTION_COUNT = Counter(
     "model_prediction_count", "Count of predictions for each class", ["prediction"], registry=registry
 )
+MICRO_BATCH_SIZE = Histogram(
+    "model_micro_batch_size", "Rows scored per micro-batch", registry=registry,
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+MICRO_BATCH_QUEUE_WAIT = Histogram(
+    "model_micro_batch_queue_wait_seconds", "Time requests wait in the micro-batch queue", registry=registry,
+    buckets=(0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+FEATURE_LOOKUP_COUNT = Counter(
+    "feature_index_lookup_count", "Feature index lookups by id column and outcome", ["key", "result"],
+    registry=registry,
+)
+MODEL_VERSION = Gauge(
+    "model_version_active", "1 for the model version currently serving", ["version"], registry=registry
+)
+MODEL_RELOAD_COUNT = Counter(
+    "model_reload_count", "Background model reloads by outcome", ["result"], registry=registry
+)
+SHADOW_LATENCY = Histogram(
+    "model_shadow_latency_seconds", "Latency of the candidate model on shadowed requests", registry=registry,
+    buckets=(0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+SHADOW_DISAGREEMENT_COUNT = Counter(
+    "model_shadow_disagreement_count", "Shadowed requests where the candidate predicts another class",
+    registry=registry,
+)
+SHADOW_PROBABILITY_DIFF = Histogram(
+    "model_shadow_probability_difference", "Absolute probability difference, candidate vs active", registry=registry,
+    buckets=(0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0),
+)
+PREDICTION_CACHE_LOOKUP_COUNT = Counter(
+    "prediction_cache_lookup_count", "Prediction cache lookups by result (hit, miss, error)", ["result"],
+    registry=registry,
+)
+PREDICTION_CACHE_HIT_RATIO = Gauge(
+    "prediction_cache_hit_ratio", "Share of prediction cache lookups that hit, in this process", registry=registry
+)
+PREDICTION_CACHE_LATENCY = Histogram(
+    "prediction_cache_lookup_latency_seconds", "Latency of prediction cache lookups", registry=registry,
+    buckets=(0.00001, 0.00005, 0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01),
+)
+
+# ----------------------------------------------------------------
+# Scoring
+# ----------------------------------------------------------------
+def score_frame(df):
+    """Return the positive-class probability for every row of df"""
+    return pipeline.score_frame(df)
+
+
+def score_features(features):
+    """Score either a raw dataframe or rows built by the feature builder"""
+    return pipeline.score_features(features)
+
+
+def make_batcher(scoring_pipeline):
+    """
+    A micro-batcher bound to one pipeline, so a batch never mixes model
+    versions. None when batching is off or the pipeline scores with the
+    linear kernel, whose single-row score is cheaper than any batching.
+    """
+    if not MICRO_BATCH_ENABLED:
+        return None
+    if scoring_pipeline.scoring_path == "kernel":
+        print(f"ℹ️ Micro-batching skipped: model {scoring_pipeline.version} scores with the linear kernel")
+        return None
+    return MicroBatcher(
+        scoring_pipeline.score_features,
+        max_batch_size=MICRO_BATCH_MAX_SIZE,
+        max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+        batch_size_metric=MICRO_BATCH_SIZE,
+        queue_wait_metric=MICRO_BATCH_QUEUE_WAIT,
+        timeout_s=MICRO_BATCH_TIMEOUT_S,
+    )
+
+
+batcher = make_batcher(pipeline)
 
 # ----------------------------------------------------------------
 # Helper: Prepare input for model
 # ----------------------------------------------------------------
 def prepare_input(form_data):
     """Convert HTML form input to dataframe compatible with model"""
-    try:
-        data = {k: [float(v) if v.replace('.', '', 1).isdigit() else v] for k, v in form_data.items()}
+    return pipeline.prepare_input(form_data)
+
+
+def add_freq_features(df):
+    """Frequency encode brand and product_subcategory if present"""
+    return pipeline.add_freq_features(df)
+
+# ----------------------------------------------------------------
+# Prediction cache
+# ----------------------------------------------------------------
+def make_prediction_cache(mode=PREDICTION_CACHE):
+    """The /predict result cache for `mode`, or None when it is off"""
+    if mode == "local":
+        backend = LRUCache(PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_MAX_BYTES, PREDICTION_CACHE_TTL_S)
+    elif mode == "shared":
+        # generated by gunicorn.conf.py for the store it starts, unless given
+        authkey = os.getenv("PREDICTION_CACHE_AUTHKEY", "")
+        backend = SharedCache(PREDICTION_CACHE_ADDRESS, authkey.encode())
+    elif mode in ("off", ""):
+        return None
+    else:
+        raise ValueError(f"Unknown PREDICTION_CACHE mode: {mode}")
+
+    return PredictionCache(backend, metrics={
+        "lookups": PREDICTION_CACHE_LOOKUP_COUNT,
+        "hit_ratio": PREDICTION_CACHE_HIT_RATIO,
+        "latency": PREDICTION_CACHE_LATENCY,
+    })
+
+
+prediction_cache = make_prediction_cache()
+if prediction_cache is not None:
+    print(f"✅ Prediction cache enabled ({PREDICTION_CACHE}, TTL {PREDICTION_CACHE_TTL_S:g}s)")
 
-        df = pd.DataFrame(data)
 
-        # frequency encode brand and product_subcategory if present
-        for col in ["brand", "product_subcategory"]:
-            if col in df.columns and col in freq_maps:
-                df[f"{col}_freq"] = df[col].map(freq_maps[col]).fillna(0.0)
+def cached_probability(serving, payload):
+    """(cache key, probability) of an enriched payload; (None, None) without a cache, probability None on a miss"""
+    if prediction_cache is None:
+        return None, None
+    key = prediction_cache.key(payload, serving.pipeline)
+    return key, prediction_cache.get(key)
 
+
+def remember_probability(key, probability):
+    if key is not None:
+        prediction_cache.put(key, probability)
+
+def _count_lookup(key, hit, n):
+    if n:
+        FEATURE_LOOKUP_COUNT.labels(key=key, result="hit" if hit else "miss").inc(n)
+
+
+def enrich_payload(payload):
+    """Fill in the customer/product attributes of a request that only sends their ids"""
+    if feature_index is None:
+        return payload
+    return feature_index.enrich(payload, _count_lookup)
+
+
+def enrich_frame(df):
+    """enrich_payload for every row of a batch frame"""
+    if feature_index is None:
         return df
-    except Exception as e:
-        raise ValueError(f"Error preparing input: {e}")
+    return feature_index.enrich_frame(df, _count_lookup)
+
+# ----------------------------------------------------------------
+# Helper: Batch request decoding / encoding
+# ----------------------------------------------------------------
+def decode_batch_body(body, mimetype):
+    """Decode a JSON array, NDJSON or Arrow IPC body into (dataframe, format)"""
+    if mimetype == JSON_MIMETYPE:
+        records = json.loads(body) if body else None
+        if isinstance(records, dict):
+            records = records.get("instances")
+        if not isinstance(records, list):
+            raise ValueError("JSON body must be an array of records")
+        df, fmt = pd.DataFrame.from_records(records), "json"
+
+    elif mimetype == NDJSON_MIMETYPE:
+        lines = body.splitlines()
+        records = [json.loads(line) for line in lines if line.strip()]
+        df, fmt = pd.DataFrame.from_records(records), "ndjson"
+
+    elif mimetype in (ARROW_STREAM_MIMETYPE, ARROW_FILE_MIMETYPE):
+        if pa is None:
+            raise ValueError("Arrow bodies require pyarrow to be installed")
+        reader = pa.BufferReader(body)
+        if mimetype == ARROW_STREAM_MIMETYPE:
+            table = pa.ipc.open_stream(reader).read_all()
+        else:
+            table = pa.ipc.open_file(reader).read_all()
+        df, fmt = table.to_pandas(), "arrow"
+
+    else:
+        raise ValueError(f"Unsupported content type: {mimetype}")
+
+    if len(df) > MAX_BATCH_ROWS:
+        raise ValueError(f"Batch of {len(df)} rows exceeds the limit of {MAX_BATCH_ROWS}")
+
+    return df, fmt
+
+
+def encode_batch_output(probabilities, fmt):
+    """Encode probabilities in the same format the batch request used, as (body, mimetype)"""
+    predictions = (probabilities >= 0.5).astype(np.int8)
+
+    if fmt == "json":
+        body = json.dumps({"probabilities": probabilities.tolist(), "predictions": predictions.tolist()})
+        return body.encode(), JSON_MIMETYPE
+
+    if fmt == "ndjson":
+        body = "".join(
+            json.dumps({"probability": float(p), "prediction": int(c)}) + "\n"
+            for p, c in zip(probabilities, predictions)
+        )
+        return body.encode(), NDJSON_MIMETYPE
+
+    table = pa.table({"probability": probabilities, "prediction": predictions})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes(), ARROW_STREAM_MIMETYPE
+
+
+def score_batch(input_df):
+    """Probabilities for a decoded batch, with the prediction counters updated"""
+    # one pipeline for frequency encoding and scoring, even across a model swap
+    active = model_registry.current.pipeline
+    n_rows = len(input_df)
+    if n_rows:
+        probabilities = active.score_frame(active.add_freq_features(enrich_frame(input_df)))
+    else:
+        probabilities = np.empty(0, dtype=np.float64)
+
+    n_returned = int((probabilities >= 0.5).sum())
+    PREDICTION_COUNT.labels(prediction="1").inc(n_returned)
+    PREDICTION_COUNT.labels(prediction="0").inc(n_rows - n_returned)
+
+    return probabilities
+
+
+def parse_batch_input(req):
+    """Decode a JSON array, NDJSON or Arrow IPC request into (dataframe, format)"""
+    return decode_batch_body(req.get_data(), req.mimetype)
+
+
+def render_batch_output(probabilities, fmt):
+    """Encode probabilities in the same format the batch request used"""
+    body, mimetype = encode_batch_output(probabilities, fmt)
+    return Response(body, mimetype=mimetype)
+
+# ----------------------------------------------------------------
+# Warm-up and readiness
+# ----------------------------------------------------------------
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "20"))
+
+# set once the pipeline has been warmed; /readyz reports 503 until then
+READY = threading.Event()
+
+
+def warm_up(scoring_pipeline, rounds=WARMUP_ROUNDS):
+    """
+    Run the fixture through the single-row, batch and template paths so
+    lazily built state (sklearn/pandas code paths, the Jinja template) exists
+    before traffic arrives; under a preloading server this happens once in
+    the master and every forked worker inherits it. A hot-reloaded model is
+    warmed the same way before it is swapped in.
+    """
+    frame = scoring_pipeline.add_freq_features(pd.DataFrame([SELF_CHECK_FIXTURE]))
+    for _ in range(rounds):
+        scoring_pipeline.score_one(SELF_CHECK_FIXTURE)
+        scoring_pipeline.score_frame(frame)
+    app.jinja_env.get_template("index.html")
+
+
+def load_serving(model_dir):
+    """Load and self-check a pipeline from model_dir, with its own micro-batcher"""
+    candidate = ScoringPipeline.load(model_dir, backend=SCORING_BACKEND)
+    candidate.self_check(SELF_CHECK_FIXTURE)
+    return ServingModel(candidate, make_batcher(candidate))
+
+
+def _on_swap(serving):
+    # keep the module-level names pointing at the active model
+    global pipeline, batcher, freq_maps
+    pipeline, batcher, freq_maps = serving.pipeline, serving.batcher, serving.pipeline.freq_maps
+    if prediction_cache is not None:
+        prediction_cache.model_swapped()
+
+
+model_registry = ModelRegistry(
+    MODEL_DIR,
+    load=load_serving,
+    warm=warm_up,
+    poll_interval_s=MODEL_POLL_INTERVAL_S,
+    shadow_requests=SHADOW_REQUESTS,
+    shadow_sample_rate=SHADOW_SAMPLE_RATE,
+    metrics={
+        "version": MODEL_VERSION,
+        "reloads": MODEL_RELOAD_COUNT,
+        "shadow_latency": SHADOW_LATENCY,
+        "shadow_disagreements": SHADOW_DISAGREEMENT_COUNT,
+        "shadow_difference": SHADOW_PROBABILITY_DIFF,
+    },
+    on_swap=_on_swap,
+)
+
+warm_up(pipeline)
+model_registry.activate(ServingModel(pipeline, batcher))
+READY.set()
+print(f"✅ Warmed up with {WARMUP_ROUNDS} rounds, ready to serve")
+
+
+def start_model_watcher():
+    """Start the hot-reload watcher in this process if it is enabled"""
+    if MODEL_RELOAD_ENABLED:
+        model_registry.start()
+
+
+@app.before_request
+def _ensure_model_watcher():
+    start_model_watcher()
 
 # ----------------------------------------------------------------
 # Routes
@@ -76,21 +424,72 @@ def predict():
     REQUEST_COUNT.labels(method="POST", endpoint="/predict").inc()
     start_time = time.time()
     try:
-        input_df = prepare_input(request.form)
-        probability = model.predict_proba(input_df)[:, 1][0]
+        payload = enrich_payload(request.get_json() if request.is_json else request.form)
+        serving = model_registry.current
+        key, probability = cached_probability(serving, payload)
+        if probability is None:
+            probability = serving.pipeline.score_one(payload, serving.batcher)
+            remember_probability(key, probability)
         prediction = int(probability >= 0.5)
+        model_registry.shadow(payload, probability)
 
         PREDICTION_COUNT.labels(prediction=str(prediction)).inc()
         REQUEST_LATENCY.labels(endpoint="/predict").observe(time.time() - start_time)
 
+        if request.is_json:
+            return jsonify(probability=float(probability), prediction=prediction)
+
         result_text = f"Return Probability: {probability:.2%} → {'Returned' if prediction==1 else 'Not Returned'}"
         return render_template("index.html", result=result_text)
 
     except Exception as e:
         print("❌ Prediction Error:", e)
+        if request.is_json:
+            return jsonify(error=str(e)), 400
         return render_template("index.html", result=f"Error: {str(e)}")
 
 
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Score many rows with a single vectorized predict_proba call."""
+    REQUEST_COUNT.labels(method="POST", endpoint="/predict/batch").inc()
+    start_time = time.time()
+    try:
+        input_df, fmt = parse_batch_input(request)
+    except Exception as e:
+        return jsonify(error=str(e)), 400
+
+    try:
+        n_rows = len(input_df)
+        probabilities = score_batch(input_df)
+
+        resp = render_batch_output(probabilities, fmt)
+
+        elapsed = time.time() - start_time
+        REQUEST_LATENCY.labels(endpoint="/predict/batch").observe(elapsed)
+        if n_rows:
+            BATCH_ROW_LATENCY.observe(elapsed / n_rows)
+        return resp
+
+    except Exception as e:
+        print("❌ Batch Prediction Error:", e)
+        return jsonify(error=str(e)), 500
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify(status="alive"), 200
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: only once the pipeline is loaded, self-checked and warmed up."""
+    if not READY.is_set():
+        return jsonify(status="warming_up"), 503
+    return jsonify(status="ready", model_version=model_registry.current.version), 200
+
+
 @app.route("/metrics", methods=["GET"])
 def metrics():
     """Expose custom Prometheus metrics."""
@@ -100,5 +499,6 @@ def metrics():
 # ----------------------------------------------------------------
 # Run App
 # ----------------------------------------------------------------
+# Local development only; production runs gunicorn with gunicorn.conf.py
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
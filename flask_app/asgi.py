@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_app
+
+# ----------------------------------------------------------------
+# ASGI entry point
+# ----------------------------------------------------------------
+# The JSON /predict and the /predict/batch endpoints are served natively on
+# the event loop: bodies are read asynchronously and anything heavier than a
+# kernel lookup is scored in the default thread pool, so a slow client or a
+# large batch never blocks other requests. Every other route (the HTML form,
+# /metrics, ...) goes to the Flask app through a WSGI adapter.
+#
+#   gunicorn -c gunicorn.conf.py asgi:application
+
+wsgi_application = WsgiToAsgi(flask_app.app)
+
+BATCH_MIMETYPES = (
+    flask_app.JSON_MIMETYPE,
+    flask_app.NDJSON_MIMETYPE,
+    flask_app.ARROW_STREAM_MIMETYPE,
+    flask_app.ARROW_FILE_MIMETYPE,
+)
+
+
+def _mimetype(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"content-type":
+            return value.decode("latin-1").split(";")[0].strip().lower()
+    return ""
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def _respond(send, status, body, mimetype=flask_app.JSON_MIMETYPE):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", mimetype.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _respond_json(send, status, data):
+    await _respond(send, status, json.dumps(data).encode())
+
+
+async def predict(receive, send):
+    flask_app.REQUEST_COUNT.labels(method="POST", endpoint="/predict").inc()
+    start_time = time.time()
+    try:
+        payload = flask_app.enrich_payload(json.loads(await _read_body(receive)))
+        serving = flask_app.model_registry.current
+        key, probability = flask_app.cached_probability(serving, payload)
+        if probability is None:
+            if serving.pipeline.kernel is not None:
+                # a handful of dict lookups; cheaper inline than a thread hop
+                probability = serving.pipeline.score_one(payload)
+            else:
+                probability = await asyncio.get_running_loop().run_in_executor(
+                    None, serving.pipeline.score_one, payload, serving.batcher
+                )
+            flask_app.remember_probability(key, probability)
+        prediction = int(probability >= 0.5)
+        flask_app.model_registry.shadow(payload, probability)
+
+        flask_app.PREDICTION_COUNT.labels(prediction=str(prediction)).inc()
+        flask_app.REQUEST_LATENCY.labels(endpoint="/predict").observe(time.time() - start_time)
+        await _respond_json(send, 200, {"probability": float(probability), "prediction": prediction})
+
+    except Exception as e:
+        print("❌ Prediction Error:", e)
+        await _respond_json(send, 400, {"error": str(e)})
+
+
+async def predict_batch(scope, receive, send):
+    flask_app.REQUEST_COUNT.labels(method="POST", endpoint="/predict/batch").inc()
+    start_time = time.time()
+    try:
+        input_df, fmt = flask_app.decode_batch_body(await _read_body(receive), _mimetype(scope))
+    except Exception as e:
+        await _respond_json(send, 400, {"error": str(e)})
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+        probabilities = await loop.run_in_executor(None, flask_app.score_batch, input_df)
+        body, mimetype = await loop.run_in_executor(None, flask_app.encode_batch_output, probabilities, fmt)
+
+        n_rows = len(input_df)
+        elapsed = time.time() - start_time
+        flask_app.REQUEST_LATENCY.labels(endpoint="/predict/batch").observe(elapsed)
+        if n_rows:
+            flask_app.BATCH_ROW_LATENCY.observe(elapsed / n_rows)
+        await _respond(send, 200, body, mimetype)
+
+    except Exception as e:
+        print("❌ Batch Prediction Error:", e)
+        await _respond_json(send, 500, {"error": str(e)})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # runs in each forked worker, where the watcher thread must live
+            flask_app.start_model_watcher()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    if scope["type"] == "http" and scope["method"] == "POST":
+        path = scope["path"]
+        if path == "/predict" and _mimetype(scope) == flask_app.JSON_MIMETYPE:
+            await predict(receive, send)
+            return
+        if path == "/predict/batch" and _mimetype(scope) in BATCH_MIMETYPES:
+            await predict_batch(scope, receive, send)
+            return
+
+    await wsgi_application(scope, receive, send)
@@ -0,0 +1,158 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+# queued by close(); the worker stops once everything queued before it is scored
+_STOP = object()
+
+
+def _concat(parts):
+    if len(parts) == 1:
+        return parts[0]
+    if isinstance(parts[0], np.ndarray):
+        return np.vstack(parts)
+    return pd.concat(parts, ignore_index=True)
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent single-request inputs into one matrix call.
+
+    Requests are queued by the serving threads; a background thread drains the
+    queue until `max_batch_size` rows are collected or `max_wait_ms` has passed
+    since the first queued request, scores them with a single `score_fn` call
+    and resolves every request's future with its own slice of the result.
+
+    Once closed (the model it scores for was swapped out), requests still
+    holding the batcher are scored inline on their own thread.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=2.0,
+                 batch_size_metric=None, queue_wait_metric=None, timeout_s=None):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_size_metric = batch_size_metric
+        self.queue_wait_metric = queue_wait_metric
+        self.timeout_s = timeout_s
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        # serializes submit() against close(), so nothing is queued behind _STOP
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._worker = None
+        self._worker_pid = None
+
+    def submit(self, features) -> Future:
+        """Queue a dataframe or feature matrix and return a future of its probabilities"""
+        with self._submit_lock:
+            if not self._closed:
+                self._ensure_worker()
+                future = Future()
+                self._queue.put((features, future, time.perf_counter()))
+                return future
+        return self._score_inline(features)
+
+    def predict_proba(self, features, timeout=None) -> np.ndarray:
+        return self.submit(features).result(timeout=self.timeout_s if timeout is None else timeout)
+
+    def close(self):
+        """Stop the worker thread after it has scored every request already queued"""
+        with self._submit_lock:
+            self._closed = True
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                self._queue.put(_STOP)
+
+    def _score_inline(self, features) -> Future:
+        future = Future()
+        try:
+            future.set_result(self.score_fn(features))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so a worker started in a preloading
+        # master is restarted lazily inside each forked worker process.
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != pid or not self._worker.is_alive():
+                if self._worker_pid != pid:
+                    self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker_pid = pid
+                self._worker.start()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None, 0
+        items = [first]
+        n_rows = len(items[0][0])
+        deadline = items[0][2] + self.max_wait
+
+        while n_rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # score what was gathered, stop on the next collect
+                self._queue.put(_STOP)
+                break
+            items.append(item)
+            n_rows += len(item[0])
+
+        return items, n_rows
+
+    def _drain(self):
+        # nothing can be queued after _STOP, but never leave a future unresolved
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                features, future, _ = item
+                try:
+                    future.set_result(self.score_fn(features))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def _run(self):
+        while True:
+            items, n_rows = self._collect()
+            if items is None:
+                self._drain()
+                return
+            started = time.perf_counter()
+
+            if self.batch_size_metric is not None:
+                self.batch_size_metric.observe(n_rows)
+            if self.queue_wait_metric is not None:
+                for _, _, enqueued in items:
+                    self.queue_wait_metric.observe(started - enqueued)
+
+            try:
+                batch = _concat([features for features, _, _ in items])
+                probabilities = self.score_fn(batch)
+            except Exception as e:
+                for _, future, _ in items:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for features, future, _ in items:
+                future.set_result(probabilities[offset:offset + len(features)])
+                offset += len(features)
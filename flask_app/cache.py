@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+from features import is_missing, parse_value
+
+# rough per-entry cost of the OrderedDict node and (expiry, value, size) tuple
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def _normalize(value):
+    value = parse_value(value)
+    # "" is not missing: a categorical scores it as an unknown category
+    if is_missing(value):
+        return None
+    # 3 and 3.0 score identically on every path; True and "True" need not
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if hasattr(value, "item"):  # numpy scalars from a feature index lookup
+        return _normalize(value.item())
+    return value
+
+
+def feature_key(payload, columns, version) -> str:
+    """
+    Canonical hash of the features a model version reads from a payload.
+
+    Only `columns` (all fields when None) go into the key, normalized the way
+    the scoring paths parse them, so a retry that differs in an unused field,
+    field order or "42" vs 42 maps to the same entry. The model version is
+    part of the key: entries written by another version can never hit.
+    """
+    if columns is None:
+        columns = sorted(payload.keys())
+    values = [_normalize(payload.get(col)) for col in columns]
+    text = json.dumps([version, values], separators=(",", ":"), default=str)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+# ----------------------------------------------------------------
+# Backends: get / set / clear / size, local or shared
+# ----------------------------------------------------------------
+class LRUCache:
+    """
+    In-process store bounded by entry count and, optionally, bytes.
+
+    Least recently used entries are evicted first once either bound is hit;
+    an entry older than `ttl_s` is dropped when it is next read.
+    """
+
+    shared = False
+
+    def __init__(self, max_entries=100000, max_bytes=0, ttl_s=300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value, size = entry
+            if expires <= now:
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (time.monotonic() + self.ttl_s, value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or (self.max_bytes and self._bytes > self.max_bytes)):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self):
+        return len(self._entries)
+
+
+class _CacheServerManager(BaseManager):
+    pass
+
+
+class _CacheClientManager(BaseManager):
+    pass
+
+
+_server_store = None
+
+
+def _init_server_store(max_entries, max_bytes, ttl_s):
+    global _server_store
+    _server_store = LRUCache(max_entries, max_bytes, ttl_s)
+
+
+def _get_server_store():
+    return _server_store
+
+
+_CacheServerManager.register("store", callable=_get_server_store)
+_CacheClientManager.register("store")
+
+
+def start_cache_server(address, authkey, max_entries=100000, max_bytes=0, ttl_s=300.0):
+    """
+    Serve one LRUCache to every process on the host from a child process
+    listening on `address` (a Unix socket path or a (host, port) pair).
+    Returns the manager; call shutdown() on it to stop the server.
+    """
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)  # left by a server that was killed
+    manager = _CacheServerManager(address, authkey)
+    manager.start(_init_server_store, (max_entries, max_bytes, ttl_s))
+    return manager
+
+
+class SharedCache:
+    """
+    Client of the store served by start_cache_server, shared by all workers.
+
+    Each process opens its own connection on first use (connections do not
+    survive fork). After a failure the store is not retried for
+    `retry_after_s`, so a stopped server costs requests nothing but a miss.
+    """
+
+    shared = True
+
+    def __init__(self, address, authkey, retry_after_s=5.0):
+        self.address = address
+        self.authkey = authkey
+        self.retry_after_s = retry_after_s
+        self._store = None
+        self._store_pid = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._store is not None and self._store_pid == os.getpid():
+            return self._store
+        if time.monotonic() < self._retry_at:
+            raise ConnectionError(f"Prediction cache at {self.address} is unavailable")
+        with self._lock:
+            if self._store is None or self._store_pid != os.getpid():
+                try:
+                    manager = _CacheClientManager(self.address, self.authkey)
+                    manager.connect()
+                    self._store = manager.store()
+                    self._store_pid = os.getpid()
+                except Exception:
+                    self._retry_at = time.monotonic() + self.retry_after_s
+                    raise
+        return self._store
+
+    def _call(self, method, *args):
+        try:
+            return getattr(self._connect(), method)(*args)
+        except Exception:
+            # reconnect on the next call once the retry delay has passed
+            self._store = None
+            self._retry_at = max(self._retry_at, time.monotonic() + self.retry_after_s)
+            raise
+
+    def get(self, key):
+        return self._call("get", key)
+
+    def set(self, key, value):
+        self._call("set", key, value)
+
+    def clear(self):
+        self._call("clear")
+
+    def size(self):
+        return self._call("size")
+
+
+# ----------------------------------------------------------------
+# Request-facing cache
+# ----------------------------------------------------------------
+class PredictionCache:
+    """
+    Probabilities of recently scored payloads, in front of any backend with
+    get / set / clear / size (LRUCache, SharedCache, or a stand-in in tests).
+
+    A backend error is counted and treated as a miss: the request is scored
+    as if there were no cache.
+    """
+
+    def __init__(self, backend, metrics=None):
+        self.backend = backend
+        self.metrics = metrics or {}
+        self._hits = 0
+        self._lookups = 0
+        self._failing = False
+
+    def key(self, payload, pipeline) -> str:
+        return feature_key(payload, pipeline.input_columns, pipeline.version)
+
+    def get(self, key):
+        """The cached probability for `key`, or None"""
+        started = time.perf_counter()
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self._error("lookup", e)
+            return None
+        self._failing = False
+
+        self._lookups += 1
+        if value is not None:
+            self._hits += 1
+        if "latency" in self.metrics:
+            self.metrics["latency"].observe(time.perf_counter() - started)
+        if "lookups" in self.metrics:
+            self.metrics["lookups"].labels(result="hit" if value is not None else "miss").inc()
+        if "hit_ratio" in self.metrics:
+            self.metrics["hit_ratio"].set(self._hits / self._lookups)
+        return value
+
+    def put(self, key, probability):
+        try:
+            self.backend.set(key, float(probability))
+        except Exception as e:
+            self._error("store", e)
+
+    def clear(self):
+        try:
+            self.backend.clear()
+        except Exception as e:
+            self._error("clear", e)
+
+    def model_swapped(self):
+        """Entries of the old version can no longer hit; free them in a per-process store"""
+        # a shared store also serves workers still on the old version; its
+        # entries age out through LRU and TTL instead
+        if not getattr(self.backend, "shared", False):
+            self.clear()
+
+    def size(self):
+        try:
+            return self.backend.size()
+        except Exception:
+            return 0
+
+    def _error(self, operation, e):
+        if "lookups" in self.metrics and operation == "lookup":
+            self.metrics["lookups"].labels(result="error").inc()
+        if not self._failing:
+            # once per outage rather than once per request
+            print(f"⚠️ Prediction cache {operation} failed, scoring without it:", e)
+            self._failing = True
+
+
+def serve_forever(address, authkey, max_entries=100000, max_bytes=0, ttl_s=300.0):
+    """Run the shared store in this process, e.g. as a sidecar next to the app"""
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)
+    _init_server_store(max_entries, max_bytes, ttl_s)
+    server = _CacheServerManager(address, authkey).get_server()
+    print(f"✅ Prediction cache serving on {address}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    # PREDICTION_CACHE_AUTHKEY=... python cache.py
+    serve_forever(
+        os.getenv("PREDICTION_CACHE_ADDRESS", "/tmp/prediction-cache.sock"),
+        os.environ["PREDICTION_CACHE_AUTHKEY"].encode(),
+        int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "100000")),
+        int(os.getenv("PREDICTION_CACHE_MAX_BYTES", "0")),
+        float(os.getenv("PREDICTION_CACHE_TTL_S", "300")),
+    )
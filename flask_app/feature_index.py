@@ -0,0 +1,129 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+META_FILE = "meta.json"
+KEYS_FILE = "keys.npy"
+
+
+class FeatureTable:
+    """
+    One table of the offline feature index (see source/data/feature_index.py).
+
+    Keys and columns are memory-mapped .npy files, so forked workers share
+    the pages through the OS page cache instead of each holding a copy; a
+    lookup is a binary search over the sorted keys plus one gather per column.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.key = meta["key"]
+        self.n_rows = meta["n_rows"]
+        # plain ndarray views of the maps index faster than np.memmap
+        self.keys = np.asarray(np.load(os.path.join(path, KEYS_FILE), mmap_mode="r"))
+        self.columns = {}
+        self.vocabularies = {}
+        for col, spec in meta["columns"].items():
+            self.columns[col] = np.asarray(np.load(os.path.join(path, f"{col}.npy"), mmap_mode="r"))
+            if spec["kind"] == "dictionary":
+                self.vocabularies[col] = spec["values"]
+        # (name, column, vocabulary or None) for the per-row gather
+        self._row_plan = [(col, values, self.vocabularies.get(col)) for col, values in self.columns.items()]
+
+    def position(self, key):
+        """Row of `key`, or None when it is not indexed"""
+        if key is None:
+            return None
+        encoded = str(key).encode("utf-8")
+        pos = int(self.keys.searchsorted(encoded))
+        if pos < self.n_rows and self.keys[pos] == encoded:
+            return pos
+        return None
+
+    def row(self, pos) -> dict:
+        out = {}
+        for col, values, vocabulary in self._row_plan:
+            value = values.item(pos)
+            out[col] = vocabulary[value] if vocabulary is not None else value
+        return out
+
+    def lookup(self, key):
+        pos = self.position(key)
+        return None if pos is None else self.row(pos)
+
+    def lookup_many(self, keys):
+        """(positions, found) for an array of keys; positions are only valid where found"""
+        encoded = np.char.encode(np.asarray(keys, dtype=str), "utf-8")
+        # keys wider than the index, in bytes, would be truncated by the cast, so they never match
+        fits = np.char.str_len(encoded) <= self.keys.dtype.itemsize
+        encoded = np.where(fits, encoded, b"").astype(self.keys.dtype)
+        positions = np.searchsorted(self.keys, encoded)
+        clipped = np.minimum(positions, max(self.n_rows - 1, 0))
+        found = fits & (positions < self.n_rows)
+        if self.n_rows:
+            found &= self.keys[clipped] == encoded
+        return clipped, found
+
+    def gather(self, col, positions):
+        values = self.columns[col][positions]
+        vocabulary = self.vocabularies.get(col)
+        if vocabulary is not None:
+            return np.asarray(vocabulary, dtype=object)[values]
+        return values
+
+
+class FeatureIndex:
+    """Customer and product attributes joined onto requests that only carry their ids"""
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    @classmethod
+    def load(cls, path):
+        """Every table under `path`; None when no index has been built"""
+        if not os.path.isdir(path):
+            return None
+        tables = {}
+        for name in sorted(os.listdir(path)):
+            if os.path.exists(os.path.join(path, name, META_FILE)):
+                table = FeatureTable(os.path.join(path, name))
+                tables[table.key] = table
+        return cls(tables) if tables else None
+
+    def enrich(self, payload, on_lookup=None) -> dict:
+        """
+        The payload with every attribute of its customer/product filled in.
+        Fields the caller sent win over indexed ones; unknown ids add nothing.
+        """
+        enriched = None
+        for key, table in self.tables.items():
+            found = table.lookup(payload.get(key)) if key in payload else None
+            if key in payload and on_lookup is not None:
+                on_lookup(key, found is not None, 1)
+            if found:
+                if enriched is None:
+                    enriched = dict(payload.items())
+                for col, value in found.items():
+                    enriched.setdefault(col, value)
+        return payload if enriched is None else enriched
+
+    def enrich_frame(self, df, on_lookup=None):
+        """Vectorized enrich() for a batch frame: missing columns, and missing cells of present ones"""
+        for key, table in self.tables.items():
+            if key not in df.columns or not len(df):
+                continue
+            positions, found = table.lookup_many(df[key].astype(str).to_numpy())
+            if on_lookup is not None:
+                on_lookup(key, True, int(found.sum()))
+                on_lookup(key, False, int((~found).sum()))
+            if not found.any():
+                continue
+            for col in table.columns:
+                gathered = pd.Series(table.gather(col, positions), index=df.index)
+                if not found.all():
+                    gathered = gathered.where(found)
+                df[col] = gathered if col not in df.columns else df[col].fillna(gathered)
+        return df
@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+
+
+def parse_value(value):
+    """Parse a raw form value the same way prepare_input does"""
+    if isinstance(value, str):
+        return float(value) if value.replace('.', '', 1).isdigit() else value
+    return value
+
+
+def is_missing(value):
+    """None or NaN: what the preprocessor's imputers fill"""
+    return value is None or (isinstance(value, (float, np.floating)) and math.isnan(value))
+
+
+def is_blank(value):
+    """is_missing(), or an empty string: how numeric fields are imputed"""
+    return is_missing(value) or (isinstance(value, str) and value == "")
+
+
+def category_value(value):
+    """
+    A categorical field's value as the fitted one-hot encoder compares it, or
+    None when it is missing. Anything else, "" included, is looked up as is:
+    a value the encoder never saw sets no column rather than the fill.
+    """
+    if is_missing(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class FeatureVectorBuilder:
+    """
+    Turns a single form/JSON dict straight into the preprocessor's output row.
+
+    The builder is compiled once from a fitted ColumnTransformer made of
+    (SimpleImputer -> StandardScaler) numeric and (SimpleImputer -> OneHotEncoder)
+    categorical pipelines. Imputation and scaling constants are read into plain
+    arrays and every one-hot category is resolved to its output column through
+    a dict lookup, so building a row never touches pandas or sklearn.
+    """
+
+    def __init__(self, n_features, numeric, categorical, freq_maps=None):
+        # numeric: list of (column, output index, fill value, mean, scale)
+        # categorical: list of (column, fill value, {category: output index})
+        self.n_features = n_features
+        self.numeric = numeric
+        self.categorical = categorical
+        self.freq_maps = freq_maps or {}
+        self._template = np.zeros((1, n_features), dtype=np.float64)
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor, freq_maps=None):
+        numeric, categorical = [], []
+        offset = 0
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or name == "remainder" or len(columns) == 0:
+                continue
+
+            steps = dict(transformer.steps) if hasattr(transformer, "steps") else {name: transformer}
+            imputer = steps.get("imputer")
+            scaler = steps.get("scaler")
+            encoder = next((s for s in steps.values() if hasattr(s, "categories_")), None)
+
+            if encoder is not None:
+                if getattr(encoder, "drop_idx_", None) is not None:
+                    raise ValueError("OneHotEncoder with drop is not supported by the feature builder")
+                for i, col in enumerate(columns):
+                    fill = imputer.statistics_[i] if imputer is not None else None
+                    lookup = {}
+                    for j, category in enumerate(encoder.categories_[i]):
+                        lookup[category] = offset + j
+                    categorical.append((col, fill, lookup))
+                    offset += len(encoder.categories_[i])
+            else:
+                for i, col in enumerate(columns):
+                    fill = float(imputer.statistics_[i]) if imputer is not None else np.nan
+                    mean = float(scaler.mean_[i]) if scaler is not None and scaler.mean_ is not None else 0.0
+                    scale = float(scaler.scale_[i]) if scaler is not None and scaler.scale_ is not None else 1.0
+                    numeric.append((col, offset, fill, mean, scale))
+                    offset += 1
+
+        return cls(offset, numeric, categorical, freq_maps)
+
+    def _raw(self, data, col):
+        if col.endswith("_freq") and col[:-5] in self.freq_maps:
+            base = data.get(col[:-5])
+            return self.freq_maps[col[:-5]].get(parse_value(base), 0.0)
+        return data.get(col)
+
+    def build(self, data) -> np.ndarray:
+        """Return a (1, n_features) row for a mapping of raw feature values"""
+        row = self._template.copy()
+        out = row[0]
+
+        for col, idx, fill, mean, scale in self.numeric:
+            value = parse_value(self._raw(data, col))
+            value = fill if is_blank(value) else float(value)
+            out[idx] = (value - mean) / scale
+
+        for col, fill, lookup in self.categorical:
+            value = category_value(parse_value(data.get(col)))
+            if value is None:
+                value = fill
+            idx = lookup.get(value)
+            if idx is not None:
+                out[idx] = 1.0
+
+        return row
@@ -0,0 +1,73 @@
+import gc
+import os
+import secrets
+
+# ----------------------------------------------------------------
+# Production server settings
+# ----------------------------------------------------------------
+#   gunicorn -c gunicorn.conf.py asgi:application   (async, uvicorn workers)
+#   WORKER_CLASS=sync gunicorn -c gunicorn.conf.py app:app   (plain WSGI)
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", "3"))
+worker_class = os.getenv("WORKER_CLASS", "uvicorn_worker.UvicornWorker")
+threads = int(os.getenv("THREADS", "1"))
+
+timeout = int(os.getenv("TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycling workers bounds slow leaks; 0 disables it
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+# The app module (pipeline loaded, self-checked and warmed up) is imported
+# once in the master; workers are forked from it and share the model and
+# preprocessor pages copy-on-write instead of each loading their own copy.
+preload_app = True
+
+# PREDICTION_CACHE=shared: the master serves one prediction cache to all
+# workers on a local socket, unless PREDICTION_CACHE_START_SERVER=false
+# because a separately run `python cache.py` serves it. Set before the app is
+# preloaded, so every worker inherits the key.
+SHARED_PREDICTION_CACHE = os.getenv("PREDICTION_CACHE", "off").lower() == "shared"
+START_CACHE_SERVER = os.getenv("PREDICTION_CACHE_START_SERVER", "true").lower() in ("1", "true", "yes")
+if SHARED_PREDICTION_CACHE and START_CACHE_SERVER:
+    os.environ.setdefault("PREDICTION_CACHE_AUTHKEY", secrets.token_hex(16))
+
+_cache_server = None
+
+
+def on_starting(server):
+    global _cache_server
+    if not (SHARED_PREDICTION_CACHE and START_CACHE_SERVER):
+        return
+    from cache import start_cache_server
+
+    address = os.getenv("PREDICTION_CACHE_ADDRESS", "/tmp/prediction-cache.sock")
+    _cache_server = start_cache_server(
+        address,
+        os.environ["PREDICTION_CACHE_AUTHKEY"].encode(),
+        int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "100000")),
+        int(os.getenv("PREDICTION_CACHE_MAX_BYTES", "0")),
+        float(os.getenv("PREDICTION_CACHE_TTL_S", "300")),
+    )
+    server.log.info(f"✅ Shared prediction cache serving on {address}")
+
+
+def when_ready(server):
+    # Move everything loaded so far into the permanent generation: the garbage
+    # collector then never writes to those objects' headers in the workers,
+    # which would otherwise un-share their pages one by one.
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"✅ Preloaded app frozen ({gc.get_freeze_count()} objects), forking {workers} workers")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked from the preloaded master")
+
+
+def on_exit(server):
+    if _cache_server is not None:
+        _cache_server.shutdown()
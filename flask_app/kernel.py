@@ -0,0 +1,119 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from features import is_blank, category_value, parse_value
+
+
+def category_key(value) -> str:
+    """Mirror of source.model.model_export.category_key for category_value() values"""
+    if isinstance(value, (bool, np.bool_)):
+        # True == 1 for the one-hot encoder too: it matches a category 1, not "True"
+        return str(int(value))
+    if isinstance(value, (int, float, np.integer, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def sigmoid(z: float) -> float:
+    """Logistic function that cannot overflow: exp() only ever sees -|z|"""
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+def sigmoid_array(z: np.ndarray) -> np.ndarray:
+    """Vectorized sigmoid(), without overflow warnings for large |z|"""
+    e = np.exp(-np.abs(z))
+    return np.where(z >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+
+
+def _frame_category_key(value):
+    value = category_value(value)
+    return None if value is None else category_key(value)
+
+
+class LinearScoringKernel:
+    """
+    Scores orders with the exported linear kernel (models/scoring_kernel.json).
+
+    The preprocessor and logistic regression are already folded into per-column
+    weights and per-category weight tables, so a score is one dot product plus a
+    dict lookup per categorical column; sklearn is never imported.
+    """
+
+    def __init__(self, spec, freq_maps=None):
+        self.intercept = float(spec["intercept"])
+        self.numeric_columns = list(spec["numeric"]["columns"])
+        self.numeric_fill = np.asarray(spec["numeric"]["fill"], dtype=np.float64)
+        self.numeric_weight = np.asarray(spec["numeric"]["weight"], dtype=np.float64)
+        self.categorical = [
+            (c["column"], c["weights"], c["weights"].get(c["fill"], 0.0) if c["fill"] is not None else 0.0)
+            for c in spec["categorical"]
+        ]
+        self.freq_maps = freq_maps or {}
+        self._numeric = list(zip(self.numeric_columns, self.numeric_fill.tolist(), self.numeric_weight.tolist()))
+
+    @classmethod
+    def load(cls, path, freq_maps=None):
+        with open(path) as f:
+            return cls(json.load(f), freq_maps)
+
+    def _raw(self, data, col):
+        if col.endswith("_freq") and col[:-5] in self.freq_maps:
+            return self.freq_maps[col[:-5]].get(parse_value(data.get(col[:-5])), 0.0)
+        return data.get(col)
+
+    def decision_function(self, data) -> float:
+        z = self.intercept
+        for col, fill, weight in self._numeric:
+            value = parse_value(self._raw(data, col))
+            z += weight * (fill if is_blank(value) else float(value))
+        for col, weights, fill_weight in self.categorical:
+            value = category_value(parse_value(data.get(col)))
+            z += fill_weight if value is None else weights.get(category_key(value), 0.0)
+        return z
+
+    def score(self, data) -> float:
+        """Return-probability of a single mapping of raw feature values"""
+        return sigmoid(self.decision_function(data))
+
+    def score_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Vectorized return-probabilities for every row of df"""
+        n_rows = len(df)
+        z = np.full(n_rows, self.intercept, dtype=np.float64)
+
+        if self.numeric_columns:
+            values = np.empty((n_rows, len(self.numeric_columns)), dtype=np.float64)
+            for j, col in enumerate(self.numeric_columns):
+                base = col[:-5]
+                if col.endswith("_freq") and base in self.freq_maps and base in df.columns:
+                    column = df[base].astype(object).map(self.freq_maps[base]).fillna(0.0)
+                elif col in df.columns:
+                    column = df[col]
+                    if isinstance(column.dtype, pd.CategoricalDtype):
+                        column = column.astype(object)
+                    column = pd.to_numeric(column, errors="coerce")
+                else:
+                    column = pd.Series(np.nan, index=df.index)
+                values[:, j] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = np.where(np.isnan(values), self.numeric_fill, values)
+            z += values @ self.numeric_weight
+
+        for col, weights, fill_weight in self.categorical:
+            if col not in df.columns:
+                z += fill_weight
+                continue
+            # categoricals (e.g. dictionary-encoded Arrow columns) cannot take the
+            # 0.0 fill below as a new category, so map plain values instead
+            column = df[col].astype(object)
+            missing = column.isna().to_numpy()
+            # frame values go in unparsed, as the preprocessor would see them
+            keys = column.map(_frame_category_key)
+            contrib = keys.map(weights).fillna(0.0).to_numpy(dtype=np.float64)
+            z += np.where(missing, fill_weight, contrib)
+
+        return sigmoid_array(z)
@@ -0,0 +1,215 @@
+import json
+import math
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from features import FeatureVectorBuilder, parse_value
+from kernel import LinearScoringKernel
+
+MANIFEST_FILE = "model_manifest.json"
+MODEL_FILE = "lr_model.pkl"
+PREPROCESSOR_FILE = "preprocessor.pkl"
+SCORING_KERNEL_FILE = "scoring_kernel.json"
+FREQ_MAP_FILE = "freq_maps.joblib"
+
+
+def missing_as_nan(df):
+    """
+    df with None in object columns replaced by NaN. The imputers only fill
+    NaN and would pass None on to the encoders as an unknown category, while
+    the kernel and the feature builder fill both.
+    """
+    columns = df.columns[df.dtypes == object]
+    if len(columns) == 0 or not df[columns].isna().any().any():
+        return df
+    df = df.copy()
+    df[columns] = df[columns].where(df[columns].notna(), np.nan)
+    return df
+
+
+class ScoringPipeline:
+    """
+    The fitted preprocessor and model, loaded together and kept warm.
+
+    Artifacts are resolved through models/model_manifest.json written by the
+    model_training stage, so the preprocessor and model that are served always
+    come from the same training run. Depending on the backend, scoring goes
+    through the exported linear kernel, the compiled feature builder, or the
+    plain DataFrame -> preprocessor -> model path.
+    """
+
+    def __init__(self, version="unversioned", manifest=None, model=None, preprocessor=None,
+                 estimator=None, kernel=None, freq_maps=None):
+        self.version = version
+        self.manifest = manifest or {}
+        self.model = model
+        self.preprocessor = preprocessor
+        self.estimator = estimator
+        self.kernel = kernel
+        self.freq_maps = freq_maps or {}
+
+        # Compiled once so single-row requests skip pandas entirely
+        self.feature_builder = None
+        if preprocessor is not None and kernel is None:
+            try:
+                self.feature_builder = FeatureVectorBuilder.from_preprocessor(preprocessor, self.freq_maps)
+            except Exception as e:
+                print("⚠️ Feature builder unavailable, falling back to DataFrame path:", e)
+
+        self.input_columns = self._input_columns()
+
+    @classmethod
+    def load(cls, model_dir="models", backend="auto"):
+        """
+        backend "auto" scores with the exported kernel when it exists, "kernel"
+        requires it and "sklearn" always uses the pickled preprocessor and model.
+        """
+        manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        artifacts = manifest.get("artifacts", {})
+
+        def artifact(key, default):
+            return os.path.join(model_dir, artifacts.get(key, default))
+
+        freq_map_path = artifact("freq_maps", FREQ_MAP_FILE)
+        freq_maps = joblib.load(freq_map_path) if os.path.exists(freq_map_path) else {}
+
+        kernel_path = artifact("scoring_kernel", SCORING_KERNEL_FILE)
+        kernel = None
+        if backend == "kernel" or (backend == "auto" and os.path.exists(kernel_path)):
+            kernel = LinearScoringKernel.load(kernel_path, freq_maps)
+
+        model = preprocessor = estimator = None
+        if kernel is None:
+            model_path = artifact("model", MODEL_FILE)
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Model not found at {model_path}. Train the model first.")
+
+            model = joblib.load(model_path)
+
+            # The fitted ColumnTransformer is either stored next to the model or is
+            # the first step of a (preprocessor, estimator) pipeline.
+            preprocessor_path = artifact("preprocessor", PREPROCESSOR_FILE)
+            preprocessor = joblib.load(preprocessor_path) if os.path.exists(preprocessor_path) else None
+            estimator = model
+            if preprocessor is None and hasattr(model, "steps") and len(model.steps) == 2 \
+                    and hasattr(model.steps[0][1], "transformers_"):
+                preprocessor, estimator = model.steps[0][1], model.steps[-1][1]
+
+        return cls(manifest.get("version", "unversioned"), manifest, model, preprocessor,
+                   estimator, kernel, freq_maps)
+
+    @property
+    def scoring_path(self) -> str:
+        """How score_one scores a payload: kernel, feature_builder or dataframe"""
+        if self.kernel is not None:
+            return "kernel"
+        return "feature_builder" if self.feature_builder is not None else "dataframe"
+
+    def _input_columns(self):
+        """Raw payload fields the active scoring path reads; None when it is not known"""
+        if self.kernel is not None:
+            columns = self.kernel.numeric_columns + [col for col, _, _ in self.kernel.categorical]
+        elif self.feature_builder is not None:
+            columns = [c[0] for c in self.feature_builder.numeric] + [c[0] for c in self.feature_builder.categorical]
+        elif self.preprocessor is not None and hasattr(self.preprocessor, "feature_names_in_"):
+            columns = list(self.preprocessor.feature_names_in_)
+        else:
+            return None
+
+        # *_freq columns are derived from their base column
+        raw = [col[:-5] if col.endswith("_freq") and col[:-5] in self.freq_maps else col for col in columns]
+        return list(dict.fromkeys(raw))
+
+    # ------------------------------------------------------------
+    # Feature preparation
+    # ------------------------------------------------------------
+    def add_freq_features(self, df):
+        """Frequency encode brand and product_subcategory if present"""
+        for col in ["brand", "product_subcategory"]:
+            if col in df.columns and col in self.freq_maps:
+                df[f"{col}_freq"] = df[col].astype(object).map(self.freq_maps[col]).fillna(0.0)
+
+        return df
+
+    def prepare_input(self, form_data):
+        """Convert HTML form input to dataframe compatible with model"""
+        try:
+            # None is missing on every path, so the imputers see it as NaN
+            data = {k: [np.nan if v is None else parse_value(v)] for k, v in form_data.items()}
+
+            df = pd.DataFrame(data)
+
+            return self.add_freq_features(df)
+        except Exception as e:
+            raise ValueError(f"Error preparing input: {e}")
+
+    # ------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------
+    def score_frame(self, df):
+        """Return the positive-class probability for every row of df"""
+        if self.kernel is not None:
+            return self.kernel.score_frame(df)
+        df = missing_as_nan(df)
+        if self.preprocessor is not None:
+            return self.estimator.predict_proba(self.preprocessor.transform(df))[:, 1]
+        return self.model.predict_proba(df)[:, 1]
+
+    def score_features(self, features):
+        """Score either a raw dataframe or rows built by the feature builder"""
+        if isinstance(features, np.ndarray):
+            return self.estimator.predict_proba(features)[:, 1]
+        return self.score_frame(features)
+
+    def score_one(self, payload, batcher=None) -> float:
+        """Score a single form/JSON mapping, through the micro-batcher if given"""
+        if self.kernel is not None:
+            # the kernel is a handful of lookups, cheaper than any batching;
+            # the app never builds a batcher for it
+            return self.kernel.score(payload)
+
+        if self.feature_builder is not None:
+            features = self.feature_builder.build(payload)
+        else:
+            features = self.prepare_input(payload)
+
+        if batcher is not None:
+            return float(batcher.predict_proba(features)[0])
+        return float(self.score_features(features)[0])
+
+    # ------------------------------------------------------------
+    # Startup self-check
+    # ------------------------------------------------------------
+    def self_check(self, fixture) -> float:
+        """Score a fixture row through every active path; raise on a bad pairing"""
+        frame = self.add_freq_features(pd.DataFrame([fixture]))
+
+        expected = self.manifest.get("n_features")
+        if self.preprocessor is not None:
+            transformed = self.preprocessor.transform(frame)
+            n_features = transformed.shape[1]
+            n_expected = getattr(self.estimator, "n_features_in_", n_features)
+            if n_features != n_expected or (expected is not None and n_features != expected):
+                raise RuntimeError(
+                    f"Preprocessor produces {n_features} features but model {self.version} "
+                    f"expects {expected if expected is not None else n_expected}"
+                )
+            if self.feature_builder is not None:
+                dense = transformed.toarray() if hasattr(transformed, "toarray") else transformed
+                if not np.allclose(self.feature_builder.build(fixture), dense):
+                    raise RuntimeError("Feature builder output does not match the preprocessor")
+
+        probability = self.score_one(fixture)
+        if not (0.0 <= probability <= 1.0) or math.isnan(probability):
+            raise RuntimeError(f"Self-check produced an invalid probability: {probability}")
+        if not math.isclose(probability, float(self.score_frame(frame)[0]), abs_tol=1e-9):
+            raise RuntimeError("Single-row and batch scoring paths disagree on the fixture row")
+
+        return probability
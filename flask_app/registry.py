@@ -0,0 +1,205 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import MANIFEST_FILE
+
+
+class ServingModel:
+    """The pipeline and its micro-batcher, swapped together as one reference"""
+
+    def __init__(self, pipeline, batcher=None):
+        self.pipeline = pipeline
+        self.batcher = batcher
+
+    @property
+    def version(self):
+        return self.pipeline.version
+
+
+class ModelRegistry:
+    """
+    Hot-reloads the model in models/ without restarting the server.
+
+    A daemon thread polls model_manifest.json; once a new version has settled
+    on disk (same mtime on two consecutive polls) it is loaded, self-checked
+    and warmed up in the background while the active model keeps serving.
+    The swap is a single reference assignment: every request reads `current`
+    once and scores with that pipeline/batcher pair to the end, so requests
+    in flight during a swap finish on the old model and none are dropped.
+
+    With `shadow_requests` > 0 the warmed candidate first scores a sample of
+    live /predict traffic on a separate thread, off the request path, and is
+    promoted after that many shadow scores; latency and disagreement with the
+    active model are exported to the app's Prometheus registry.
+    """
+
+    def __init__(self, model_dir, load, warm, poll_interval_s=30.0, shadow_requests=0,
+                 shadow_sample_rate=0.1, metrics=None, on_swap=None):
+        self.model_dir = model_dir
+        self.manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+        self.load = load
+        self.warm = warm
+        self.poll_interval_s = poll_interval_s
+        self.shadow_requests = shadow_requests
+        self.shadow_sample_rate = shadow_sample_rate
+        self.metrics = metrics or {}
+        self.on_swap = on_swap
+
+        self.current = None
+        self.candidate = None
+        self._shadow_scored = 0
+        self._shadow_executor = None
+        self._swap_lock = threading.Lock()
+
+        self._seen_mtime = self._manifest_mtime()
+        self._failed_mtime = None
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+
+    # ----------------------------------------------------------------
+    # Active model
+    # ----------------------------------------------------------------
+    def activate(self, serving):
+        """Make `serving` the model every new request scores with"""
+        with self._swap_lock:
+            previous, self.current = self.current, serving
+            self.candidate = None
+            self._shadow_scored = 0
+
+        if "version" in self.metrics:
+            if previous is not None:
+                self.metrics["version"].labels(version=previous.version).set(0)
+            self.metrics["version"].labels(version=serving.version).set(1)
+        if self.on_swap is not None:
+            self.on_swap(serving)
+        # requests already queued on the old batcher are still scored by it
+        if previous is not None and previous.batcher is not None and previous.batcher is not serving.batcher:
+            previous.batcher.close()
+        return previous
+
+    # ----------------------------------------------------------------
+    # Watcher thread
+    # ----------------------------------------------------------------
+    def start(self):
+        """Start the watcher; safe to call on every request"""
+        # Threads do not survive fork, so a watcher started in a preloading
+        # master is restarted lazily inside each forked worker process.
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._worker_pid = os.getpid()
+                self._shadow_executor = None
+                self._worker = threading.Thread(target=self._run, name="model-registry", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval_s)
+            try:
+                self.poll()
+            except Exception as e:
+                print("❌ Model registry poll failed:", e)
+
+    def _manifest_mtime(self):
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def poll(self):
+        """Load, warm and stage (or swap in) a new model version if one has landed"""
+        mtime = self._manifest_mtime()
+        if mtime is None or mtime == self._failed_mtime:
+            return None
+        if mtime != self._seen_mtime:
+            # training may still be writing artifacts; wait for one quiet poll
+            self._seen_mtime = mtime
+            return None
+
+        pending = self.candidate or self.current
+        if pending is not None and self._read_version() == pending.version:
+            return None
+        return self._load_candidate(mtime)
+
+    def _read_version(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f).get("version", "unversioned")
+        except (OSError, ValueError):
+            return None
+
+    def _load_candidate(self, mtime):
+        started = time.perf_counter()
+        try:
+            candidate = self.load(self.model_dir)
+            self.warm(candidate.pipeline)
+        except Exception as e:
+            self._failed_mtime = mtime
+            self._observe_reload("failed")
+            print("❌ Model reload failed, keeping", self.current.version if self.current else None, "-", e)
+            return None
+
+        print(f"✅ Model {candidate.version} loaded and warmed in {time.perf_counter() - started:.2f}s")
+        if self.shadow_requests > 0 and self.current is not None:
+            if self.candidate is not None and self.candidate.batcher is not None:
+                self.candidate.batcher.close()
+            with self._swap_lock:
+                self.candidate = candidate
+                self._shadow_scored = 0
+            self._observe_reload("shadowing")
+            print(f"👥 Shadowing {candidate.version} on {self.shadow_requests} sampled requests")
+        else:
+            self._promote(candidate)
+        return candidate
+
+    def _promote(self, candidate):
+        previous = self.activate(candidate)
+        self._observe_reload("swapped")
+        print(f"🔄 Swapped model {previous.version if previous else None} → {candidate.version}")
+
+    def _observe_reload(self, result):
+        if "reloads" in self.metrics:
+            self.metrics["reloads"].labels(result=result).inc()
+
+    # ----------------------------------------------------------------
+    # Shadow scoring
+    # ----------------------------------------------------------------
+    def shadow(self, payload, probability):
+        """Score a sample of requests with the candidate, off the request path"""
+        candidate = self.candidate
+        if candidate is None or random.random() >= self.shadow_sample_rate:
+            return
+        if self._shadow_executor is None:
+            self._shadow_executor = ThreadPoolExecutor(1, thread_name_prefix="model-shadow")
+        # copied: form payloads belong to a request that will have ended
+        self._shadow_executor.submit(self._shadow_score, candidate, dict(payload), probability)
+
+    def _shadow_score(self, candidate, payload, probability):
+        started = time.perf_counter()
+        try:
+            shadow_probability = candidate.pipeline.score_one(payload)
+        except Exception as e:
+            print("❌ Shadow scoring failed:", e)
+            return
+        elapsed = time.perf_counter() - started
+
+        if "shadow_latency" in self.metrics:
+            self.metrics["shadow_latency"].observe(elapsed)
+        if "shadow_difference" in self.metrics:
+            self.metrics["shadow_difference"].observe(abs(shadow_probability - probability))
+        if "shadow_disagreements" in self.metrics and (shadow_probability >= 0.5) != (probability >= 0.5):
+            self.metrics["shadow_disagreements"].inc()
+
+        with self._swap_lock:
+            if self.candidate is not candidate:
+                return
+            self._shadow_scored += 1
+            done = self._shadow_scored >= self.shadow_requests
+        if done:
+            self._promote(candidate)
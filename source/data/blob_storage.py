@@ -0,0 +1,181 @@
+import base64
+import hashlib
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from source.exceptions import CustomException
+from source.logger import logging
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024  # 4 MB
+
+
+# ---------------------------------------------------------------------------
+# Local filesystem stand-in for an Azure container
+# ---------------------------------------------------------------------------
+class _LocalDownloader:
+    def __init__(self, path, chunk_size):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def chunks(self):
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def readall(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class LocalBlobClient:
+    def __init__(self, root, blob_name, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.blob_name = blob_name
+        self.path = os.path.join(root, blob_name)
+        self.chunk_size = chunk_size
+
+    def get_blob_properties(self):
+        return _local_properties(self.path, self.blob_name)
+
+    def download_blob(self, max_concurrency=1):
+        return _LocalDownloader(self.path, self.chunk_size)
+
+
+class LocalContainerClient:
+    """
+    Serves a directory through the subset of azure.storage.blob.ContainerClient
+    used by ingestion, so the pipeline can run against local files (or an
+    Azurite-style fixture directory) without an Azure account.
+    """
+
+    def __init__(self, root, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def list_blobs(self, name_starts_with=None):
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in sorted(file_names):
+                path = os.path.join(dir_path, file_name)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if name_starts_with is None or name.startswith(name_starts_with):
+                    yield _local_properties(path, name)
+
+    def get_blob_client(self, blob):
+        return LocalBlobClient(self.root, blob, self.chunk_size)
+
+
+def _local_properties(path, name):
+    stat = os.stat(path)
+    return SimpleNamespace(
+        name=name,
+        size=stat.st_size,
+        etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        content_settings=SimpleNamespace(content_md5=None),
+    )
+
+
+def get_container_client(container_name, connection_string=None, local_root=None):
+    """Azure container client, or the local stand-in when local_root is given"""
+    try:
+        if local_root:
+            return LocalContainerClient(os.path.join(local_root, container_name))
+
+        from azure.storage.blob import BlobServiceClient
+        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+        return blob_service_client.get_container_client(container_name)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+# ---------------------------------------------------------------------------
+# Download helpers
+# ---------------------------------------------------------------------------
+def list_parquet_blobs(container_client, prefix):
+    """Properties of every part-*.parquet blob under prefix, sorted by name"""
+    try:
+        blobs = [
+            blob for blob in container_client.list_blobs(name_starts_with=prefix)
+            if blob.name.split("/")[-1].startswith("part-") and blob.name.endswith(".parquet")
+        ]
+        return sorted(blobs, key=lambda blob: blob.name)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def download_blob_to_file(container_client, blob_name, local_path, max_concurrency=4) -> str:
+    """
+    Download a blob once, chunk by chunk, straight to disk.
+
+    The MD5 of the bytes written is checked against the blob's Content-MD5 when
+    the service has one, otherwise against its size; the file is only moved
+    into place after it verifies. Returns the hex MD5 of the file.
+    """
+    try:
+        blob_client = container_client.get_blob_client(blob_name)
+        properties = blob_client.get_blob_properties()
+
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        tmp_path = local_path + ".part"
+
+        digest = hashlib.md5()
+        size = 0
+        with open(tmp_path, "wb") as file:
+            for chunk in blob_client.download_blob(max_concurrency=max_concurrency).chunks():
+                digest.update(chunk)
+                file.write(chunk)
+                size += len(chunk)
+
+        expected_md5 = getattr(properties.content_settings, "content_md5", None)
+        if expected_md5 and bytes(expected_md5) != digest.digest():
+            os.remove(tmp_path)
+            raise ValueError(
+                f"Checksum mismatch for {blob_name}: expected "
+                f"{base64.b64encode(bytes(expected_md5)).decode()}, got {base64.b64encode(digest.digest()).decode()}"
+            )
+        if size != properties.size:
+            os.remove(tmp_path)
+            raise ValueError(f"Size mismatch for {blob_name}: expected {properties.size} bytes, got {size}")
+
+        os.replace(tmp_path, local_path)
+        logging.info(f"Downloaded {blob_name} ({size} bytes, md5 {digest.hexdigest()}) to {local_path}")
+
+        return digest.hexdigest()
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def local_blob_path(dest_dir, blob_name) -> str:
+    """
+    Where blob_name is stored under dest_dir: its full name is kept as a
+    relative path, so part files with the same name under different prefixes
+    (e.g. date=.../part-00000-<job>.parquet) never share a local file.
+    """
+    parts = [part for part in blob_name.split("/") if part]
+    if not parts or any(part in (".", "..") for part in parts):
+        raise ValueError(f"Blob name {blob_name!r} cannot be stored under {dest_dir}")
+    return os.path.join(dest_dir, *parts)
+
+
+def download_blobs(container_client, blob_names, dest_dir, max_workers=4, max_concurrency=4) -> list:
+    """Fetch several blobs in parallel; returns the local paths in blob_names order"""
+    try:
+        local_paths = [local_blob_path(dest_dir, name) for name in blob_names]
+        if len(set(local_paths)) != len(local_paths):
+            # parallel downloads to one path would race on its .part file
+            raise ValueError(f"Duplicate blob names in {blob_names}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(
+                lambda args: download_blob_to_file(container_client, *args, max_concurrency=max_concurrency),
+                zip(blob_names, local_paths),
+            ))
+        return local_paths
+
+    except Exception as e:
+        raise CustomException(e, sys)
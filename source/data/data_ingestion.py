@@ -1,16 +1,29 @@
 import pandas as pd
+import numpy as np
 import sys
 from source.exceptions import CustomException
 from source.logger import logging
 
 
 import os
+import shutil
+from datetime import datetime, timezone
 from azure.storage.blob import BlobServiceClient
+import pyarrow as pa
 import pyarrow.parquet as pq
 import io
 
 from sklearn.model_selection import train_test_split
-from source.utiles import save_csv_data
+from source.utiles import save_parquet_data, load_parquet_data, load_params, save_json, load_json, iter_parquet_batches
+from source.utiles.profiling import StageProfiler, profile_step
+from source.utiles.dtypes import apply_dtype_plan
+from source.data.blob_storage import (
+    get_container_client, list_parquet_blobs, download_blobs, local_blob_path
+)
+
+
+RAW_DIR = "./data/raw"
+MANIFEST_FILE = "manifest.json"
 
 
 def ingest_data(CONTAINER_NAME: str,BLOB_NAME: str,CONNECTION_STRING: str) -> pd.DataFrame:
@@ -29,9 +42,9 @@ def ingest_data(CONTAINER_NAME: str,BLOB_NAME: str,CONNECTION_STRING: str) -> pd
         LOCAL_FILE_PATH = os.path.join("data", BLOB_NAME.split("/")[-1])  # saves as data/orders.parquet
         os.makedirs(os.path.dirname(LOCAL_FILE_PATH), exist_ok=True)
 
-        # Download blob
+        # Keep a local copy of the bytes already downloaded
         with open(LOCAL_FILE_PATH, "wb") as file:
-            file.write(blob_client.download_blob().readall())
+            file.write(data)
 
         print(f"✅ Blob downloaded successfully and saved at: {LOCAL_FILE_PATH}")
 
@@ -49,6 +62,205 @@ def ingest_data(CONTAINER_NAME: str,BLOB_NAME: str,CONNECTION_STRING: str) -> pd
 
 
 
+def stream_ingest(container_client, prefix: str, out_path: str, params: dict) -> int:
+    """
+    Streaming ingestion: every part-*.parquet blob under prefix is downloaded
+    once, in chunks and in parallel, verified, and then copied into the raw
+    store row group by row group, so the full table is never held in memory.
+    Returns the number of rows written.
+    """
+    try:
+        blobs = list_parquet_blobs(container_client, prefix)
+        if not blobs:
+            raise FileNotFoundError(f"No part-*.parquet blobs found under '{prefix}'")
+
+        local_paths = download_blobs(
+            container_client,
+            [blob.name for blob in blobs],
+            params.get("download_dir", "data"),
+            max_workers=params.get("max_workers", 4),
+            max_concurrency=params.get("max_concurrency", 4),
+        )
+
+        schema = pq.read_schema(local_paths[0]).remove_metadata()
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+        n_rows = 0
+        with pq.ParquetWriter(out_path, schema, compression="snappy") as writer:
+            for batch in iter_parquet_batches(local_paths, params.get("batch_size", 65536)):
+                writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+                n_rows += batch.num_rows
+
+        logging.info(f"Streamed {n_rows} rows from {len(local_paths)} blob(s) into {out_path}")
+
+        return n_rows
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def partition_name(blob_name: str) -> str:
+    """
+    File name of a blob's partition in data/raw/{train,test}: the full blob
+    name flattened, since part file names repeat across date=... prefixes.
+    """
+    return "__".join(part for part in blob_name.split("/") if part)
+
+
+def remove_partition(raw_dir: str, partition: str) -> None:
+    for folder in ("train", "test"):
+        path = os.path.join(raw_dir, folder, partition)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def ingest_incremental(container_client, prefix: str, raw_dir: str, params: dict, test_size: float) -> dict:
+    """
+    Incremental ingestion driven by data/raw/manifest.json.
+
+    Each part-*.parquet blob is a partition of the raw store. Only blobs whose
+    name, etag or size is not in the manifest are downloaded, split and written
+    as new train/test partition files; partitions of blobs that disappeared are
+    removed. Unchanged partitions are left untouched on disk.
+    """
+    try:
+        manifest = load_json(os.path.join(raw_dir, MANIFEST_FILE), {"blobs": {}})
+        known = manifest["blobs"]
+
+        blobs = list_parquet_blobs(container_client, prefix)
+        current = {blob.name for blob in blobs}
+        changed = [
+            blob for blob in blobs
+            if known.get(blob.name, {}).get("etag") != blob.etag or known.get(blob.name, {}).get("size") != blob.size
+        ]
+        removed = [name for name in known if name not in current]
+
+        for name in removed:
+            remove_partition(raw_dir, known.pop(name)["partition"])
+            path = local_blob_path(os.path.join(raw_dir, "partitions"), name)
+            if os.path.exists(path):
+                os.remove(path)
+
+        local_paths = download_blobs(
+            container_client,
+            [blob.name for blob in changed],
+            os.path.join(raw_dir, "partitions"),
+            max_workers=params.get("max_workers", 4),
+            max_concurrency=params.get("max_concurrency", 4),
+        )
+
+        for blob, path in zip(changed, local_paths):
+            partition = partition_name(blob.name)
+            previous = known.get(blob.name, {}).get("partition")
+            if previous and previous != partition:
+                # written under the older basename naming
+                remove_partition(raw_dir, previous)
+            counts = stream_split(
+                [path],
+                os.path.join(raw_dir, "train", partition),
+                os.path.join(raw_dir, "test", partition),
+                test_size,
+                key=params.get("split_key", "order_id"),
+                batch_size=params.get("batch_size", 65536),
+            )
+
+            known[blob.name] = {
+                "etag": blob.etag,
+                "size": blob.size,
+                "rows": pq.ParquetFile(path).metadata.num_rows,
+                "partition": partition,
+                "split": counts,
+                "ingested_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+        save_json(manifest, "", MANIFEST_FILE, raw_dir)
+
+        totals = {"train": {}, "test": {}}
+        for entry in known.values():
+            for side, by_label in entry.get("split", {}).items():
+                for value, n in by_label.items():
+                    totals[side][value] = totals[side].get(value, 0) + n
+        save_split_report(totals, raw_dir)
+        logging.info(
+            f"Incremental ingestion: {len(changed)} new/changed, {len(removed)} removed, "
+            f"{len(blobs) - len(changed)} unchanged partition(s)"
+        )
+
+        return manifest
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def hash_split_mask(keys: pd.Series, labels: pd.Series, test_size: float) -> np.ndarray:
+    """
+    Deterministic train/test assignment: True for rows that belong to test.
+
+    Each row is placed by a 64-bit hash of its key and label, so the same row
+    always lands on the same side across reruns and incremental appends, and
+    within each label roughly test_size of the rows go to test.
+    """
+    if not 0 < test_size < 1:
+        raise ValueError(f"test_size must be between 0 and 1 (exclusive), got {test_size}")
+    combined = keys.astype(str).reset_index(drop=True) + "|" + labels.astype(str).reset_index(drop=True)
+    hashes = pd.util.hash_pandas_object(combined, index=False).to_numpy()
+    return hashes < np.uint64(test_size * 2**64)
+
+
+def stream_split(paths, train_path: str, test_path: str, test_size: float,
+                 key: str = "order_id", label: str = "is_returned", batch_size: int = 65536) -> dict:
+    """
+    Out-of-core stratified split of Parquet files into train and test files.
+
+    Rows are routed batch by batch with hash_split_mask, so memory stays
+    bounded by batch_size. Returns the rows per label for each side.
+    """
+    try:
+        schema = pq.read_schema(paths[0]).remove_metadata()
+        counts = {"train": {}, "test": {}}
+
+        os.makedirs(os.path.dirname(train_path), exist_ok=True)
+        os.makedirs(os.path.dirname(test_path), exist_ok=True)
+
+        with pq.ParquetWriter(train_path, schema, compression="snappy") as train_writer, \
+                pq.ParquetWriter(test_path, schema, compression="snappy") as test_writer:
+            for batch in iter_parquet_batches(paths, batch_size):
+                table = pa.Table.from_batches([batch]).cast(schema)
+                keys = table.column(key).to_pandas()
+                labels = table.column(label).to_pandas()
+                is_test = hash_split_mask(keys, labels, test_size)
+
+                for side, mask, writer in (("test", is_test, test_writer), ("train", ~is_test, train_writer)):
+                    writer.write_table(table.filter(pa.array(mask)))
+                    for value, n in labels[mask].value_counts().items():
+                        counts[side][str(value)] = counts[side].get(str(value), 0) + int(n)
+
+        return counts
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def split_report(counts: dict) -> dict:
+    """Rows and achieved class ratios per split from {split: {label: rows}} counts"""
+    report = {}
+    for side, by_label in counts.items():
+        total = sum(by_label.values())
+        report[side] = {
+            "rows": total,
+            "class_counts": dict(sorted(by_label.items())),
+            "class_ratios": {k: round(v / total, 6) if total else 0.0 for k, v in sorted(by_label.items())},
+        }
+    return report
+
+
+def save_split_report(counts: dict, raw_dir: str) -> None:
+    report = split_report(counts)
+    save_json(report, "", "split_report.json", raw_dir)
+    for side, stats in report.items():
+        logging.info(f"{side} split: {stats['rows']} rows, class ratios {stats['class_ratios']}")
+
+
 def split_data(X: pd.DataFrame, y: pd.DataFrame,test_size: int) -> pd.DataFrame:
 
     try:
@@ -69,24 +281,56 @@ def split_data(X: pd.DataFrame, y: pd.DataFrame,test_size: int) -> pd.DataFrame:
 def main():
     try:
         logging.info("Stage : Data Ingestion Started")
+        params = load_params("data_ingestion")
+
         CONNECTION_STRING = os.getenv('CONNECTION_STRING')
-        CONTAINER_NAME = "gold"
-        BLOB_NAME = "final_df/part-00000-1ac71545-82f8-44e5-a0d8-6a0299dccc3f.c000.snappy.parquet"   # example parquet file
+        CONTAINER_NAME = params.get("container", "gold")
+        BLOB_NAME = params.get("blob_name", "final_df/part-00000-1ac71545-82f8-44e5-a0d8-6a0299dccc3f.c000.snappy.parquet")   # example parquet file
+        test_size = params.get("test_size", 0.2)
+
+        if params.get("incremental", False):
+            container_client = get_container_client(CONTAINER_NAME, CONNECTION_STRING, params.get("local_root"))
+            with profile_step("ingest_incremental"):
+                ingest_incremental(container_client, params.get("prefix", "final_df/"), RAW_DIR, params, test_size)
+            logging.info("Stage : Data Ingestion Completed")
+            return
+
+        # a full run replaces whatever an incremental run left behind
+        shutil.rmtree(RAW_DIR, ignore_errors=True)
+
+        if params.get("mode", "eager") == "streaming":
+            container_client = get_container_client(CONTAINER_NAME, CONNECTION_STRING, params.get("local_root"))
+            raw_path = os.path.join(RAW_DIR, "raw_data.parquet")
+            with profile_step("stream_ingest"):
+                stream_ingest(container_client, params.get("prefix", "final_df/"), raw_path, params)
+
+            with profile_step("split"):
+                counts = stream_split(
+                    [raw_path],
+                    os.path.join(RAW_DIR, "train", "part-00000.parquet"),
+                    os.path.join(RAW_DIR, "test", "part-00000.parquet"),
+                    test_size,
+                    key=params.get("split_key", "order_id"),
+                    batch_size=params.get("batch_size", 65536),
+                )
+            save_split_report(counts, RAW_DIR)
+
+            logging.info("Stage : Data Ingestion Completed")
+            return
 
-        df = ingest_data(CONTAINER_NAME,BLOB_NAME,CONNECTION_STRING)
-        test_size = 0.2
+        with profile_step("download") as step:
+            df = apply_dtype_plan(ingest_data(CONTAINER_NAME,BLOB_NAME,CONNECTION_STRING))
+            save_parquet_data(df,"raw","raw_data.parquet","./data")
+            step["rows_out"] = len(df)
 
-        save_csv_data(df,"raw","raw_data.csv","./data")
+        with profile_step("split", rows_in=len(df)):
+            X = df.drop("is_returned",axis=1)
+            y = df["is_returned"]
 
-        X = df.drop("is_returned",axis=1)
-        y = df["is_returned"]
-        
-        train_data ,test_data = split_data(X, y ,test_size)
-        
-        
+            train_data ,test_data = split_data(X, y ,test_size)
 
-        save_csv_data(train_data,"raw","train_data.csv","./data")
-        save_csv_data(test_data,"raw","test_data.csv","./data")
+            save_parquet_data(train_data,"train","part-00000.parquet",RAW_DIR)
+            save_parquet_data(test_data,"test","part-00000.parquet",RAW_DIR)
 
         logging.info("Stage : Data Ingestion Completed")
 
@@ -96,4 +340,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with StageProfiler("data_ingestion", outputs=[os.path.join(RAW_DIR, "train"), os.path.join(RAW_DIR, "test")]):
+        main()
\ No newline at end of file
@@ -1,43 +1,133 @@
 from source.exceptions import CustomException
 from source.logger import logging
 import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import numpy as np
 
-from source.utiles import save_csv_data
+from source.utiles import save_parquet_data, load_parquet_data, save_json, load_json, load_params
+from source.utiles.cache import run_cached, project_modules, code_fingerprint
+from source.utiles.profiling import StageProfiler, profile_step
+from source.utiles.dtypes import apply_dtype_plan, frame_bytes, record_dtype_plan, DATE_FORMATS
+
+MANIFEST_FILE = "manifest.json"
 
 
 def preprocess_data(data: pd.DataFrame) -> pd.DataFrame :
     try:
-        data.drop(['return_id','return_date','pickup_delay_days','order_id','product_id','customer_id'], axis = 1, inplace = True)
+        # unlabeled orders (batch scoring) come without the return columns
+        data.drop(['return_id','return_date','pickup_delay_days','order_id','product_id','customer_id'], axis = 1, inplace = True, errors = 'ignore')
 
+        # parsed once here; Parquet keeps them as native timestamps for later stages
         date_col = ['order_date','delivery_date','join_date']
         for col in date_col:
-            data[col] = pd.to_datetime(data[col])
+            if not pd.api.types.is_datetime64_any_dtype(data[col]):
+                data[col] = pd.to_datetime(data[col], format=DATE_FORMATS[col])
 
+        # stored dictionary-encoded, so they load back as categoricals downstream
         obj_col = ['is_returned','order_month','order_year','is_expensive']
-        for col in obj_col:
-            data[col] = data[col].astype('object')
+        for col in [c for c in obj_col if c in data.columns]:
+            data[col] = data[col].astype('category')
 
         return data
 
     except Exception as e:
         raise CustomException (e,sys)
 
-def main():
+def preprocess_partition(src_dir: str, dst_dir: str, partition: str) -> tuple:
+    """Preprocess one partition; returns its frame's memory before and after the dtype plan"""
+    df = load_parquet_data(os.path.join(src_dir, partition))
+    before = frame_bytes(df)
+    # measured here and recorded by the caller, which may be another process
+    df = apply_dtype_plan(df, record=False)
+    after = frame_bytes(df)
+
+    df = preprocess_data(df)
+    save_parquet_data(df, os.path.basename(dst_dir), partition, os.path.dirname(dst_dir))
+    return before, after
+
+
+def preprocess_partitions(src_dir: str, dst_dir: str, processed: dict, n_workers: int = 1,
+                          force: bool = False) -> dict:
+    """
+    Preprocess every Parquet partition of src_dir into dst_dir.
+
+    preprocess_data is row-wise, so partitions whose source file is unchanged
+    since the last run (same size and mtime as recorded in `processed`) are
+    skipped and only the delta is written; outputs of vanished sources are
+    removed. Partitions are independent, so with n_workers > 1 they are
+    preprocessed concurrently on a process pool. With `force` (the code or
+    params changed since `processed` was recorded) every partition is
+    rewritten. Returns the updated {partition: fingerprint} record.
+    """
     try:
-        logging.info("Stage : Data Preprocessing Started")
+        sources = sorted(f for f in os.listdir(src_dir) if f.endswith(".parquet")) if os.path.isdir(src_dir) else []
+        updated = {}
+        pending = []
+
+        for partition in sources:
+            stat = os.stat(os.path.join(src_dir, partition))
+            fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            updated[partition] = fingerprint
+
+            if not force and processed.get(partition) == fingerprint and os.path.exists(os.path.join(dst_dir, partition)):
+                continue
+
+            pending.append(partition)
+
+        if n_workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(min(n_workers, len(pending))) as executor:
+                memory = list(executor.map(preprocess_partition, [src_dir] * len(pending), [dst_dir] * len(pending), pending))
+        else:
+            memory = [preprocess_partition(src_dir, dst_dir, partition) for partition in pending]
+
+        for before, after in memory:
+            record_dtype_plan(before, after)
+        if memory:
+            before, after = (sum(m) / 2**20 for m in zip(*memory))
+            logging.info(f"Dtype plan shrank {src_dir} frames from {before:.1f} MB to {after:.1f} MB")
 
-        train_df = pd.read_csv("./data/raw/train_data.csv")
-        test_df = pd.read_csv("./data/raw/test_data.csv")
+        for partition in set(processed) - set(updated):
+            path = os.path.join(dst_dir, partition)
+            if os.path.exists(path):
+                os.remove(path)
 
-        preprocess_train_df = preprocess_data(train_df)
-        preprocess_test_df = preprocess_data(test_df)
+        logging.info(f"Preprocessed {len(pending)} of {len(sources)} partition(s) in {src_dir}")
 
-        save_csv_data(preprocess_train_df, "preprocessed", "preprocessed_train.csv", "./data")
-        save_csv_data(preprocess_test_df, "preprocessed", "preprocessed_test.csv", "./data")
+        return updated
+
+    except Exception as e:
+        raise CustomException (e,sys)
+
+
+def main():
+    try:
+        logging.info("Stage : Data Preprocessing Started")
 
+        manifest = load_json(os.path.join("./data/preprocessed", MANIFEST_FILE), {})
+        params = load_params("data_preprocessing")
+        n_workers = params.get("n_workers", 1) or os.cpu_count()
+
+        # partitions are only skipped when the code and params that wrote them are unchanged
+        code = code_fingerprint(project_modules(), {k: v for k, v in params.items() if k != "n_workers"})
+        force = manifest.get("code") != code
+        if force and manifest:
+            logging.info("Preprocessing code or params changed, reprocessing every partition")
+        manifest["code"] = code
+
+        for split in ("train", "test"):
+            with profile_step(f"preprocess_{split}"):
+                manifest[split] = preprocess_partitions(
+                    os.path.join("./data/raw", split),
+                    os.path.join("./data/preprocessed", split),
+                    manifest.get(split, {}),
+                    n_workers,
+                    force,
+                )
+
+        save_json(manifest, "", MANIFEST_FILE, "./data/preprocessed")
 
         logging.info("Stage : Data Preprocessing Completed")
 
@@ -47,4 +137,11 @@ def main():
 
 
 if __name__ =="__main__":
-    main()
\ No newline at end of file
+    with StageProfiler("data_preprocessing", inputs=["./data/raw/train", "./data/raw/test"],
+                       outputs=["./data/preprocessed"]):
+        run_cached(
+            "data_preprocessing", main,
+            deps=["./data/raw/train", "./data/raw/test"],
+            params=["data_preprocessing"],
+            outs=["./data/preprocessed"],
+        )
\ No newline at end of file
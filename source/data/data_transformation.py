@@ -1,29 +1,42 @@
 import pandas as pd
 import numpy as np
 import sys
+import os
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import scipy.sparse as sp
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from source.exceptions import CustomException
 from source.logger import logging
 
-from source.utiles import save_numpyArr_data
+from source.utiles import (
+    save_numpyArr_data, save_sparse_data, save_model, load_params, load_parquet_data, table_to_pandas,
+    iter_parquet_batches,
+)
+from source.utiles.cache import run_cached
+from source.utiles.profiling import StageProfiler, profile_step
+from source.utiles.dtypes import apply_dtype_plan
 
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.impute import SimpleImputer
 
-def transform_data_obj(data: pd.DataFrame):
+def transform_data_obj(data: pd.DataFrame, sparse_output: bool = False):
     try:
-        date_col = ['order_date','delivery_date','join_date']
-        for col in date_col:
-            data[col] = pd.to_datetime(data[col])
-
+        # Parquet input already carries native timestamps and categoricals;
+        # only frames coming from elsewhere still need the cast.
         obj_col = ['order_month','order_year','is_expensive']
         for col in obj_col:
-            data[col] = data[col].astype('object')
+            if not isinstance(data[col].dtype, pd.CategoricalDtype):
+                data[col] = data[col].astype('category')
 
-        numerical_cols = data.select_dtypes(include=['int32', 'float32','float64']).columns.tolist()
-        categorical_cols = data.select_dtypes(include=['object']).columns.tolist()
+        # the dtype plan narrows counts to int8/int16, so select every numeric width
+        numerical_cols = data.select_dtypes(include=['number']).columns.tolist()
+        categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
         logging.info(numerical_cols)
         logging.info(categorical_cols)
 
@@ -40,6 +53,8 @@ def transform_data_obj(data: pd.DataFrame):
                     ("num", num_pipeline, numerical_cols),
                     ("cat", cat_pipeline, categorical_cols)
                 ],
+                # in sparse mode the one-hot block must never be densified
+                sparse_threshold=1.0 if sparse_output else 0.3,
             )
         
         return preprocessor
@@ -48,42 +63,164 @@ def transform_data_obj(data: pd.DataFrame):
         raise CustomException (e,sys)
 
 
-def main():
+# ----------------------------------------------------------------
+# Parallel, chunked transform
+# ----------------------------------------------------------------
+_worker_preprocessor = None
+
+
+def _init_worker(preprocessor):
+    # the fitted preprocessor is shipped once per worker, not once per chunk
+    global _worker_preprocessor
+    _worker_preprocessor = preprocessor
+
+
+def _transform_chunk(batch):
+    data = apply_dtype_plan(table_to_pandas(pa.Table.from_batches([batch])))
+    X = data.drop("is_returned",axis=1)
+    return _worker_preprocessor.transform(X), data["is_returned"].to_numpy()
+
+
+def parallel_transform(preprocessor, src_dir: str, n_workers: int, chunk_size: int):
+    """
+    Transform the Parquet partitions in src_dir chunk by chunk on a process
+    pool, yielding (X_chunk, y_chunk) in input order. At most 2 * n_workers
+    chunks are in flight, so memory stays bounded by the chunk size.
+    """
     try:
-        logging.info("Stage : Transformation Started")
+        paths = [os.path.join(src_dir, f) for f in sorted(os.listdir(src_dir)) if f.endswith(".parquet")]
 
-        processed_train_df = pd.read_csv("./data/preprocessed/preprocessed_train.csv")
-        processed_test_df = pd.read_csv("./data/preprocessed/preprocessed_test.csv")
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(preprocessor,)) as executor:
+            pending = deque()
+            for batch in iter_parquet_batches(paths, chunk_size):
+                pending.append(executor.submit(_transform_chunk, batch))
+                if len(pending) >= 2 * n_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
 
-        X_train = processed_train_df.drop("is_returned",axis=1)
-        y_train = processed_train_df["is_returned"]
+    except Exception as e:
+        raise CustomException (e,sys)
 
-        X_test = processed_test_df.drop("is_returned",axis=1)
-        y_test = processed_test_df["is_returned"]
 
-        preprocessor = transform_data_obj(X_train)
-        
-        logging.info("Transforming data")
-        
+def count_rows(src_dir: str) -> int:
+    return sum(pq.ParquetFile(os.path.join(src_dir, f)).metadata.num_rows
+               for f in os.listdir(src_dir) if f.endswith(".parquet"))
 
-        X_train_transformed = preprocessor.fit_transform(X_train)
-        X_test_transformed = preprocessor.transform(X_test)
-        logging.info("Data transformed")
 
-        # FIX: Convert the sparse matrix output to a dense NumPy array using .toarray()
-        X_train_transformed = preprocessor.fit_transform(X_train).toarray()
-        X_test_transformed = preprocessor.transform(X_test).toarray()
-        
+def remove_other_layouts(split: str, sparse_output: bool, path: str = "./data/transformed") -> None:
+    """
+    Delete a split's files in the layouts not being written. load_transformed_data
+    prefers X_{split}.npz, so one left by an earlier sparse run would otherwise
+    be read next to a fresh y_{split}.npy.
+    """
+    stale = [f"transformed_{split}.npy", f"X_{split}.npy" if sparse_output else f"X_{split}.npz"]
+    for file_name in stale:
+        file_path = os.path.join(path, file_name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            logging.info(f"Removed {file_path} left by a run in another layout")
 
-        y_train_array = np.array(y_train).reshape(-1, 1)
-        y_test_array = np.array(y_test).reshape(-1, 1)
 
+def write_transformed(chunks, split: str, n_rows: int, n_features: int, sparse_output: bool,
+                      path: str = "./data/transformed") -> None:
+    """Write (X, y) chunks, in order, into the sparse or dense transformed layout of a split"""
+    try:
+        os.makedirs(path, exist_ok=True)
+        remove_other_layouts(split, sparse_output, path)
+
+        if sparse_output:
+            # CSR features and labels are stored separately so nothing is ever densified
+            X_parts, y_parts = [], []
+            for X, y in chunks:
+                X_parts.append(sp.csr_matrix(X))
+                y_parts.append(np.asarray(y))
+            X = sp.vstack(X_parts, format="csr") if X_parts else sp.csr_matrix((0, n_features))
+            save_sparse_data(X, "", f"X_{split}.npz", path)
+            save_numpyArr_data(np.concatenate(y_parts) if y_parts else np.empty(0), "", f"y_{split}.npy", path)
+            return
+
+        # dense: features and labels in separate, row-aligned .npy files that
+        # later stages memory-map; each chunk is written straight into its rows
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        y_dtype = np.asarray(first[1]).dtype if first is not None else np.float64
+        X_out = np.lib.format.open_memmap(
+            os.path.join(path, f"X_{split}.npy"), mode="w+", dtype=np.float64, shape=(n_rows, n_features)
+        )
+        y_out = np.lib.format.open_memmap(
+            os.path.join(path, f"y_{split}.npy"), mode="w+", dtype=y_dtype, shape=(n_rows,)
+        )
+        offset = 0
+        for X, y in itertools.chain([first] if first is not None else [], chunks):
+            # FIX: Convert the sparse matrix output to a dense NumPy array using .toarray()
+            X = X.toarray() if sp.issparse(X) else X
+            X_out[offset:offset + X.shape[0]] = X
+            y_out[offset:offset + X.shape[0]] = np.asarray(y)
+            offset += X.shape[0]
+        X_out.flush()
+        y_out.flush()
+        del X_out, y_out
+
+    except Exception as e:
+        raise CustomException (e,sys)
+
+
+def main():
+    try:
+        logging.info("Stage : Transformation Started")
+
+        params = load_params("data_transformation")
+        sparse_output = params.get("sparse", False)
+        n_workers = params.get("n_workers", 1) or os.cpu_count()
+        chunk_size = params.get("chunk_size", 50000)
+
+        with profile_step("load") as step:
+            processed_train_df = apply_dtype_plan(load_parquet_data("./data/preprocessed/train"))
+            step["rows_out"] = len(processed_train_df)
+
+        X_train = processed_train_df.drop("is_returned",axis=1)
+        y_train = processed_train_df["is_returned"]
 
-        transformed_train_df = np.c_[X_train_transformed,y_train_array]
-        transformed_test_df = np.c_[X_test_transformed,y_test_array]
+        preprocessor = transform_data_obj(X_train, sparse_output)
+        
+        logging.info("Transforming data")
 
-        save_numpyArr_data(transformed_train_df, "transformed", "transformed_train.npy", "./data")
-        save_numpyArr_data(transformed_test_df, "transformed", "transformed_test.npy", "./data")
+        if n_workers > 1:
+            # only the fit needs a frame; both splits are then streamed from disk
+            with profile_step("fit", rows_in=len(X_train)):
+                preprocessor.fit(X_train)
+            del processed_train_df, X_train, y_train
+            n_features = len(preprocessor.get_feature_names_out())
+
+            for split in ("train", "test"):
+                src_dir = os.path.join("./data/preprocessed", split)
+                with profile_step(f"transform_{split}", rows_in=count_rows(src_dir)):
+                    chunks = parallel_transform(preprocessor, src_dir, n_workers, chunk_size)
+                    write_transformed(chunks, split, count_rows(src_dir), n_features, sparse_output)
+
+            logging.info(f"Data transformed on {n_workers} workers in chunks of {chunk_size} rows")
+
+        else:
+            with profile_step("fit_transform_train", rows_in=len(X_train)):
+                X_train_transformed = preprocessor.fit_transform(X_train)
+                n_features = X_train_transformed.shape[1]
+                write_transformed([(X_train_transformed, y_train)], "train", X_train_transformed.shape[0], n_features, sparse_output)
+            del processed_train_df, X_train, y_train, X_train_transformed
+
+            with profile_step("load_test") as step:
+                processed_test_df = apply_dtype_plan(load_parquet_data("./data/preprocessed/test"))
+                step["rows_out"] = len(processed_test_df)
+            X_test = processed_test_df.drop("is_returned",axis=1)
+            y_test = processed_test_df["is_returned"]
+
+            with profile_step("transform_test", rows_in=len(X_test)):
+                X_test_transformed = preprocessor.transform(X_test)
+                write_transformed([(X_test_transformed, y_test)], "test", X_test_transformed.shape[0], n_features, sparse_output)
+            logging.info("Data transformed")
+
+        # the fitted preprocessor is needed downstream to export the scoring kernel
+        save_model(preprocessor, "preprocessor.pkl", "./data/transformed")
 
         logging.info("Stage : Transformation Completed")
 
@@ -92,4 +229,11 @@ def main():
     
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with StageProfiler("data_transformation", inputs=["./data/preprocessed/train", "./data/preprocessed/test"],
+                       outputs=["./data/transformed"]):
+        run_cached(
+            "data_transformation", main,
+            deps=["./data/preprocessed/train", "./data/preprocessed/test"],
+            params=["data_transformation"],
+            outs=["./data/transformed"],
+        )
\ No newline at end of file
@@ -0,0 +1,166 @@
+from source.exceptions import CustomException
+from source.logger import logging
+import sys
+import os
+import shutil
+
+import pandas as pd
+import numpy as np
+
+from source.utiles import save_json, load_params
+from source.utiles.cache import run_cached
+from source.utiles.profiling import StageProfiler, profile_step
+
+INDEX_DIR = "./feature_index"
+SOURCE_DIR = "./Data_Engineering/data"
+KEYS_FILE = "keys.npy"
+META_FILE = "meta.json"
+
+# the gold table's customer_age_group, derived from age at build time
+AGE_GROUP_BINS = [0, 24, 39, 59, np.inf]
+AGE_GROUP_LABELS = ["18-24", "25-39", "40-59", "60+"]
+
+
+def customer_age_group(age: pd.Series) -> pd.Series:
+    return pd.cut(age, bins=AGE_GROUP_BINS, labels=AGE_GROUP_LABELS).astype(str)
+
+
+def smallest_int_dtype(n_values: int):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_values <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def build_table_index(data: pd.DataFrame, key: str, out_dir: str) -> dict:
+    """
+    Write one table as a memory-mappable index: the keys sorted as a
+    fixed-width bytes array, plus one aligned .npy column per attribute.
+
+    Numeric columns keep a compact native dtype; everything else (strings,
+    dates as ISO text) is dictionary-encoded into the smallest integer codes
+    with the vocabulary stored in meta.json. Lookups binary-search keys.npy
+    and gather the row from each column without pandas.
+    """
+    try:
+        # sorted as the stored bytes, which is the order lookups binary-search in;
+        # numeric or mixed ids sort differently as values
+        keys = data[key].astype(str).str.encode("utf-8").to_numpy().astype(bytes)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        if len(keys) and (keys[1:] == keys[:-1]).any():
+            raise ValueError(f"Duplicate {key} values in the feature index source")
+
+        data = data.iloc[order].reset_index(drop=True)
+        os.makedirs(out_dir, exist_ok=True)
+        np.save(os.path.join(out_dir, KEYS_FILE), keys)
+
+        columns = {}
+        for col in data.columns.drop(key):
+            values = data[col]
+            if pd.api.types.is_bool_dtype(values) or not pd.api.types.is_numeric_dtype(values):
+                codes, vocabulary = pd.factorize(values.astype(str), sort=True)
+                array = codes.astype(smallest_int_dtype(len(vocabulary)))
+                columns[col] = {"kind": "dictionary", "dtype": array.dtype.str, "values": vocabulary.tolist()}
+            elif pd.api.types.is_integer_dtype(values):
+                array = pd.to_numeric(values, downcast="integer").to_numpy()
+                columns[col] = {"kind": "numeric", "dtype": array.dtype.str}
+            else:
+                array = values.to_numpy(dtype=np.float32)
+                columns[col] = {"kind": "numeric", "dtype": array.dtype.str}
+            np.save(os.path.join(out_dir, f"{col}.npy"), array)
+
+        meta = {"key": key, "n_rows": int(len(data)), "key_dtype": keys.dtype.str, "columns": columns}
+        save_json(meta, "", META_FILE, out_dir)
+        return meta
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def source_path(source: str, name: str) -> str:
+    """
+    A generated source table: <source>/<name>/ Parquet parts (data_generation's
+    default) or <source>/<name>.csv, the same lookup build_gold uses.
+    """
+    parquet_dir = os.path.join(source, name)
+    if os.path.isdir(parquet_dir):
+        return parquet_dir
+    csv_path = os.path.join(source, f"{name}.csv")
+    if os.path.exists(csv_path):
+        return csv_path
+    raise FileNotFoundError(f"Neither {parquet_dir}/ nor {csv_path} exists")
+
+
+def read_source(source: str, name: str) -> pd.DataFrame:
+    path = source_path(source, name)
+    return pd.read_parquet(path) if os.path.isdir(path) else pd.read_csv(path)
+
+
+def load_sources(params: dict) -> dict:
+    source = params.get("source", SOURCE_DIR)
+    customers = read_source(source, "customers")
+    customers["customer_age_group"] = customer_age_group(customers["age"])
+
+    # product_id is a foreign key in orders; the catalogue row is the source of truth
+    products = read_source(source, "products")
+
+    return {"customers": (customers, "customer_id"), "products": (products, "product_id")}
+
+
+def build_feature_index(tables: dict, index_dir: str = INDEX_DIR) -> dict:
+    """
+    Build every table under a staging directory and swap it in with renames,
+    so an app with the previous index memory-mapped keeps reading intact files.
+    """
+    try:
+        staging = index_dir.rstrip("/") + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+
+        summary = {}
+        for name, (data, key) in tables.items():
+            with profile_step(f"index_{name}", rows_in=len(data)):
+                meta = build_table_index(data, key, os.path.join(staging, name))
+            summary[name] = {"key": key, "n_rows": meta["n_rows"], "columns": list(meta["columns"])}
+            logging.info(f"Indexed {meta['n_rows']} {name} by {key} ({len(meta['columns'])} columns)")
+
+        save_json(summary, "", "index.json", staging)
+
+        retired = index_dir.rstrip("/") + ".old"
+        shutil.rmtree(retired, ignore_errors=True)
+        if os.path.exists(index_dir):
+            os.rename(index_dir, retired)
+        os.rename(staging, index_dir)
+        shutil.rmtree(retired, ignore_errors=True)
+
+        return summary
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def main():
+    try:
+        logging.info("Stage : Feature Index Started")
+
+        params = load_params("feature_index")
+        build_feature_index(load_sources(params), params.get("dir", INDEX_DIR))
+
+        logging.info("Stage : Feature Index Completed")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    params = load_params("feature_index")
+    source = params.get("source", SOURCE_DIR)
+    sources = [source_path(source, "customers"), source_path(source, "products")]
+    index_dir = params.get("dir", INDEX_DIR)
+    with StageProfiler("feature_index", inputs=sources, outputs=[index_dir]):
+        run_cached(
+            "feature_index", main,
+            deps=sources,
+            params=["feature_index"],
+            outs=[index_dir],
+        )
@@ -0,0 +1,255 @@
+"""
+Offline bulk scoring of an order dataset with the trained model.
+
+    python -m source.model.batch_scoring --input data/raw/test --output scores/
+    python -m source.model.batch_scoring --input orders.parquet --output scores/ --n-workers 8
+
+Every (file, row group) of the input Parquet dataset is one unit of work: a
+worker process streams it in batches through preprocess_data, the saved
+preprocessor and the model, and writes <output>/part-<file>-rg<NNNNN>.parquet
+with order_id and return_probability. Completed units are recorded in
+<output>/_progress.json, so an interrupted run picks up where it stopped.
+Defaults come from the batch_scoring section of params.yaml.
+"""
+from source.logger import logging
+from source.exceptions import CustomException
+import argparse
+import sys
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+import joblib
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from source.utiles import save_json, load_json, load_params, table_to_pandas
+from source.utiles.profiling import StageProfiler, profile_step
+from source.utiles.dtypes import apply_dtype_plan
+from source.data.data_preprocessing import preprocess_data
+
+PROGRESS_FILE = "_progress.json"
+ID_COLUMN = "order_id"
+OUTPUT_SCHEMA = pa.schema([(ID_COLUMN, pa.string()), ("return_probability", pa.float64())])
+
+
+def load_scoring_artifacts(model_dir: str = "./models"):
+    """(preprocessor, model, version) resolved through the model manifest"""
+    try:
+        manifest = load_json(os.path.join(model_dir, "model_manifest.json"), {})
+        artifacts = manifest.get("artifacts", {})
+        model = joblib.load(os.path.join(model_dir, artifacts.get("model", "lr_model.pkl")))
+        preprocessor = joblib.load(os.path.join(model_dir, artifacts.get("preprocessor", "preprocessor.pkl")))
+        return preprocessor, model, manifest.get("version", "unversioned")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def list_units(input_path: str) -> list:
+    """(path, row_group, n_rows) for every row group of a Parquet file or directory"""
+    try:
+        if os.path.isdir(input_path):
+            paths = [os.path.join(root, f) for root, _, files in sorted(os.walk(input_path))
+                     for f in sorted(files) if f.endswith(".parquet")]
+        else:
+            paths = [input_path]
+
+        units = []
+        for path in paths:
+            metadata = pq.ParquetFile(path).metadata
+            for row_group in range(metadata.num_row_groups):
+                units.append((path, row_group, metadata.row_group(row_group).num_rows))
+        return units
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def unit_name(input_path: str, path: str, row_group: int) -> str:
+    """Output file for a unit; stable across runs so a rerun overwrites rather than duplicates"""
+    base = os.path.relpath(path, input_path) if os.path.isdir(input_path) else os.path.basename(path)
+    stem = base[:-len(".parquet")].replace(os.sep, "__")
+    return f"part-{stem}-rg{row_group:05d}.parquet"
+
+
+def score_frame(data: pd.DataFrame, preprocessor, model) -> np.ndarray:
+    """Return probabilities for raw gold rows, prepared exactly as for training"""
+    X = preprocess_data(data).drop("is_returned", axis=1, errors="ignore")
+
+    # columns the model was trained on but unlabeled orders lack (return_reason)
+    # go in as missing and are imputed like any other gap
+    expected = getattr(preprocessor, "feature_names_in_", None)
+    if expected is not None and not set(expected).issubset(X.columns):
+        X = X.reindex(columns=expected)
+
+    return model.predict_proba(preprocessor.transform(X))[:, 1]
+
+
+# ----------------------------------------------------------------
+# Worker processes
+# ----------------------------------------------------------------
+_worker_artifacts = None
+
+
+def _init_worker(model_dir):
+    # each worker loads the artifacts once instead of receiving them per unit
+    global _worker_artifacts
+    preprocessor, model, _ = load_scoring_artifacts(model_dir)
+    _worker_artifacts = (preprocessor, model)
+
+
+def score_unit(path: str, row_group: int, out_path: str, batch_size: int) -> int:
+    """Score one row group batch by batch into out_path; returns the rows written"""
+    preprocessor, model = _worker_artifacts
+    # dot-prefixed, so Parquet dataset readers skip it until it is complete
+    tmp_path = os.path.join(os.path.dirname(out_path), f".{os.path.basename(out_path)}.tmp")
+    n_rows = 0
+
+    with pq.ParquetWriter(tmp_path, OUTPUT_SCHEMA, compression="snappy") as writer:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, row_groups=[row_group]):
+            data = apply_dtype_plan(table_to_pandas(pa.Table.from_batches([batch])), record=False)
+            order_ids = data[ID_COLUMN].astype(str).to_numpy()
+            probabilities = score_frame(data, preprocessor, model)
+            writer.write_table(pa.table({ID_COLUMN: order_ids, "return_probability": probabilities},
+                                        schema=OUTPUT_SCHEMA))
+            n_rows += len(order_ids)
+
+    # a killed worker leaves only a .tmp behind, never a truncated part
+    os.replace(tmp_path, out_path)
+    return n_rows
+
+
+# ----------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------
+def _fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def save_progress(progress: dict, output_dir: str) -> None:
+    # replaced atomically: a run killed mid-write keeps the previous record
+    save_json(progress, "", PROGRESS_FILE + ".tmp", output_dir)
+    os.replace(os.path.join(output_dir, PROGRESS_FILE + ".tmp"), os.path.join(output_dir, PROGRESS_FILE))
+
+
+def load_progress(output_dir: str, version: str, restart: bool) -> dict:
+    progress = load_json(os.path.join(output_dir, PROGRESS_FILE), None)
+    if progress is None or restart:
+        return {"model_version": version, "completed": {}}
+    if progress.get("model_version") != version:
+        raise ValueError(
+            f"{output_dir} holds scores from model {progress.get('model_version')}, not {version}; "
+            "rerun with --restart to rescore everything"
+        )
+    return progress
+
+
+def run_batch_scoring(input_path: str, output_dir: str, model_dir: str = "./models",
+                      n_workers: int = 1, batch_size: int = 65536, restart: bool = False) -> dict:
+    """
+    Score every row group of input_path into output_dir on a process pool,
+    skipping units already completed by a previous run with the same model
+    and unchanged input file. At most 2 * n_workers units are in flight.
+    """
+    try:
+        _, _, version = load_scoring_artifacts(model_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        progress = load_progress(output_dir, version, restart)
+        completed = progress["completed"]
+
+        units = list_units(input_path)
+        pending = deque()
+        for path, row_group, n_rows in units:
+            name = unit_name(input_path, path, row_group)
+            fingerprint = _fingerprint(path)
+            done = completed.get(name)
+            if done and done["input"] == fingerprint and os.path.exists(os.path.join(output_dir, name)):
+                continue
+            pending.append((name, path, row_group, n_rows, fingerprint))
+
+        total_rows = sum(n for *_, n in units)
+        skipped_rows = total_rows - sum(unit[3] for unit in pending)
+        logging.info(f"Batch scoring {len(units)} row group(s), {total_rows} rows with model {version}; "
+                     f"{len(units) - len(pending)} already scored")
+
+        started = time.perf_counter()
+        scored_rows = 0
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(model_dir,)) as executor:
+            in_flight = {}
+            while pending or in_flight:
+                while pending and len(in_flight) < 2 * n_workers:
+                    name, path, row_group, n_rows, fingerprint = pending.popleft()
+                    future = executor.submit(score_unit, path, row_group, os.path.join(output_dir, name), batch_size)
+                    in_flight[future] = (name, fingerprint)
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, fingerprint = in_flight.pop(future)
+                    n_rows = future.result()
+                    completed[name] = {"input": fingerprint, "rows": n_rows}
+                    scored_rows += n_rows
+
+                # progress is only ever written after the part file is in place
+                save_progress(progress, output_dir)
+                elapsed = time.perf_counter() - started
+                logging.info(f"Scored {scored_rows + skipped_rows}/{total_rows} rows "
+                             f"({scored_rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+        elapsed = time.perf_counter() - started
+        summary = {
+            "model_version": version,
+            "units": len(units),
+            "rows": total_rows,
+            "rows_scored": scored_rows,
+            "rows_skipped": skipped_rows,
+            "seconds": round(elapsed, 3),
+            "rows_per_s": round(scored_rows / elapsed, 1) if elapsed and scored_rows else None,
+        }
+        progress["last_run"] = summary
+        save_progress(progress, output_dir)
+        return summary
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def main(argv=None):
+    try:
+        params = load_params("batch_scoring")
+
+        parser = argparse.ArgumentParser(description="Score a Parquet order dataset with the trained model")
+        parser.add_argument("--input", default=params.get("input"), required=params.get("input") is None,
+                            help="Parquet file or directory of Parquet files")
+        parser.add_argument("--output", default=params.get("output", "./scores"), help="output directory")
+        parser.add_argument("--model-dir", default=params.get("model_dir", "./models"))
+        parser.add_argument("--n-workers", type=int, default=params.get("n_workers", 1),
+                            help="worker processes (0 = one per CPU)")
+        parser.add_argument("--batch-size", type=int, default=params.get("batch_size", 65536),
+                            help="rows per batch within a row group")
+        parser.add_argument("--restart", action="store_true", help="ignore earlier progress and rescore all")
+        args = parser.parse_args(argv)
+
+        logging.info("Batch Scoring Started")
+
+        with StageProfiler("batch_scoring", inputs=[args.input], outputs=[args.output]):
+            with profile_step("score"):
+                summary = run_batch_scoring(args.input, args.output, args.model_dir,
+                                            args.n_workers or os.cpu_count(), args.batch_size, args.restart)
+
+        rate = f"{summary['rows_per_s']:,.0f} rows/s" if summary["rows_per_s"] else "nothing to score"
+        logging.info(f"Batch Scoring Completed: {summary['rows_scored']} rows scored, "
+                     f"{summary['rows_skipped']} resumed, {summary['seconds']}s ({rate})")
+        print(f"Scored {summary['rows_scored']} rows in {summary['seconds']}s ({rate}); "
+              f"{summary['rows_skipped']} rows already scored")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    main()
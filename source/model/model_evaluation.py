@@ -1,12 +1,15 @@
 from source.logger import logging
 from source.exceptions import CustomException
 import sys
+import os
 
 import numpy as np
 import joblib
 
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix, classification_report
-from source.utiles import save_json
+from source.utiles import save_json, load_json, load_transformed_data, load_params
+from source.utiles.cache import run_cached
+from source.utiles.profiling import StageProfiler, profile_step
 
 def evaluate_model(X_test, y_test, model):
     try:
@@ -28,19 +31,129 @@ def evaluate_model(X_test, y_test, model):
     
 
 
+def report_from_confusion(cm: np.ndarray, labels) -> dict:
+    """Metrics and a classification_report-style dict computed from a confusion matrix"""
+    tp = np.diag(cm).astype(np.float64)
+    support = cm.sum(axis=1).astype(np.float64)
+    predicted = cm.sum(axis=0).astype(np.float64)
+    total = cm.sum()
+
+    # zero divisions count as 0.0, as sklearn does by default
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(tp), where=(precision + recall) > 0)
+
+    report = {
+        str(label): {"precision": float(p), "recall": float(r), "f1-score": float(f), "support": float(s)}
+        for label, p, r, f, s in zip(labels, precision, recall, f1, support)
+    }
+    report["accuracy"] = float(tp.sum() / total) if total else 0.0
+    report["macro avg"] = {
+        "precision": float(precision.mean()), "recall": float(recall.mean()),
+        "f1-score": float(f1.mean()), "support": float(total),
+    }
+    weights = support / total if total else support
+    report["weighted avg"] = {
+        "precision": float(precision @ weights), "recall": float(recall @ weights),
+        "f1-score": float(f1 @ weights), "support": float(total),
+    }
+
+    # binary metrics are reported for the positive (last) class
+    return {
+        'accuracy': report["accuracy"],
+        'precision': float(precision[-1]),
+        'recall': float(recall[-1]),
+        'f1_score': float(f1[-1]),
+        'confusion_matrix': cm.tolist(),
+        'classification_report': report
+    }
+
+
+def _update_confusion(cm: np.ndarray, labels: np.ndarray, y_true, y_pred) -> None:
+    n_classes = len(labels)
+    true_idx = np.searchsorted(labels, y_true)
+    pred_idx = np.searchsorted(labels, y_pred)
+    cm += np.bincount(true_idx * n_classes + pred_idx, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+
+def evaluate_model_chunked(X_test, y_test, model, chunk_size: int = 100000) -> dict:
+    """
+    Evaluate block by block, accumulating the confusion matrix.
+
+    Only one block of (possibly memory-mapped) features is resident at a time,
+    so the hold-out set never has to fit in memory.
+    """
+    try:
+        labels = np.asarray(model.classes_)
+        cm = np.zeros((len(labels), len(labels)), dtype=np.int64)
+
+        for start in range(0, X_test.shape[0], chunk_size):
+            y_true = np.asarray(y_test[start:start + chunk_size])
+            _update_confusion(cm, labels, y_true, model.predict(X_test[start:start + chunk_size]))
+
+        return report_from_confusion(cm, labels)
+
+    except Exception as e:
+        raise CustomException(e,sys)
+
+
+def evaluate_parity(X_test, y_test, model, reference, chunk_size: int = 100000) -> dict:
+    """
+    Compare the served model against a reference (the batch LR) on the same
+    blocks: headline metrics of both, their differences and how often the two
+    predictions agree.
+    """
+    try:
+        labels = np.asarray(model.classes_)
+        cm_model = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        cm_reference = np.zeros_like(cm_model)
+        n_agree = 0
+
+        for start in range(0, X_test.shape[0], chunk_size):
+            X_block = X_test[start:start + chunk_size]
+            y_true = np.asarray(y_test[start:start + chunk_size])
+            y_model, y_reference = model.predict(X_block), reference.predict(X_block)
+
+            _update_confusion(cm_model, labels, y_true, y_model)
+            _update_confusion(cm_reference, labels, y_true, y_reference)
+            n_agree += int((y_model == y_reference).sum())
+
+        keys = ['accuracy', 'precision', 'recall', 'f1_score']
+        model_metrics = report_from_confusion(cm_model, labels)
+        reference_metrics = report_from_confusion(cm_reference, labels)
+
+        return {
+            'model': {k: model_metrics[k] for k in keys},
+            'reference': {k: reference_metrics[k] for k in keys},
+            'difference': {k: model_metrics[k] - reference_metrics[k] for k in keys},
+            'prediction_agreement': n_agree / X_test.shape[0] if X_test.shape[0] else 1.0,
+        }
+
+    except Exception as e:
+        raise CustomException(e,sys)
+
+
 def main():
     try:
         logging.info("Stage Model Evaluation Started")
 
-        test_data = np.load("./data/transformed/transformed_test.npy")
-        model = joblib.load("./models/lr_model.pkl")
+        X_test, y_test = load_transformed_data("test", mmap_mode="r")
+        artifacts = load_json("./models/model_manifest.json", {}).get("artifacts", {})
+        model = joblib.load(os.path.join("./models", artifacts.get("model", "lr_model.pkl")))
 
-        X_test = test_data[:,:-1]
-        y_test = test_data[:,-1]
-
-        results = evaluate_model(X_test, y_test, model)
+        chunk_size = load_params("model_evaluation").get("chunk_size", 100000)
+        with profile_step("evaluate", rows_in=X_test.shape[0]):
+            results = evaluate_model_chunked(X_test, y_test, model, chunk_size)
         save_json(results,"evaluation_metrics","scores.json","./results")
 
+        # streaming training ships a batch LR reference to compare against
+        if "reference_model" in artifacts:
+            reference = joblib.load(os.path.join("./models", artifacts["reference_model"]))
+            with profile_step("parity", rows_in=X_test.shape[0]):
+                parity = evaluate_parity(X_test, y_test, model, reference, chunk_size)
+            save_json(parity,"evaluation_metrics","parity.json","./results")
+            logging.info(f"Parity with batch LR: {parity['difference']}, agreement {parity['prediction_agreement']:.4f}")
+
         logging.info("Stage Model Evaluation Completed")
 
 
@@ -50,4 +163,11 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with StageProfiler("model_evaluation", inputs=["./data/transformed", "./models"],
+                       outputs=["./results/evaluation_metrics"]):
+        run_cached(
+            "model_evaluation", main,
+            deps=["./data/transformed", "./models"],
+            params=["model_evaluation"],
+            outs=["./results/evaluation_metrics"],
+        )
\ No newline at end of file
@@ -0,0 +1,92 @@
+import sys
+
+import numpy as np
+
+from source.exceptions import CustomException
+from source.logger import logging
+from source.utiles import save_json
+
+
+def category_key(value) -> str:
+    """Canonical string key of a category, so 3, 3.0 and '3' share one entry"""
+    if isinstance(value, (bool, np.bool_)):
+        # True == 1 for the one-hot encoder too: it matches a category 1, not "True"
+        return str(int(value))
+    if isinstance(value, (int, float, np.integer, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def export_scoring_kernel(preprocessor, model) -> dict:
+    """
+    Fold a fitted ColumnTransformer and a linear classifier into one kernel.
+
+    Numeric (imputer -> scaler) columns collapse to a single weight each, with
+    the scaler's mean moved into the intercept and the imputer's median kept as
+    the fill value. Every one-hot category collapses to its own coefficient, so
+    scoring becomes a dot product plus one table lookup per categorical column.
+    """
+    try:
+        coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        intercept = float(np.asarray(model.intercept_).ravel()[0])
+
+        numeric = {"columns": [], "fill": [], "weight": []}
+        categorical = []
+        offset = 0
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or name == "remainder" or len(columns) == 0:
+                continue
+
+            steps = dict(transformer.steps) if hasattr(transformer, "steps") else {name: transformer}
+            imputer = steps.get("imputer")
+            scaler = steps.get("scaler")
+            encoder = next((s for s in steps.values() if hasattr(s, "categories_")), None)
+
+            if encoder is not None:
+                if getattr(encoder, "drop_idx_", None) is not None:
+                    raise ValueError("OneHotEncoder with drop cannot be exported")
+                for i, col in enumerate(columns):
+                    categories = encoder.categories_[i]
+                    weights = coef[offset:offset + len(categories)]
+                    fill = imputer.statistics_[i] if imputer is not None else None
+                    categorical.append({
+                        "column": col,
+                        "fill": None if fill is None else category_key(fill),
+                        "weights": {category_key(c): float(w) for c, w in zip(categories, weights)},
+                    })
+                    offset += len(categories)
+            else:
+                for i, col in enumerate(columns):
+                    mean = float(scaler.mean_[i]) if scaler is not None and scaler.mean_ is not None else 0.0
+                    scale = float(scaler.scale_[i]) if scaler is not None and scaler.scale_ is not None else 1.0
+                    weight = coef[offset] / scale
+                    intercept -= weight * mean
+                    numeric["columns"].append(col)
+                    numeric["fill"].append(float(imputer.statistics_[i]) if imputer is not None else 0.0)
+                    numeric["weight"].append(float(weight))
+                    offset += 1
+
+        if offset != coef.shape[0]:
+            raise ValueError(f"Preprocessor produces {offset} features but the model expects {coef.shape[0]}")
+
+        logging.info(f"Scoring kernel exported: {len(numeric['columns'])} numeric, {len(categorical)} categorical columns")
+
+        return {
+            "kind": "logistic",
+            "intercept": intercept,
+            "numeric": numeric,
+            "categorical": categorical,
+        }
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def save_scoring_kernel(preprocessor, model, file_name, path) -> None:
+    try:
+        kernel = export_scoring_kernel(preprocessor, model)
+        save_json(kernel, "", file_name, path)
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,288 @@
+import sys
+import os
+import json
+import hashlib
+import inspect
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from source.exceptions import CustomException
+from source.logger import logging
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.metrics import roc_auc_score, f1_score, accuracy_score
+from source.utiles import save_model, save_json, load_json, load_params, load_transformed_data
+from source.utiles.profiling import StageProfiler, profile_step
+
+SELECTION_DIR = "./selection"
+FOLD_CACHE_DIR = os.path.join(SELECTION_DIR, "fold_cache")
+TRANSFORMED_DIR = "./data/transformed"
+
+
+# ----------------------------------------------------------------
+# Candidates
+# ----------------------------------------------------------------
+def build_estimator(name: str, params: dict, seed: int = 42):
+    """Estimator for a candidate name and one point of its grid"""
+    if name == "logistic_regression":
+        return LogisticRegression(max_iter=1000, random_state=seed, **params)
+    if name == "lightgbm":
+        from lightgbm import LGBMClassifier
+        # one thread per trial; the trials themselves are spread over the cores
+        return LGBMClassifier(objective="binary", random_state=seed, n_jobs=1, verbose=-1, **params)
+    raise ValueError(f"Unknown model selection candidate: {name}")
+
+
+def expand_grid(candidates: dict) -> list:
+    """[(name, params)] for every combination in every candidate's grid"""
+    configs = []
+    for name, grid in candidates.items():
+        grid = grid or {}
+        keys = sorted(grid)
+        values = [v if isinstance(v, list) else [v] for v in (grid[k] for k in keys)]
+        for combination in itertools.product(*values):
+            configs.append((name, dict(zip(keys, combination))))
+    return configs
+
+
+def score(metric: str, y_true, estimator, X) -> float:
+    if metric == "roc_auc":
+        return float(roc_auc_score(y_true, estimator.predict_proba(X)[:, 1]))
+    if metric == "f1":
+        return float(f1_score(y_true, estimator.predict(X)))
+    if metric == "accuracy":
+        return float(accuracy_score(y_true, estimator.predict(X)))
+    raise ValueError(f"Unknown model selection metric: {metric}")
+
+
+# ----------------------------------------------------------------
+# Fold evaluation (runs in the worker processes)
+# ----------------------------------------------------------------
+_worker_data = None
+
+
+def _init_worker(path):
+    # memory-mapped where the layout allows it, so workers share the page cache
+    global _worker_data
+    _worker_data = load_transformed_data("train", path, mmap_mode="r")
+
+
+def subset_indices(n_total: int, n_rows: int, seed: int) -> np.ndarray:
+    """
+    First n_rows of one seeded permutation, so every rung's sample contains
+    the previous one; sorted to keep reads of memory-mapped rows sequential.
+    """
+    return np.sort(np.random.default_rng(seed).permutation(n_total)[:n_rows])
+
+
+def evaluate_fold(task: dict) -> dict:
+    """Fit one config on one fold of a rung's row sample and score the held-out part"""
+    X, y = _worker_data
+    y = np.asarray(y)
+    idx = subset_indices(X.shape[0], task["n_rows"], task["seed"])
+    folds = StratifiedKFold(task["n_folds"], shuffle=True, random_state=task["seed"])
+    train_idx, valid_idx = list(folds.split(idx, y[idx]))[task["fold"]]
+    train_idx, valid_idx = idx[train_idx], idx[valid_idx]
+
+    estimator = build_estimator(task["name"], task["params"], task["seed"])
+    result = {}
+    if task["name"] == "lightgbm" and task.get("early_stopping_rounds"):
+        from lightgbm import early_stopping
+        # early stopping watches rows carved out of the training part; the
+        # validation fold stays unseen until it is scored
+        fit_idx, stop_idx = train_test_split(
+            train_idx, test_size=task["early_stopping_fraction"], stratify=y[train_idx], random_state=task["seed"]
+        )
+        fit_idx, stop_idx = np.sort(fit_idx), np.sort(stop_idx)
+        callbacks = [early_stopping(task["early_stopping_rounds"], verbose=False)]
+        # lightgbm >= 4.6 takes eval_X / eval_y and deprecates eval_set
+        if "eval_X" in inspect.signature(estimator.fit).parameters:
+            eval_args = {"eval_X": (X[stop_idx],), "eval_y": (y[stop_idx],)}
+        else:
+            eval_args = {"eval_set": [(X[stop_idx], y[stop_idx])]}
+        estimator.fit(X[fit_idx], y[fit_idx], callbacks=callbacks, **eval_args)
+        result["best_iteration"] = int(estimator.best_iteration_ or estimator.n_estimators)
+    else:
+        estimator.fit(X[train_idx], y[train_idx])
+
+    result["score"] = score(task["metric"], y[valid_idx], estimator, X[valid_idx])
+    return result
+
+
+# ----------------------------------------------------------------
+# Fold cache
+# ----------------------------------------------------------------
+def data_hash(path=TRANSFORMED_DIR, split="train") -> str:
+    """sha256 of the transformed files of a split, whichever layout is on disk"""
+    try:
+        digest = hashlib.sha256()
+        for name in (f"X_{split}.npz", f"X_{split}.npy", f"y_{split}.npy", f"transformed_{split}.npy"):
+            file_path = os.path.join(path, name)
+            if os.path.exists(file_path):
+                digest.update(name.encode())
+                with open(file_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+                        digest.update(chunk)
+        return digest.hexdigest()
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def fold_key(task: dict, data_digest: str) -> str:
+    """A fold result is reusable when the data, config, sample, fold and scoring are the same"""
+    payload = json.dumps({"data": data_digest, **task}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ----------------------------------------------------------------
+# Successive halving
+# ----------------------------------------------------------------
+def rung_sizes(n_total: int, min_rows: int, factor: int, n_configs: int) -> list:
+    """Row budget per rung: min_rows * factor^r, capped at n_total; the last rung uses all rows"""
+    sizes = []
+    n_rows = min(min_rows, n_total)
+    while n_configs > 1 and n_rows < n_total:
+        sizes.append(n_rows)
+        n_configs = max(1, -(-n_configs // factor))
+        n_rows = min(n_rows * factor, n_total)
+    sizes.append(n_total)
+    return sizes
+
+
+def run_search(params: dict, path=TRANSFORMED_DIR) -> list:
+    """
+    Successive halving over every candidate config.
+
+    Each rung cross-validates the surviving configs on a larger nested row
+    sample and keeps the best 1/factor of them. All (config, fold) fits of a
+    rung run concurrently on a process pool; fold results are cached on disk
+    by data hash + config + sample, so a re-run only fits what is new.
+    """
+    try:
+        n_folds = params.get("n_folds", 3)
+        n_jobs = params.get("n_jobs", 1) or os.cpu_count()
+        metric = params.get("metric", "roc_auc")
+        seed = params.get("seed", 42)
+        halving = params.get("halving", {})
+        factor = halving.get("factor", 3)
+        early_stopping_rounds = params.get("early_stopping_rounds", 50)
+        early_stopping_fraction = params.get("early_stopping_fraction", 0.1)
+
+        configs = expand_grid(params.get("candidates", {}))
+        if not configs:
+            raise ValueError("model_selection.candidates is empty")
+
+        X, _ = load_transformed_data("train", path, mmap_mode="r")
+        n_total = X.shape[0]
+        data_digest = data_hash(path)
+        sizes = rung_sizes(n_total, halving.get("min_rows", 2000), factor, len(configs))
+
+        os.makedirs(FOLD_CACHE_DIR, exist_ok=True)
+        trials, survivors = [], list(range(len(configs)))
+        n_cached = n_fitted = 0
+
+        with ProcessPoolExecutor(min(n_jobs, len(configs) * n_folds), initializer=_init_worker, initargs=(path,)) as executor:
+            for rung, n_rows in enumerate(sizes):
+                tasks = {}
+                for c in survivors:
+                    name, config_params = configs[c]
+                    for fold in range(n_folds):
+                        tasks[(c, fold)] = {
+                            "name": name, "params": config_params, "n_rows": n_rows, "fold": fold,
+                            "n_folds": n_folds, "seed": seed, "metric": metric,
+                            "early_stopping_rounds": early_stopping_rounds if name == "lightgbm" else None,
+                        }
+                        if name == "lightgbm" and early_stopping_rounds:
+                            tasks[(c, fold)]["early_stopping_fraction"] = early_stopping_fraction
+
+                results, pending = {}, {}
+                for task_id, task in tasks.items():
+                    cached = load_json(os.path.join(FOLD_CACHE_DIR, fold_key(task, data_digest) + ".json"))
+                    if cached is not None:
+                        results[task_id] = cached
+                    else:
+                        pending[task_id] = executor.submit(evaluate_fold, task)
+                n_cached += len(results)
+
+                for task_id, future in pending.items():
+                    results[task_id] = future.result()
+                    save_json(results[task_id], "", fold_key(tasks[task_id], data_digest) + ".json", FOLD_CACHE_DIR)
+                n_fitted += len(pending)
+
+                rung_trials = []
+                for c in survivors:
+                    name, config_params = configs[c]
+                    fold_results = [results[(c, fold)] for fold in range(n_folds)]
+                    fold_scores = [r["score"] for r in fold_results]
+                    trial = {
+                        "config": c, "model": name, "params": config_params, "rung": rung, "n_rows": n_rows,
+                        "mean_score": float(np.mean(fold_scores)), "std_score": float(np.std(fold_scores)),
+                        "fold_scores": fold_scores,
+                    }
+                    if name == "lightgbm" and early_stopping_rounds:
+                        trial["best_iteration"] = int(np.mean([r["best_iteration"] for r in fold_results]))
+                    rung_trials.append(trial)
+
+                rung_trials.sort(key=lambda t: t["mean_score"], reverse=True)
+                trials.extend(rung_trials)
+                n_keep = 1 if rung == len(sizes) - 1 else max(1, -(-len(survivors) // factor))
+                survivors = [t["config"] for t in rung_trials[:n_keep]]
+                logging.info(
+                    f"Rung {rung}: {len(rung_trials)} config(s) on {n_rows} rows, best "
+                    f"{rung_trials[0]['model']} {rung_trials[0]['params']} {metric}={rung_trials[0]['mean_score']:.4f}"
+                )
+
+        logging.info(f"Model selection: {n_fitted} fold fit(s), {n_cached} reused from cache")
+
+        return trials
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def main():
+    try:
+        logging.info("Stage Model Selection Started")
+
+        params = load_params("model_selection")
+        with profile_step("search"):
+            trials = run_search(params)
+
+        # the winner is the best config of the last (full-data) rung
+        best = trials[-1] if len(trials) == 1 else max(
+            (t for t in trials if t["rung"] == trials[-1]["rung"]), key=lambda t: t["mean_score"]
+        )
+        best_params = dict(best["params"])
+        if "best_iteration" in best:
+            # refit without a validation fold, for the number of rounds early stopping settled on
+            best_params["n_estimators"] = best["best_iteration"]
+
+        X_train, y_train = load_transformed_data("train", mmap_mode="r")
+        model = build_estimator(best["model"], best_params, params.get("seed", 42))
+        if best["model"] == "lightgbm":
+            model.set_params(n_jobs=params.get("n_jobs", 1) or os.cpu_count())
+        with profile_step("refit", rows_in=X_train.shape[0]):
+            model.fit(X_train, np.asarray(y_train))
+        save_model(model, "best_model.pkl", SELECTION_DIR)
+
+        leaderboard = {
+            "metric": params.get("metric", "roc_auc"),
+            "best": {"model": best["model"], "params": best_params, "mean_score": best["mean_score"]},
+            "trials": sorted(trials, key=lambda t: (-t["rung"], -t["mean_score"])),
+        }
+        save_json(leaderboard, "", "leaderboard.json", SELECTION_DIR)
+
+        logging.info(f"Best model: {best['model']} {best_params} ({leaderboard['metric']}={best['mean_score']:.4f})")
+        logging.info("Stage Model Selection Completed")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    with StageProfiler("model_selection", inputs=[TRANSFORMED_DIR], outputs=[SELECTION_DIR]):
+        main()
@@ -4,9 +4,16 @@ import numpy as np
 from source.exceptions import CustomException
 from source.logger import logging
 import sys
+import joblib
+import hashlib
+import os
+from datetime import datetime, timezone
 
-from sklearn.linear_model import LogisticRegression
-from source.utiles import save_model
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from source.utiles import save_model, save_json, load_json, load_params, load_transformed_data
+from source.utiles.cache import run_cached
+from source.utiles.profiling import StageProfiler, profile_step
+from source.model.model_export import save_scoring_kernel
 
 def train_model(X_train, y_train):
     try:
@@ -19,18 +26,193 @@ def train_model(X_train, y_train):
         raise CustomException(e, sys)
     
 
+# ----------------------------------------------------------------
+# Streaming (out-of-core) training
+# ----------------------------------------------------------------
+CHECKPOINT_DIR = "./models/checkpoints"
+CHECKPOINT_FILE = "sgd_checkpoint.pkl"
+
+
+def iter_shards(X, y, shard_size: int, order):
+    """Yield (shard index, X block, y block); blocks of a memory-mapped X are only read here"""
+    for i in order:
+        start = i * shard_size
+        yield i, X[start:start + shard_size], np.asarray(y[start:start + shard_size])
+
+
+def load_warm_start(model_dir: str, feature_names):
+    """
+    Previous streaming model from model_dir, if it was trained on the same
+    feature layout; the preprocessor is refitted every run, so the feature
+    names of the served preprocessor are compared, not just their count.
+    """
+    try:
+        manifest = load_json(os.path.join(model_dir, "model_manifest.json"), {})
+        artifacts = manifest.get("artifacts", {})
+        model_path = os.path.join(model_dir, artifacts.get("model", "lr_model.pkl"))
+        preprocessor_path = os.path.join(model_dir, artifacts.get("preprocessor", "preprocessor.pkl"))
+        if not (os.path.exists(model_path) and os.path.exists(preprocessor_path)):
+            return None
+
+        model = joblib.load(model_path)
+        previous_names = list(joblib.load(preprocessor_path).get_feature_names_out())
+        if not isinstance(model, SGDClassifier) or previous_names != list(feature_names):
+            logging.info("Previous model is not a compatible streaming model, training from scratch")
+            return None
+
+        logging.info(f"Warm-starting from model version {manifest.get('version')}")
+        return model
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def save_checkpoint(state: dict, path=CHECKPOINT_DIR) -> None:
+    try:
+        os.makedirs(path, exist_ok=True)
+        tmp_path = os.path.join(path, CHECKPOINT_FILE + ".tmp")
+        joblib.dump(state, tmp_path)
+        os.replace(tmp_path, os.path.join(path, CHECKPOINT_FILE))
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def train_model_streaming(X_train, y_train, feature_names, params: dict, model_dir="./models"):
+    """
+    Fit an SGD logistic-loss classifier with partial_fit, one shard of rows at a time.
+
+    Shards are row blocks of the (memory-mapped or CSR) training matrix, visited
+    in a seeded random order each epoch. Training resumes from the last
+    checkpoint of an interrupted run, otherwise warm-starts from the previous
+    streaming model in model_dir when `warm_start` is set.
+    """
+    try:
+        shard_size = params.get("shard_size", 50000)
+        epochs = params.get("epochs", 5)
+        checkpoint_every = params.get("checkpoint_every", 10)
+        seed = params.get("seed", 42)
+
+        n_rows = X_train.shape[0]
+        n_shards = max(1, -(-n_rows // shard_size))
+        classes = np.unique(np.asarray(y_train))
+        feature_names = list(feature_names)
+
+        model, start_epoch, start_shard = None, 0, 0
+        checkpoint_path = os.path.join(CHECKPOINT_DIR, CHECKPOINT_FILE)
+        if os.path.exists(checkpoint_path):
+            state = joblib.load(checkpoint_path)
+            if state["feature_names"] == feature_names and state["n_rows"] == n_rows and state["shard_size"] == shard_size:
+                model, start_epoch, start_shard = state["model"], state["epoch"], state["position"]
+                logging.info(f"Resuming from checkpoint at epoch {start_epoch}, shard {start_shard}")
+
+        if model is None and params.get("warm_start", True):
+            model = load_warm_start(model_dir, feature_names)
+
+        if model is None:
+            model = SGDClassifier(
+                loss="log_loss",
+                alpha=params.get("alpha", 0.0001),
+                learning_rate=params.get("learning_rate", "optimal"),
+                random_state=seed,
+            )
+
+        steps = 0
+        for epoch in range(start_epoch, epochs):
+            order = np.random.default_rng([seed, epoch]).permutation(n_shards)
+            position = start_shard if epoch == start_epoch else 0
+
+            for _, X_shard, y_shard in iter_shards(X_train, y_train, shard_size, order[position:]):
+                model.partial_fit(X_shard, y_shard, classes=classes)
+                position += 1
+                steps += 1
+
+                if checkpoint_every and steps % checkpoint_every == 0:
+                    save_checkpoint({"model": model, "epoch": epoch, "position": position, "n_rows": n_rows,
+                                     "shard_size": shard_size, "feature_names": feature_names})
+
+            logging.info(f"Epoch {epoch + 1}/{epochs} done ({n_shards} shards of {shard_size} rows)")
+
+        # a finished run must not be resumed by the next one
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+            if not os.listdir(CHECKPOINT_DIR):
+                os.rmdir(CHECKPOINT_DIR)
+
+        return model
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def save_model_manifest(artifacts: dict, n_features: int, path) -> str:
+    """Write models/model_manifest.json pinning the model to the preprocessor it was trained with"""
+    try:
+        digest = hashlib.sha256()
+        for name in sorted(artifacts.values()):
+            with open(os.path.join(path, name), "rb") as f:
+                digest.update(f.read())
+        version = digest.hexdigest()[:12]
+
+        manifest = {
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "n_features": n_features,
+            "artifacts": artifacts,
+        }
+        save_json(manifest, "", "model_manifest.json", path)
+        logging.info(f"Model artifacts saved as version {version}")
+
+        return version
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
 def main():
     try:
 
         logging.info("Stage Model Training Started")
-        train_data = np.load("./data/transformed/transformed_train.npy")
+        # memory-mapped: the features are paged in by the solver instead of copied up front
+        X_train, y_train = load_transformed_data("train", mmap_mode="r")
+
+        params = load_params("model_training")
+        preprocessor = joblib.load("./data/transformed/preprocessor.pkl")
+
+        if params.get("mode", "batch") == "streaming":
+            streaming_params = params.get("streaming", {})
+            with profile_step("fit_streaming", rows_in=X_train.shape[0]):
+                model = train_model_streaming(X_train, y_train, preprocessor.get_feature_names_out(), streaming_params)
+            artifacts = {"model": "sgd_model.pkl"}
+
+            # batch LR fitted alongside, so evaluation can report metric parity
+            if streaming_params.get("parity_reference", True):
+                with profile_step("fit_reference", rows_in=X_train.shape[0]):
+                    save_model(train_model(X_train, y_train), "lr_reference.pkl", "./models")
+                artifacts["reference_model"] = "lr_reference.pkl"
+
+        else:
+            with profile_step("fit", rows_in=X_train.shape[0]):
+                model = train_model(X_train, y_train)
+            artifacts = {"model": "lr_model.pkl"}
+
+        with profile_step("export"):
+            save_model(model, artifacts["model"], "./models")
 
-        X_train = train_data[:,:-1]
-        y_train = train_data[:,-1]
+            # the preprocessor is served together with the model, so both are versioned here
+            save_model(preprocessor,"preprocessor.pkl","./models")
+            save_scoring_kernel(preprocessor, model, "scoring_kernel.json", "./models")
 
-        model = train_model(X_train, y_train)
+        # models/ persists across runs for warm starts, so drop artifacts of the other mode
+        for name in {"lr_model.pkl", "sgd_model.pkl", "lr_reference.pkl"} - set(artifacts.values()):
+            if os.path.exists(os.path.join("./models", name)):
+                os.remove(os.path.join("./models", name))
 
-        save_model(model,"lr_model.pkl","./models")
+        save_model_manifest(
+            {**artifacts, "preprocessor": "preprocessor.pkl", "scoring_kernel": "scoring_kernel.json"},
+            X_train.shape[1],
+            "./models",
+        )
 
         logging.info("Stage Model Training Completed")
 
@@ -40,4 +222,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with StageProfiler("model_training", inputs=["./data/transformed"], outputs=["./models"]):
+        run_cached(
+            "model_training", main,
+            deps=["./data/transformed"],
+            params=["model_training"],
+            outs=["./models"],
+            # a streaming run continues from the previous model, so its output is not a function of the key
+            enabled=load_params("model_training").get("mode", "batch") == "batch",
+        )
\ No newline at end of file
@@ -1,10 +1,16 @@
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import os
 import sys
 from source.exceptions import CustomException
 import joblib
 import json
+import yaml
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PARAMS_PATH = "params.yaml"
 
 
 def save_csv_data(data: pd.DataFrame, folder_name, file_name, path) -> None:
@@ -17,6 +23,62 @@ def save_csv_data(data: pd.DataFrame, folder_name, file_name, path) -> None:
         raise CustomException (e,sys)
     
 
+def arrow_schema(data: pd.DataFrame) -> pa.Schema:
+    """Explicit Arrow schema for a frame: strings dictionary-encoded, timestamps and numerics kept native"""
+    fields = []
+    for field in pa.Schema.from_pandas(data, preserve_index=False):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def save_parquet_data(data: pd.DataFrame, folder_name, file_name, path) -> None:
+    try:
+        dir_path = os.path.join(path,folder_name)
+        os.makedirs(dir_path, exist_ok=True)
+        table = pa.Table.from_pandas(data, schema=arrow_schema(data), preserve_index=False)
+        pq.write_table(table, os.path.join(dir_path,file_name), compression="snappy")
+
+    except Exception as e:
+        raise CustomException (e,sys)
+
+
+def table_to_pandas(table: pa.Table) -> pd.DataFrame:
+    data = table.to_pandas()
+
+    # Parquet only round-trips string dictionaries; numeric categoricals are
+    # restored from the pandas metadata written alongside the schema
+    for col in (table.schema.pandas_metadata or {}).get("columns", []):
+        name = col.get("name")
+        if col.get("pandas_type") == "categorical" and name in data.columns \
+                and not isinstance(data[name].dtype, pd.CategoricalDtype):
+            data[name] = data[name].astype("category")
+
+    return data
+
+
+def load_parquet_data(file_path, columns=None) -> pd.DataFrame:
+    """Read a Parquet file or directory, optionally only the given columns, with dtypes preserved"""
+    try:
+        return table_to_pandas(pq.read_table(file_path, columns=columns))
+
+    except Exception as e:
+        raise CustomException (e,sys)
+
+
+def iter_parquet_batches(paths, batch_size=65536, columns=None):
+    """Yield record batches row group by row group over one or more Parquet files"""
+    try:
+        for path in paths:
+            parquet_file = pq.ParquetFile(path)
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+                yield batch
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
 def save_numpyArr_data(data: pd.DataFrame, folder_name, file_name, path) -> None:
     try:
         dir_path = os.path.join(path,folder_name)
@@ -28,6 +90,42 @@ def save_numpyArr_data(data: pd.DataFrame, folder_name, file_name, path) -> None
     
 
 
+def save_sparse_data(data, folder_name, file_name, path) -> None:
+    try:
+        dir_path = os.path.join(path,folder_name)
+        os.makedirs(dir_path, exist_ok=True)
+        sp.save_npz(os.path.join(dir_path,file_name), sp.csr_matrix(data), compressed=False)
+
+    except Exception as e:
+        raise CustomException (e,sys)
+
+
+def load_transformed_data(split, path="./data/transformed", mmap_mode=None):
+    """
+    Return (X, y) for a split: sparse CSR (X_{split}.npz), dense X_{split}.npy
+    and y_{split}.npy, or the legacy combined transformed_{split}.npy. Dense
+    arrays are memory-mapped when mmap_mode is given ("r" for read-only).
+    """
+    try:
+        sparse_path = os.path.join(path, f"X_{split}.npz")
+        dense_path = os.path.join(path, f"X_{split}.npy")
+        if os.path.exists(sparse_path) or os.path.exists(dense_path):
+            if os.path.exists(sparse_path):
+                X = sp.load_npz(sparse_path).tocsr()
+            else:
+                X = np.load(dense_path, mmap_mode=mmap_mode)
+            y = np.load(os.path.join(path, f"y_{split}.npy"), mmap_mode=mmap_mode)
+            if X.shape[0] != y.shape[0]:
+                raise ValueError(f"{split} features have {X.shape[0]} rows but its labels {y.shape[0]}")
+            return X, y
+
+        data = np.load(os.path.join(path, f"transformed_{split}.npy"), mmap_mode=mmap_mode)
+        return data[:,:-1], data[:,-1]
+
+    except Exception as e:
+        raise CustomException (e,sys)
+
+
 def save_model(model,file_name, path):
     try:
         os.makedirs(path, exist_ok=True)
@@ -46,4 +144,28 @@ def save_json(data, folder_name, file_name, path ):
             json.dump(data, f, indent=4)
 
     except Exception as e:
-        raise CustomException (e,sys)
\ No newline at end of file
+        raise CustomException (e,sys)
+
+
+def load_json(file_path, default=None):
+    try:
+        if not os.path.exists(file_path):
+            return default
+        with open(file_path) as f:
+            return json.load(f)
+
+    except Exception as e:
+        raise CustomException (e,sys)
+
+
+def load_params(section=None, path=PARAMS_PATH) -> dict:
+    """Read the DVC params file, optionally a single top-level section of it"""
+    try:
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            params = yaml.safe_load(f) or {}
+        return (params.get(section) or {}) if section else params
+
+    except Exception as e:
+        raise CustomException (e,sys)
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+from source.exceptions import CustomException
+from source.logger import logging
+from source.utiles import load_params, load_json, save_json
+from source.utiles.profiling import annotate
+
+DEFAULT_CACHE_DIR = ".stage_cache"
+DEFAULT_MAX_SIZE_MB = 2048
+
+# the source/ package, whose imported modules are a stage's code
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def project_modules() -> list:
+    """
+    Files of every module under source/ loaded in this process, the running
+    stage's own __main__ included. Called once a stage has done its imports,
+    this is the code its outputs depend on, without a hand-kept list.
+    """
+    files = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and path.endswith(".py"):
+            path = os.path.abspath(path)
+            if path.startswith(SOURCE_ROOT + os.sep):
+                files.add(os.path.relpath(path))
+    return sorted(files)
+
+
+def code_fingerprint(code: list, params: dict) -> str:
+    """sha256 of the contents of the code files and the params sections"""
+    digest = hashlib.sha256()
+    for path in sorted(code):
+        with open(path, "rb") as f:
+            digest.update(f"{os.path.relpath(path)}:".encode() + hashlib.sha256(f.read()).digest())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _iter_files(path):
+    """Every file under path (or path itself), as sorted (relative name, full path) pairs"""
+    if os.path.isfile(path):
+        yield "", path
+        return
+    for dir_path, dir_names, file_names in os.walk(path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            full_path = os.path.join(dir_path, file_name)
+            yield os.path.relpath(full_path, path), full_path
+
+
+def _link(src, dst):
+    """Hardlink dst to src, falling back to a copy across filesystems"""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        # renaming onto another link of the same inode is a no-op, and would leave tmp_path behind
+        return
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    tmp_path = dst + ".cache_tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class StageCache:
+    """
+    Content-addressed cache of stage outputs.
+
+    A stage's key is the sha256 of its input files, its code files and its
+    params.yaml sections; its outputs are stored under <root>/entries/<key>/.
+    Files are hardlinked in both directions, so a hit costs no copy and an
+    entry costs no space beyond the workspace until the workspace moves on.
+    Entries are evicted least-recently-used once the cache exceeds its size
+    budget, and hit/miss counts per stage are kept in <root>/stats.json.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.root = root
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.entries_dir = os.path.join(root, "entries")
+        self.hash_index_path = os.path.join(root, "hash_index.json")
+        self._hash_index = None
+
+    # ------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------
+    def file_digest(self, path) -> str:
+        """sha256 of a file, memoized by (size, mtime) so unchanged inputs are not re-read"""
+        if self._hash_index is None:
+            self._hash_index = load_json(self.hash_index_path, {})
+
+        stat = os.stat(path)
+        abs_path = os.path.abspath(path)
+        cached = self._hash_index.get(abs_path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+                digest.update(chunk)
+        self._hash_index[abs_path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def stage_key(self, stage: str, deps: list, code: list, params: dict) -> str:
+        try:
+            digest = hashlib.sha256(stage.encode())
+            for kind, paths in (("dep", deps), ("code", code)):
+                for path in sorted(os.path.relpath(p) for p in paths):
+                    if not os.path.exists(path):
+                        digest.update(f"{kind}:{path}:missing".encode())
+                        continue
+                    for name, full_path in _iter_files(path):
+                        digest.update(f"{kind}:{path}/{name}:{self.file_digest(full_path)}".encode())
+            digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+
+            save_json(self._hash_index or {}, "", os.path.basename(self.hash_index_path), self.root)
+            return digest.hexdigest()
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # ------------------------------------------------------------
+    # Entries
+    # ------------------------------------------------------------
+    def _entry(self, key):
+        return os.path.join(self.entries_dir, key)
+
+    def restore(self, key, outs: list) -> bool:
+        """Materialize the outputs of an entry in the workspace; False when there is none"""
+        try:
+            meta_path = os.path.join(self._entry(key), "meta.json")
+            meta = load_json(meta_path)
+            if meta is None or meta.get("outs") != list(outs):
+                return False
+
+            for i, out in enumerate(outs):
+                stored = os.path.join(self._entry(key), f"out_{i}")
+                if not os.path.exists(stored):
+                    _remove(out)
+                    continue
+                if os.path.isfile(stored):
+                    if os.path.isdir(out):
+                        _remove(out)
+                    _link(stored, out)
+                    continue
+
+                # directories are mirrored exactly, files the entry does not have are dropped
+                if os.path.isfile(out):
+                    _remove(out)
+                wanted = {name for name, _ in _iter_files(stored)}
+                if os.path.isdir(out):
+                    for name, full_path in list(_iter_files(out)):
+                        if name not in wanted:
+                            os.remove(full_path)
+                for name, full_path in _iter_files(stored):
+                    _link(full_path, os.path.join(out, name))
+
+            # the meta file's mtime is the entry's last use, for LRU eviction
+            os.utime(meta_path)
+            return True
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def store(self, key, stage: str, outs: list) -> None:
+        try:
+            entry = self._entry(key)
+            _remove(entry)
+            size = 0
+            for i, out in enumerate(outs):
+                if not os.path.exists(out):
+                    continue
+                stored = os.path.join(entry, f"out_{i}")
+                for name, full_path in _iter_files(out):
+                    _link(full_path, os.path.join(stored, name) if name else stored)
+                    size += os.path.getsize(full_path)
+
+            save_json({"stage": stage, "outs": list(outs), "size": size, "created_at": time.time()},
+                      "", "meta.json", entry)
+            self.evict(keep=key)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def evict(self, keep=None) -> None:
+        """Drop least-recently-used entries until the cache fits its size budget"""
+        try:
+            if not os.path.isdir(self.entries_dir):
+                return
+            entries = []
+            for key in os.listdir(self.entries_dir):
+                meta_path = os.path.join(self._entry(key), "meta.json")
+                meta = load_json(meta_path)
+                if meta is None:
+                    _remove(self._entry(key))
+                    continue
+                entries.append((os.path.getmtime(meta_path), key, meta.get("size", 0)))
+
+            total = sum(size for _, _, size in entries)
+            for _, key, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                _remove(self._entry(key))
+                total -= size
+                logging.info(f"Stage cache evicted {key[:12]} ({size} bytes)")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # ------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------
+    def record(self, stage: str, hit: bool) -> dict:
+        stats = load_json(os.path.join(self.root, "stats.json"), {})
+        counts = stats.setdefault(stage, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+        save_json(stats, "", "stats.json", self.root)
+        return counts
+
+
+def detach(outs: list) -> None:
+    """
+    Give hardlinked output files a private copy before a stage rewrites them,
+    so writers that truncate in place cannot corrupt a cache entry.
+    """
+    for out in outs:
+        if not os.path.exists(out):
+            continue
+        for _, full_path in _iter_files(out):
+            if os.stat(full_path).st_nlink > 1:
+                tmp_path = full_path + ".cache_tmp"
+                shutil.copy2(full_path, tmp_path)
+                os.replace(tmp_path, full_path)
+
+
+def run_cached(stage: str, fn, deps: list, params: list, outs: list, code: list = None, enabled: bool = True):
+    """
+    Run a stage's main function through the stage cache.
+
+    deps, outs and the optional extra code are file or directory paths;
+    params are params.yaml sections. Every module under source/ the stage
+    has imported is part of its code. Configured by the stage_cache section
+    of params.yaml and switched off with STAGE_CACHE=0.
+    """
+    try:
+        config = load_params("stage_cache")
+        if not enabled or not config.get("enabled", True) or os.environ.get("STAGE_CACHE") == "0":
+            annotate(cache="disabled")
+            return fn()
+
+        cache = StageCache(config.get("dir", DEFAULT_CACHE_DIR), config.get("max_size_mb", DEFAULT_MAX_SIZE_MB))
+        code = sorted(set(project_modules()) | set(code or []))
+        key = cache.stage_key(stage, deps, code, {section: load_params(section) for section in params})
+
+        if cache.restore(key, outs):
+            annotate(cache="hit")
+            counts = cache.record(stage, hit=True)
+            logging.info(f"Stage cache hit for {stage} ({key[:12]}), outputs restored "
+                         f"[hits {counts['hits']}, misses {counts['misses']}]")
+            return None
+
+        annotate(cache="miss")
+        counts = cache.record(stage, hit=False)
+        logging.info(f"Stage cache miss for {stage} ({key[:12]}) [hits {counts['hits']}, misses {counts['misses']}]")
+
+        detach(outs)
+        result = fn()
+        cache.store(key, stage, outs)
+
+        return result
+
+    except Exception as e:
+        raise CustomException(e, sys)
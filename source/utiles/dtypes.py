@@ -0,0 +1,133 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from source.exceptions import CustomException
+from source.logger import logging
+from source.utiles.profiling import accumulate
+
+# ----------------------------------------------------------------
+# Dtype plan for the gold table
+# ----------------------------------------------------------------
+# Low-cardinality strings become categoricals, counts the narrowest integer
+# their domain fits, money and ratings float32, dates datetime64 parsed with
+# an explicit format. Columns not listed (ids) are left as they are.
+CATEGORY_COLUMNS = [
+    "payment_type", "shipping_region", "product_category", "product_subcategory", "brand",
+    "is_first_order", "device_type", "referral", "gender", "location", "preferred_payment",
+    "product_name", "return_reason", "order_dayofweek", "customer_age_group",
+]
+
+DTYPE_PLAN = {
+    **{col: "category" for col in CATEGORY_COLUMNS},
+    "quantity": "int8",
+    "expected_delivery_days": "int8",
+    "age": "int8",
+    "order_month": "int8",
+    "is_returned": "int8",
+    "is_expensive": "int8",
+    "loyalty_points": "int16",
+    "total_orders": "int16",
+    "total_returns": "int16",
+    "order_year": "int16",
+    "price": "float32",
+    "discount_percent": "float32",
+    "product_rating": "float32",
+    "avg_order_value": "float32",
+    "avg_rating": "float32",
+    "return_rate_category": "float32",
+    "discount": "float32",
+    "revenue": "float32",
+    "pickup_delay_days": "float32",
+    "order_date": "datetime64[ns]",
+    "delivery_date": "datetime64[ns]",
+    "join_date": "datetime64[ns]",
+    "return_date": "datetime64[ns]",
+}
+
+DATE_FORMATS = {
+    "order_date": "%Y-%m-%d",
+    "delivery_date": "%Y-%m-%d",
+    "join_date": "%Y-%m-%d",
+    "return_date": "%Y-%m-%d %H:%M:%S",
+}
+
+# float32 only where every value survives to this many decimals (cents)
+FLOAT_DECIMALS = 2
+
+
+def frame_bytes(data: pd.DataFrame) -> int:
+    return int(data.memory_usage(deep=True, index=True).sum())
+
+
+def _narrow_int(values: pd.Series, dtype: str) -> pd.Series:
+    if values.isna().any() or not pd.api.types.is_numeric_dtype(values):
+        return values
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        logging.warning(f"{values.name} does not fit {dtype}; kept as {values.dtype}")
+        return values
+    return values.astype(dtype)
+
+
+def _narrow_float(values: pd.Series) -> pd.Series:
+    if not pd.api.types.is_float_dtype(values) and not pd.api.types.is_integer_dtype(values):
+        return values
+    narrowed = values.astype("float32")
+    error = np.abs(narrowed.to_numpy(np.float64) - values.to_numpy(np.float64))
+    if np.nanmax(error, initial=0.0) >= 0.5 * 10 ** -FLOAT_DECIMALS:
+        logging.warning(f"{values.name} loses precision as float32; kept as {values.dtype}")
+        return values
+    return narrowed
+
+
+def _parse_dates(values: pd.Series, fmt: str) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if pd.api.types.is_string_dtype(values) or isinstance(values.dtype, pd.CategoricalDtype):
+        sample = values.dropna()
+        if len(sample) and isinstance(sample.iloc[0], str):
+            return pd.to_datetime(values.astype(object), format=fmt)
+    # datetime.date objects, e.g. from Arrow date32
+    return pd.to_datetime(values)
+
+
+def apply_dtype_plan(data: pd.DataFrame, plan: dict = None, record: bool = True) -> pd.DataFrame:
+    """
+    Cast the columns of `data` in place to their planned dtypes. Categoricals
+    (e.g. the preprocessed targets) are left as they are; a count that does
+    not fit its planned width, or a float that would lose cents, keeps its
+    dtype. With `record`, the frame's memory before and after is added to
+    the running stage's profile.
+    """
+    try:
+        plan = DTYPE_PLAN if plan is None else plan
+        before = frame_bytes(data) if record else 0
+
+        for col, dtype in plan.items():
+            if col not in data.columns:
+                continue
+            values = data[col]
+            if dtype.startswith("datetime64"):
+                data[col] = _parse_dates(values, DATE_FORMATS.get(col))
+            elif isinstance(values.dtype, pd.CategoricalDtype):
+                continue
+            elif dtype == "category":
+                data[col] = values.astype("category")
+            elif dtype.startswith("int"):
+                data[col] = _narrow_int(values, dtype)
+            elif dtype == "float32":
+                data[col] = _narrow_float(values)
+
+        if record:
+            record_dtype_plan(before, frame_bytes(data))
+        return data
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def record_dtype_plan(before: int, after: int) -> None:
+    """Add one frame's memory before / after the plan to the stage profile"""
+    accumulate(frame_mb_before_plan=round(before / 2**20, 2), frame_mb_after_plan=round(after / 2**20, 2))
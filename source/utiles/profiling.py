@@ -0,0 +1,177 @@
+import cProfile
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from source.exceptions import CustomException
+from source.logger import logging
+from source.utiles import load_params, save_json
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+PROFILE_DIR = "./results/profiling"
+
+# the profiler of the stage running in this process, for profile_step / annotate
+_active = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process or of any finished child (pool workers), in MB"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+def cpu_seconds():
+    """User + system CPU time of this process and its finished children"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _files(path):
+    if os.path.isfile(path):
+        yield path
+    elif os.path.isdir(path):
+        for dir_path, _, file_names in os.walk(path):
+            for file_name in file_names:
+                yield os.path.join(dir_path, file_name)
+
+
+def path_bytes(paths) -> int:
+    return sum(os.path.getsize(f) for path in paths for f in _files(path))
+
+
+def path_rows(paths) -> int:
+    """
+    Rows held in Parquet files and feature matrices (X_*.npz / X_*.npy /
+    transformed_*.npy) under paths, read from metadata and headers only.
+    """
+    rows = 0
+    for path in paths:
+        for f in _files(path):
+            name = os.path.basename(f)
+            if name.endswith(".parquet"):
+                rows += pq.ParquetFile(f).metadata.num_rows
+            elif name.startswith("X_") and name.endswith(".npz"):
+                with np.load(f) as npz:
+                    rows += int(npz["shape"][0])
+            elif (name.startswith("X_") or name.startswith("transformed_")) and name.endswith(".npy"):
+                rows += np.load(f, mmap_mode="r").shape[0]
+    return rows
+
+
+class StageProfiler:
+    """
+    Wall time, CPU time, peak RSS and rows / bytes in and out of a stage and
+    of its major steps, written to results/profiling/<stage>.json.
+
+    Used as a context manager around a stage's entry point; steps inside the
+    stage are timed with profile_step(). With profiling.cprofile set in
+    params.yaml (or PROFILE_CPROFILE=1) a cProfile dump of the whole stage is
+    written next to the JSON as <stage>.prof.
+    """
+
+    def __init__(self, stage: str, inputs=(), outputs=(), path=PROFILE_DIR, cprofile=None):
+        config = load_params("profiling")
+        self.stage = stage
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.path = config.get("dir", path)
+        if cprofile is None:
+            cprofile = config.get("cprofile", False) or os.environ.get("PROFILE_CPROFILE") == "1"
+        self.profile = cProfile.Profile() if cprofile else None
+        self.record = {"stage": stage, "steps": {}}
+
+    def __enter__(self):
+        global _active
+        _active = self
+        self.record["rows_in"] = path_rows(self.inputs)
+        self.record["bytes_in"] = path_bytes(self.inputs)
+        self._wall, self._cpu = time.perf_counter(), cpu_seconds()
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        if self.profile is not None:
+            self.profile.disable()
+        _active = None
+
+        try:
+            self.record.update({
+                "status": "failed" if exc_type else "ok",
+                "wall_s": round(time.perf_counter() - self._wall, 4),
+                "cpu_s": round(cpu_seconds() - self._cpu, 4),
+                "peak_rss_mb": peak_rss_mb(),
+                "rows_out": path_rows(self.outputs),
+                "bytes_out": path_bytes(self.outputs),
+            })
+            save_json(self.record, "", f"{self.stage}.json", self.path)
+            if self.profile is not None:
+                self.profile.dump_stats(os.path.join(self.path, f"{self.stage}.prof"))
+
+            logging.info(
+                f"Profile {self.stage}: {self.record['wall_s']}s wall, {self.record['cpu_s']}s CPU, "
+                f"peak RSS {self.record['peak_rss_mb']} MB"
+            )
+            if "frame_mb_before_plan" in self.record:
+                logging.info(
+                    f"Dtype plan {self.stage}: frames {self.record['frame_mb_before_plan']} MB before, "
+                    f"{self.record['frame_mb_after_plan']} MB after"
+                )
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+        return False
+
+    @contextmanager
+    def step(self, name: str, **counts):
+        step = dict(counts)
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield step
+        finally:
+            step.update({
+                "wall_s": round(time.perf_counter() - wall, 4),
+                "cpu_s": round(cpu_seconds() - cpu, 4),
+                "peak_rss_mb": peak_rss_mb(),
+            })
+            self.record["steps"][name] = step
+
+
+@contextmanager
+def profile_step(name: str, **counts):
+    """
+    Time a step of the running stage; the yielded dict takes extra counts
+    (rows_in, rows_out, ...). A no-op outside a StageProfiler.
+    """
+    if _active is None:
+        yield dict(counts)
+        return
+    with _active.step(name, **counts) as step:
+        yield step
+
+
+def annotate(**fields) -> None:
+    """Attach extra fields (e.g. the stage cache outcome) to the running stage's profile"""
+    if _active is not None:
+        _active.record.update(fields)
+
+
+def accumulate(**counts) -> None:
+    """Add to numeric fields of the running stage's profile (e.g. bytes over all chunks)"""
+    if _active is not None:
+        for name, value in counts.items():
+            _active.record[name] = round(_active.record.get(name, 0) + value, 4)
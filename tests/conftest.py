@@ -0,0 +1,59 @@
+import importlib
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLASK_APP_DIR = os.path.join(ROOT, "flask_app")
+DATA_ENGINEERING_DIR = os.path.join(ROOT, "Data_Engineering")
+
+# source/ is a package; the Flask app's and Data_Engineering's scripts import by bare name
+for path in (ROOT, FLASK_APP_DIR, DATA_ENGINEERING_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+GOLD_SAMPLE = os.path.join(ROOT, "data", "part-00000-1ac71545-82f8-44e5-a0d8-6a0299dccc3f.c000.snappy.parquet")
+
+
+@pytest.fixture(scope="session")
+def gold_sample():
+    """The tracked sample of the gold final_df table"""
+    return pd.read_parquet(GOLD_SAMPLE)
+
+
+@pytest.fixture(scope="session")
+def model_dir(tmp_path_factory, gold_sample):
+    """Artifacts of a small model trained the way the pipeline trains, plus its manifest"""
+    from source.data.data_preprocessing import preprocess_data
+    from source.data.data_transformation import transform_data_obj
+    from source.model.model_export import save_scoring_kernel
+    from source.model.model_training import train_model, save_model_manifest
+    from source.utiles import save_model
+
+    data = preprocess_data(gold_sample.head(4000).copy())
+    X, y = data.drop("is_returned", axis=1), data["is_returned"].astype(int)
+    preprocessor = transform_data_obj(X)
+    model = train_model(preprocessor.fit_transform(X), y)
+
+    path = str(tmp_path_factory.mktemp("models"))
+    save_model(model, "lr_model.pkl", path)
+    save_model(preprocessor, "preprocessor.pkl", path)
+    save_scoring_kernel(preprocessor, model, "scoring_kernel.json", path)
+    save_model_manifest(
+        {"model": "lr_model.pkl", "preprocessor": "preprocessor.pkl", "scoring_kernel": "scoring_kernel.json"},
+        int(preprocessor.transform(X.head(1)).shape[1]), path,
+    )
+    return path
+
+
+@pytest.fixture(scope="session")
+def app_module(model_dir, tmp_path_factory):
+    """flask_app/app.py imported against model_dir (it loads the pipeline at import time)"""
+    os.environ.update({
+        "MODEL_DIR": model_dir,
+        "FEATURE_INDEX_DIR": str(tmp_path_factory.mktemp("no_index") / "missing"),
+        "WARMUP_ROUNDS": "1",
+    })
+    return importlib.import_module("app")
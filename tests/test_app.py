@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+
+
+def metric_samples(app_module, name):
+    text = app_module.app.test_client().get("/metrics").data.decode()
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+
+def test_batch_json_roundtrip(app_module):
+    fixture = app_module.SELF_CHECK_FIXTURE
+    response = app_module.app.test_client().post("/predict/batch", json=[fixture, fixture])
+    assert response.status_code == 200
+    body = response.get_json()
+    single = app_module.app.test_client().post("/predict", json=fixture).get_json()
+    np.testing.assert_allclose(body["probabilities"], [single["probability"]] * 2, atol=1e-9)
+    assert body["predictions"] == [single["prediction"]] * 2
+
+
+def test_per_row_latency_has_its_own_histogram(app_module):
+    fixture = app_module.SELF_CHECK_FIXTURE
+    app_module.app.test_client().post("/predict/batch", data=json.dumps([fixture] * 3),
+                                      content_type="application/json")
+    assert metric_samples(app_module, "app_batch_row_latency_seconds_count")
+    assert not [s for s in metric_samples(app_module, "app_request_latency_seconds") if "batch:row" in s]
+
+
+def test_micro_batching_only_wraps_the_sklearn_paths(app_module, model_dir, monkeypatch):
+    from pipeline import ScoringPipeline
+
+    monkeypatch.setattr(app_module, "MICRO_BATCH_ENABLED", True)
+    kernel = ScoringPipeline.load(model_dir, backend="kernel")
+    assert kernel.scoring_path == "kernel"
+    assert app_module.make_batcher(kernel) is None
+
+    builder = ScoringPipeline.load(model_dir, backend="sklearn")
+    assert builder.scoring_path == "feature_builder"
+    batcher = app_module.make_batcher(builder)
+    try:
+        assert builder.score_one(app_module.SELF_CHECK_FIXTURE, batcher) == \
+            builder.score_one(app_module.SELF_CHECK_FIXTURE)
+        assert batcher._worker is not None
+    finally:
+        batcher.close()
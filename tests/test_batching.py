@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+from registry import ModelRegistry, ServingModel
+
+
+def slow_score(started=None, release=None):
+    def score(batch):
+        if started is not None:
+            started.set()
+            release.wait(5)
+        return np.full(len(batch), 0.25)
+    return score
+
+
+def test_batches_concurrent_requests():
+    batcher = MicroBatcher(slow_score(), max_batch_size=8, max_wait_ms=50)
+    futures = [batcher.submit(np.zeros((1, 3))) for _ in range(4)]
+    assert [f.result(timeout=5)[0] for f in futures] == [0.25] * 4
+    batcher.close()
+
+
+def test_submit_after_close_scores_inline():
+    started, release = threading.Event(), threading.Event()
+    batcher = MicroBatcher(slow_score(started, release), max_wait_ms=0)
+
+    busy = batcher.submit(np.zeros((1, 3)))
+    assert started.wait(5)
+    # closed while the worker is busy, then a request still holding it submits
+    batcher.close()
+    late = []
+    submitter = threading.Thread(target=lambda: late.append(batcher.submit(np.zeros((1, 3)))))
+    submitter.start()
+    release.set()
+    submitter.join(5)
+
+    assert late[0].result(timeout=5)[0] == 0.25
+    assert busy.result(timeout=5)[0] == 0.25
+    batcher._worker.join(5)
+    assert not batcher._worker.is_alive()
+
+
+def test_queued_requests_are_scored_before_stop():
+    started, release = threading.Event(), threading.Event()
+    batcher = MicroBatcher(slow_score(started, release), max_batch_size=1, max_wait_ms=0)
+
+    first = batcher.submit(np.zeros((1, 3)))
+    assert started.wait(5)
+    queued = [batcher.submit(np.zeros((1, 3))) for _ in range(3)]
+    batcher.close()
+    release.set()
+
+    for future in [first] + queued:
+        assert future.result(timeout=5)[0] == 0.25
+
+
+def test_predict_proba_times_out():
+    started, release = threading.Event(), threading.Event()
+    batcher = MicroBatcher(slow_score(started, release), max_wait_ms=0, timeout_s=0.05)
+    with pytest.raises(TimeoutError):
+        batcher.predict_proba(np.zeros((1, 3)))
+    release.set()
+
+
+class StubPipeline:
+    def __init__(self, version, probability):
+        self.version = version
+        self.probability = probability
+
+    def score_features(self, features):
+        return np.full(len(features), self.probability)
+
+    def score_one(self, payload, batcher=None):
+        if batcher is not None:
+            return float(batcher.predict_proba(np.zeros((1, 1)))[0])
+        return self.probability
+
+
+def serving(version, probability):
+    pipeline = StubPipeline(version, probability)
+    return ServingModel(pipeline, MicroBatcher(pipeline.score_features, max_wait_ms=1, timeout_s=5))
+
+
+def write_manifest(model_dir, version):
+    with open(model_dir / "model_manifest.json", "w") as f:
+        json.dump({"version": version}, f)
+
+
+def test_reload_swaps_without_dropping_requests(tmp_path):
+    write_manifest(tmp_path, "v1")
+    registry = ModelRegistry(str(tmp_path), load=lambda d: serving("v2", 0.75), warm=lambda p: None)
+    registry.activate(serving("v1", 0.25))
+
+    results, stop = [], threading.Event()
+
+    def client():
+        while not stop.is_set():
+            current = registry.current
+            results.append(current.pipeline.score_one({}, current.batcher))
+
+    threads = [threading.Thread(target=client) for _ in range(4)]
+    for t in threads:
+        t.start()
+
+    time.sleep(0.05)
+    write_manifest(tmp_path, "v2")
+    assert registry.poll() is None      # first sighting: wait for the write to settle
+    assert registry.poll() is not None  # unchanged since: load, warm and swap
+    time.sleep(0.05)
+    stop.set()
+    for t in threads:
+        t.join(5)
+
+    assert registry.current.version == "v2"
+    assert set(results) == {0.25, 0.75}
+
+
+def test_failed_reload_keeps_active_model(tmp_path):
+    write_manifest(tmp_path, "v1")
+
+    def broken(model_dir):
+        raise RuntimeError("bad artifact")
+
+    registry = ModelRegistry(str(tmp_path), load=broken, warm=lambda p: None)
+    registry.activate(serving("v1", 0.25))
+    write_manifest(tmp_path, "v2")
+    registry.poll()
+    registry.poll()
+    assert registry.current.version == "v1"
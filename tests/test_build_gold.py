@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from build_gold import GOLD_SCHEMA, build_gold, round_half_up
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data_Engineering", "data")
+
+
+@pytest.fixture(scope="module")
+def gold(tmp_path_factory):
+    output = str(tmp_path_factory.mktemp("gold") / "final_df")
+    # a chunk size that splits the orders unevenly, to cover regrouping
+    build_gold(SOURCE_DIR, output, chunk_size=7000)
+    return output
+
+
+def test_builds_the_tracked_gold_sample(gold, gold_sample):
+    sample = gold_sample
+    built = pq.read_table(gold).to_pandas()
+    assert len(built) == len(sample)
+    built = built.set_index("order_id").loc[sample["order_id"]].reset_index()
+    pd.testing.assert_frame_equal(built, sample)
+
+
+def test_parts_follow_the_gold_schema(gold):
+    parts = sorted(os.listdir(gold))
+    assert parts == ["part-00000.snappy.parquet", "part-00001.snappy.parquet", "part-00002.snappy.parquet"]
+    for part in parts:
+        assert pq.read_schema(os.path.join(gold, part)).remove_metadata().equals(GOLD_SCHEMA)
+
+
+def test_rebuild_replaces_old_parts(tmp_path):
+    output = str(tmp_path / "final_df")
+    build_gold(SOURCE_DIR, output, chunk_size=7000)
+    build_gold(SOURCE_DIR, output, chunk_size=50000)
+    assert os.listdir(output) == ["part-00000.snappy.parquet"]
+    assert pq.read_table(output).num_rows == 20000
+
+
+def test_round_half_up_rounds_decimal_halves_away_from_zero():
+    assert list(round_half_up(pa.array([0.125, 2.675, -1.005, 1.004]).to_numpy())) == [0.13, 2.68, -1.01, 1.0]
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_index import FeatureIndex, FeatureTable
+from source.data.feature_index import build_table_index
+
+
+@pytest.fixture
+def customers(tmp_path):
+    data = pd.DataFrame({
+        "customer_id": [2, 10, 1, 300],
+        "age": [31, 45, 22, 60],
+        "gender": ["F", "M", "F", "M"],
+        "avg_order_value": [12.5, 80.0, 33.25, 7.0],
+    })
+    build_table_index(data, "customer_id", str(tmp_path / "customers"))
+    return data, FeatureTable(str(tmp_path / "customers"))
+
+
+def test_numeric_ids_are_found(customers):
+    data, table = customers
+    for row in data.to_dict("records"):
+        found = table.lookup(row["customer_id"])
+        assert found == {"age": row["age"], "gender": row["gender"], "avg_order_value": row["avg_order_value"]}
+    assert table.lookup(3) is None
+    assert table.lookup(None) is None
+
+
+def test_lookup_many_matches_lookup(customers):
+    data, table = customers
+    queries = ["1", "10", "2", "300", "3", "1000", ""]
+    positions, found = table.lookup_many(queries)
+    assert found.tolist() == [True, True, True, True, False, False, False]
+    assert table.gather("gender", positions[found]).tolist() == ["F", "M", "F", "M"]
+
+
+def test_non_ascii_ids_compare_by_encoded_length(tmp_path):
+    build_table_index(pd.DataFrame({"product_id": ["é", "ab"], "brand": ["x", "y"]}),
+                      "product_id", str(tmp_path / "products"))
+    table = FeatureTable(str(tmp_path / "products"))
+    # "éé" is two characters but four bytes, wider than the two-byte keys
+    positions, found = table.lookup_many(["éé", "é", "ab", "abc"])
+    assert found.tolist() == [False, True, True, False]
+    assert table.lookup("é") == {"brand": "x"}
+
+
+def test_mixed_ids_sort_in_byte_order(tmp_path):
+    ids = ["B-7", 5, "a", 40]
+    build_table_index(pd.DataFrame({"product_id": ids, "rank": range(4)}), "product_id", str(tmp_path / "p"))
+    table = FeatureTable(str(tmp_path / "p"))
+    assert list(table.keys) == sorted(table.keys)
+    assert [table.lookup(i)["rank"] for i in ids] == [0, 1, 2, 3]
+
+
+def test_duplicate_ids_are_rejected(tmp_path):
+    with pytest.raises(Exception, match="Duplicate"):
+        build_table_index(pd.DataFrame({"customer_id": [1, "1"], "age": [1, 2]}), "customer_id", str(tmp_path))
+
+
+def test_enrich_fills_missing_fields_only(customers, tmp_path):
+    index = FeatureIndex.load(str(tmp_path))
+    enriched = index.enrich({"customer_id": "10", "age": 99})
+    assert enriched == {"customer_id": "10", "age": 99, "gender": "M", "avg_order_value": 80.0}
+
+    frame = index.enrich_frame(pd.DataFrame({"customer_id": ["1", "404"], "age": [np.nan, 50.0]}))
+    assert frame["age"].tolist() == [22.0, 50.0]
+    assert frame["gender"].tolist()[0] == "F" and pd.isna(frame["gender"].tolist()[1])
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "csv"])
+def test_index_builds_from_generated_sources(tmp_path, fmt):
+    from data_generation import generate
+    from source.data.feature_index import build_feature_index, load_sources, source_path
+
+    generate(str(tmp_path / "data"), scale=0.001, chunk_size=500, fmt=fmt)
+    assert source_path(str(tmp_path / "data"), "customers").endswith("customers" if fmt == "parquet" else ".csv")
+
+    summary = build_feature_index(load_sources({"source": str(tmp_path / "data")}), str(tmp_path / "index"))
+    index = FeatureIndex.load(str(tmp_path / "index"))
+    customers = pd.read_parquet(tmp_path / "data" / "customers") if fmt == "parquet" \
+        else pd.read_csv(tmp_path / "data" / "customers.csv")
+
+    assert summary["customers"]["n_rows"] == len(customers)
+    first = customers.iloc[0]
+    found = index.tables["customer_id"].lookup(first["customer_id"])
+    assert found["age"] == first["age"] and found["gender"] == first["gender"]
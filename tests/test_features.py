@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from pipeline import ScoringPipeline
+from source.data.data_preprocessing import preprocess_data
+
+
+@pytest.fixture(scope="module")
+def order(gold_sample):
+    data = preprocess_data(gold_sample.iloc[4000:4001].copy()).drop("is_returned", axis=1)
+    return {k: (v.item() if hasattr(v, "item") else v) for k, v in data.iloc[0].to_dict().items()}
+
+
+@pytest.fixture(scope="module")
+def pipelines(model_dir):
+    builder = ScoringPipeline.load(model_dir, backend="sklearn")
+    assert builder.feature_builder is not None
+    return builder, ScoringPipeline.load(model_dir, backend="kernel")
+
+
+def payloads(order):
+    """The order with one field at a time left empty, missing, unseen or differently typed"""
+    yield "as is", order
+    for col in ("brand", "payment_type", "order_month", "customer_age_group"):
+        for value in ("", None, np.nan, "Unseen"):
+            yield f"{col}={value!r}", {**order, col: value}
+    # JSON booleans and numbers against string ("True"/"False") and integer categories
+    for col, values in (("is_first_order", (True, False, "True", 1)),
+                        ("is_expensive", (True, False, 1, "1", 1.0, "0")),
+                        ("order_month", (5, "5", 5.0, "5.0", True)),
+                        ("order_year", (2024, "2024", 2024.0))):
+        for value in values:
+            yield f"{col}={value!r}", {**order, col: value}
+    for col in ("price", "age"):
+        for value in (None, np.nan):
+            yield f"{col}={value!r}", {**order, col: value}
+
+
+def test_builder_matches_the_preprocessor(pipelines, order):
+    pipeline, _ = pipelines
+    for case, payload in payloads(order):
+        expected = pipeline.preprocessor.transform(pipeline.prepare_input(payload))
+        expected = expected.toarray() if hasattr(expected, "toarray") else expected
+        np.testing.assert_array_equal(pipeline.feature_builder.build(payload), expected, err_msg=case)
+
+
+def test_every_path_scores_every_field_alike(pipelines, order):
+    pipeline, kernel = pipelines
+    for case, payload in payloads(order):
+        expected = float(pipeline.score_frame(pipeline.prepare_input(payload))[0])
+        assert pipeline.score_one(payload) == pytest.approx(expected, abs=1e-12), case
+        assert kernel.score_one(payload) == pytest.approx(expected, abs=1e-9), case
+        assert kernel.score_frame(kernel.prepare_input(payload))[0] == pytest.approx(expected, abs=1e-9), case
+
+
+def test_empty_category_is_unknown_not_missing(pipelines, order):
+    pipeline, _ = pipelines
+    empty, unseen, missing = (pipeline.score_one({**order, "brand": value}) for value in ("", "Unseen", None))
+    assert empty == unseen
+    assert empty != missing
+
+
+def test_none_in_a_frame_is_imputed(pipelines, order):
+    pipeline, kernel = pipelines
+    frame = pipeline.prepare_input({**order, "brand": "Unseen"})
+    frame["brand"] = frame["brand"].astype(object)
+    frame.loc[0, "brand"] = None
+    expected = pipeline.score_one({**order, "brand": None})
+    assert pipeline.score_frame(frame)[0] == pytest.approx(expected, abs=1e-12)
+    assert kernel.score_frame(frame)[0] == pytest.approx(expected, abs=1e-9)
+    assert frame.loc[0, "brand"] is None
@@ -0,0 +1,82 @@
+import os
+
+import pyarrow.parquet as pq
+import pytest
+
+from source.data.blob_storage import LocalContainerClient, download_blobs, list_parquet_blobs
+from source.data.data_ingestion import ingest_incremental, stream_ingest
+
+# Spark writes every daily partition with the same part file name
+PART_NAME = "part-00000-1ac71545-82f8-44e5-a0d8-6a0299dccc3f.c000.snappy.parquet"
+DATES = {"2026-01-01": (0, 100), "2026-01-02": (100, 250)}
+
+
+@pytest.fixture
+def container(tmp_path, gold_sample):
+    """A local gold container holding final_df/date=<day>/<PART_NAME> partitions"""
+    root = tmp_path / "blobs"
+    for date, (start, stop) in DATES.items():
+        folder = root / "gold" / "final_df" / f"date={date}"
+        folder.mkdir(parents=True)
+        gold_sample.iloc[start:stop].to_parquet(folder / PART_NAME, index=False)
+    return LocalContainerClient(str(root / "gold"))
+
+
+def test_blobs_under_different_prefixes_keep_their_own_files(container, tmp_path):
+    names = [blob.name for blob in list_parquet_blobs(container, "final_df/")]
+    paths = download_blobs(container, names, str(tmp_path / "download"))
+
+    assert len(set(paths)) == 2
+    assert [pq.ParquetFile(path).metadata.num_rows for path in paths] == [100, 150]
+    assert paths[0] == os.path.join(str(tmp_path / "download"), "final_df", "date=2026-01-01", PART_NAME)
+    assert not [name for _, _, files in os.walk(tmp_path / "download") for name in files if name.endswith(".part")]
+
+
+def test_stream_ingest_reads_every_partition_once(container, tmp_path, gold_sample):
+    out_path = str(tmp_path / "raw" / "raw_data.parquet")
+    n_rows = stream_ingest(container, "final_df/", out_path, {"download_dir": str(tmp_path / "download")})
+
+    assert n_rows == 250
+    assert sorted(pq.read_table(out_path).column("order_id").to_pylist()) == \
+        sorted(gold_sample["order_id"].iloc[:250])
+
+
+@pytest.mark.parametrize("name", ["../escape/part-00000.parquet", "final_df/./part-00000.parquet"])
+def test_blob_names_cannot_leave_the_download_dir(container, tmp_path, name):
+    with pytest.raises(Exception, match="cannot be stored"):
+        download_blobs(container, [name], str(tmp_path / "download"))
+
+
+def test_duplicate_blob_names_are_rejected(container, tmp_path):
+    name = f"final_df/date=2026-01-01/{PART_NAME}"
+    with pytest.raises(Exception, match="Duplicate blob names"):
+        download_blobs(container, [name, name], str(tmp_path / "download"))
+
+
+def raw_rows(raw_dir):
+    return {side: sum(pq.ParquetFile(os.path.join(raw_dir, side, name)).metadata.num_rows
+                      for name in os.listdir(os.path.join(raw_dir, side)))
+            for side in ("train", "test")}
+
+
+def test_incremental_partitions_are_named_after_the_full_blob_path(container, tmp_path):
+    raw_dir = str(tmp_path / "raw")
+    manifest = ingest_incremental(container, "final_df/", raw_dir, {}, 0.2)
+
+    partitions = [entry["partition"] for entry in manifest["blobs"].values()]
+    assert partitions == [f"final_df__date={date}__{PART_NAME}" for date in DATES]
+    assert sum(raw_rows(raw_dir).values()) == 250
+    assert pq.read_table(os.path.join(raw_dir, "train")).num_rows == raw_rows(raw_dir)["train"]
+
+
+def test_removing_one_dated_blob_keeps_the_other_partition(container, tmp_path):
+    raw_dir = str(tmp_path / "raw")
+    ingest_incremental(container, "final_df/", raw_dir, {}, 0.2)
+    os.remove(os.path.join(container.root, "final_df", "date=2026-01-01", PART_NAME))
+
+    manifest = ingest_incremental(container, "final_df/", raw_dir, {}, 0.2)
+
+    assert list(manifest["blobs"]) == [f"final_df/date=2026-01-02/{PART_NAME}"]
+    assert sum(raw_rows(raw_dir).values()) == 150
+    assert not os.path.exists(os.path.join(raw_dir, "partitions", "final_df", "date=2026-01-01", PART_NAME))
+    assert os.path.exists(os.path.join(raw_dir, "partitions", "final_df", "date=2026-01-02", PART_NAME))
@@ -0,0 +1,69 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from pipeline import ScoringPipeline
+from source.data.data_preprocessing import preprocess_data
+
+
+@pytest.fixture(scope="module")
+def orders(gold_sample):
+    data = preprocess_data(gold_sample.iloc[4000:4500].copy())
+    return data.drop("is_returned", axis=1).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def pipelines(model_dir):
+    return ScoringPipeline.load(model_dir, backend="kernel"), ScoringPipeline.load(model_dir, backend="sklearn")
+
+
+def test_kernel_matches_sklearn_on_frames(pipelines, orders):
+    kernel, reference = pipelines
+    np.testing.assert_allclose(kernel.score_frame(orders.copy()), reference.score_frame(orders.copy()), atol=1e-9)
+
+
+def test_kernel_matches_sklearn_on_single_rows(pipelines, orders):
+    kernel, reference = pipelines
+    for record in orders.head(50).astype(object).where(orders.head(50).notna(), None).to_dict("records"):
+        assert kernel.score_one(record) == pytest.approx(reference.score_one(record), abs=1e-9)
+
+
+@pytest.mark.parametrize("price", ["1e12", "-1e12", 1e300])
+def test_extreme_inputs_saturate_like_sklearn(pipelines, orders, price):
+    kernel, reference = pipelines
+    record = orders.head(1).astype(object).to_dict("records")[0]
+    record["price"] = price
+    assert kernel.score_one(record) == pytest.approx(reference.score_one(record), abs=1e-12)
+
+    frame = orders.head(3).copy()
+    frame["price"] = float(price)
+    np.testing.assert_allclose(kernel.score_frame(frame.copy()), reference.score_frame(frame.copy()), atol=1e-12)
+
+
+def test_kernel_scores_categorical_columns(pipelines, orders):
+    kernel, _ = pipelines
+    categorical = orders.copy()
+    for col in categorical.select_dtypes(include=["object"]).columns:
+        categorical[col] = categorical[col].astype("category")
+    np.testing.assert_allclose(kernel.score_frame(categorical), kernel.score_frame(orders.copy()), atol=1e-12)
+
+
+def test_batch_endpoint_accepts_dictionary_encoded_arrow(app_module, orders):
+    assert app_module.model_registry.current.pipeline.kernel is not None
+    table = pa.Table.from_pandas(orders.head(20), preserve_index=False)
+    encoded = pa.table({
+        name: table.column(name).dictionary_encode() if pa.types.is_string(table.column(name).type)
+        else table.column(name)
+        for name in table.column_names
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, encoded.schema) as writer:
+        writer.write_table(encoded)
+
+    response = app_module.app.test_client().post(
+        "/predict/batch", data=sink.getvalue().to_pybytes(), content_type=app_module.ARROW_STREAM_MIMETYPE
+    )
+    assert response.status_code == 200
+    probabilities = pa.ipc.open_stream(response.data).read_all().column("probability").to_numpy()
+    expected = app_module.model_registry.current.pipeline.score_frame(orders.head(20).copy())
+    np.testing.assert_allclose(probabilities, expected, atol=1e-9)
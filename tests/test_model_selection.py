@@ -0,0 +1,47 @@
+import numpy as np
+
+from source.model import model_selection
+from source.model.model_selection import evaluate_fold, subset_indices
+from sklearn.model_selection import StratifiedKFold
+
+
+class RecordingEstimator:
+    """Records which rows (identified by column 0) each fit call sees"""
+
+    n_estimators = 10
+    best_iteration_ = 3
+
+    def __init__(self):
+        self.fit_rows = self.eval_rows = None
+
+    def fit(self, X, y, callbacks=None, eval_X=None, eval_y=None):
+        self.fit_rows = set(X[:, 0].astype(int))
+        self.eval_rows = set(eval_X[0][:, 0].astype(int))
+        return self
+
+    def predict_proba(self, X):
+        p = (X[:, 0] % 7) / 7
+        return np.column_stack([1 - p, p])
+
+
+def test_early_stopping_never_sees_the_validation_fold(monkeypatch):
+    n = 600
+    X = np.column_stack([np.arange(n), np.random.default_rng(0).normal(size=n)])
+    y = np.arange(n) % 2
+    monkeypatch.setattr(model_selection, "_worker_data", (X, y))
+    estimator = RecordingEstimator()
+    monkeypatch.setattr(model_selection, "build_estimator", lambda name, params, seed: estimator)
+
+    task = {"name": "lightgbm", "params": {}, "n_rows": 450, "fold": 1, "n_folds": 3, "seed": 42,
+            "metric": "roc_auc", "early_stopping_rounds": 5, "early_stopping_fraction": 0.2}
+    result = evaluate_fold(task)
+
+    idx = subset_indices(n, 450, 42)
+    train, valid = list(StratifiedKFold(3, shuffle=True, random_state=42).split(idx, y[idx]))[1]
+    train, valid = set(idx[train]), set(idx[valid])
+
+    assert estimator.fit_rows | estimator.eval_rows == train
+    assert not estimator.fit_rows & estimator.eval_rows
+    assert not (estimator.fit_rows | estimator.eval_rows) & valid
+    assert len(estimator.eval_rows) == 60
+    assert result["best_iteration"] == 3
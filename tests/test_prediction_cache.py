@@ -0,0 +1,149 @@
+import cache as cache_module
+import pytest
+from cache import LRUCache, PredictionCache, SharedCache, feature_key, start_cache_server
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_entry_expires_after_ttl(clock):
+    store = LRUCache(max_entries=10, ttl_s=5.0)
+    store.set("a", 0.25)
+    clock.now += 4.9
+    assert store.get("a") == 0.25
+    clock.now += 0.1
+    assert store.get("a") is None
+    assert store.size() == 0
+
+
+def test_rewrite_restarts_ttl(clock):
+    store = LRUCache(max_entries=10, ttl_s=5.0)
+    store.set("a", 0.25)
+    clock.now += 4.0
+    store.set("a", 0.5)
+    clock.now += 4.0
+    assert store.get("a") == 0.5
+
+
+def test_evicts_least_recently_used_entry():
+    store = LRUCache(max_entries=2, ttl_s=60.0)
+    store.set("a", 0.1)
+    store.set("b", 0.2)
+    assert store.get("a") == 0.1  # "b" is now the oldest
+    store.set("c", 0.3)
+    assert store.get("b") is None
+    assert store.get("a") == 0.1
+    assert store.get("c") == 0.3
+    assert store.size() == 2
+
+
+def test_evicts_to_stay_under_max_bytes():
+    store = LRUCache(max_entries=100, ttl_s=60.0)
+    store.set("a", 0.1)
+    entry_bytes = store._bytes
+    store = LRUCache(max_entries=100, max_bytes=3 * entry_bytes, ttl_s=60.0)
+    for i, key in enumerate("abcde"):
+        store.set(key, i / 10)
+    assert store.size() == 3
+    assert store._bytes <= 3 * entry_bytes
+    assert [store.get(key) for key in "abcde"] == [None, None, 0.2, 0.3, 0.4]
+
+
+def test_clear_resets_bytes():
+    store = LRUCache(max_entries=10, max_bytes=10000, ttl_s=60.0)
+    store.set("a", 0.1)
+    store.clear()
+    assert store.size() == 0
+    assert store._bytes == 0
+
+
+def test_key_ignores_order_unused_fields_and_number_spelling():
+    columns = ["price", "quantity", "category"]
+    key = feature_key({"price": 42, "quantity": 1, "category": "Books"}, columns, "v1")
+    assert feature_key({"category": "Books", "quantity": "1", "price": "42.0", "note": "retry"},
+                       columns, "v1") == key
+    assert feature_key({"price": 43, "quantity": 1, "category": "Books"}, columns, "v1") != key
+    assert feature_key({"price": 42, "quantity": 1, "category": "Books"}, columns, "v2") != key
+
+
+class BrokenBackend:
+    shared = False
+
+    def get(self, key):
+        raise ConnectionError("down")
+
+    def set(self, key, value):
+        raise ConnectionError("down")
+
+    def clear(self):
+        raise ConnectionError("down")
+
+    def size(self):
+        raise ConnectionError("down")
+
+
+class Counter:
+    def __init__(self):
+        self.counts = {}
+
+    def labels(self, result):
+        self._result = result
+        return self
+
+    def inc(self):
+        self.counts[self._result] = self.counts.get(self._result, 0) + 1
+
+
+def test_backend_errors_are_misses():
+    lookups = Counter()
+    cache = PredictionCache(BrokenBackend(), {"lookups": lookups})
+    cache.put("a", 0.5)
+    assert cache.get("a") is None
+    cache.model_swapped()
+    assert cache.size() == 0
+    assert lookups.counts == {"error": 1}
+
+
+def test_model_swap_clears_only_a_local_store():
+    local = PredictionCache(LRUCache(max_entries=10, ttl_s=60.0))
+    local.put("a", 0.5)
+    local.model_swapped()
+    assert local.get("a") is None
+
+    class Shared(LRUCache):
+        shared = True
+
+    shared = PredictionCache(Shared(max_entries=10, ttl_s=60.0))
+    shared.put("a", 0.5)
+    shared.model_swapped()
+    assert shared.get("a") == 0.5
+
+
+def test_shared_store_is_seen_by_every_client(tmp_path):
+    address = str(tmp_path / "cache.sock")
+    manager = start_cache_server(address, b"test", max_entries=2, ttl_s=60.0)
+    try:
+        first, second = SharedCache(address, b"test"), SharedCache(address, b"test")
+        first.set("a", 0.1)
+        assert second.get("a") == 0.1
+        second.set("b", 0.2)
+        second.set("c", 0.3)
+        assert first.get("a") is None
+        assert first.size() == 2
+    finally:
+        manager.shutdown()
+
+    cache = PredictionCache(first)
+    assert cache.get("b") is None  # server gone: scored as a miss
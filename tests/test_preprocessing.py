@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+import pytest
+
+from source.data import data_preprocessing
+from source.data.data_preprocessing import preprocess_partitions
+
+
+@pytest.fixture
+def raw(tmp_path, gold_sample):
+    src = tmp_path / "raw"
+    src.mkdir()
+    for i in range(3):
+        gold_sample.iloc[i * 100:(i + 1) * 100].to_parquet(src / f"part-{i}.parquet", index=False)
+    return str(src), str(tmp_path / "preprocessed")
+
+
+def mtimes(dst):
+    return {f: os.stat(os.path.join(dst, f)).st_mtime_ns for f in sorted(os.listdir(dst))}
+
+
+def test_only_changed_partitions_are_reprocessed(raw, gold_sample):
+    src, dst = raw
+    processed = preprocess_partitions(src, dst, {})
+    first = mtimes(dst)
+
+    gold_sample.iloc[500:650].to_parquet(os.path.join(src, "part-1.parquet"), index=False)
+    os.remove(os.path.join(src, "part-2.parquet"))
+    processed = preprocess_partitions(src, dst, processed)
+    second = mtimes(dst)
+
+    assert sorted(processed) == ["part-0.parquet", "part-1.parquet"]
+    assert set(second) == {"part-0.parquet", "part-1.parquet"}
+    assert second["part-0.parquet"] == first["part-0.parquet"]
+    assert second["part-1.parquet"] != first["part-1.parquet"]
+    assert len(pd.read_parquet(os.path.join(dst, "part-1.parquet"))) == 150
+
+
+def test_force_reprocesses_unchanged_partitions(raw):
+    src, dst = raw
+    processed = preprocess_partitions(src, dst, {})
+    first = mtimes(dst)
+    preprocess_partitions(src, dst, processed, force=True)
+    assert all(mtimes(dst)[f] != first[f] for f in first)
+
+
+def test_code_change_invalidates_the_manifest(tmp_path, monkeypatch, gold_sample):
+    monkeypatch.chdir(tmp_path)
+    for split in ("train", "test"):
+        os.makedirs(f"data/raw/{split}")
+        gold_sample.head(50).to_parquet(f"data/raw/{split}/part-0.parquet", index=False)
+
+    calls = []
+    real = data_preprocessing.preprocess_partition
+    monkeypatch.setattr(data_preprocessing, "preprocess_partition", lambda *a: calls.append(a) or real(*a))
+
+    data_preprocessing.main()
+    data_preprocessing.main()
+    assert len(calls) == 2  # second run skipped both unchanged partitions
+
+    monkeypatch.setattr(data_preprocessing, "code_fingerprint", lambda code, params: "edited")
+    data_preprocessing.main()
+    assert len(calls) == 4
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from source.data.data_ingestion import hash_split_mask
+
+
+@pytest.fixture
+def rows():
+    n = 20000
+    return pd.Series([f"ORD{i:06d}" for i in range(n)]), pd.Series(np.arange(n) % 5 == 0).astype(int)
+
+
+def test_split_is_deterministic_and_stratified(rows):
+    keys, labels = rows
+    mask = hash_split_mask(keys, labels, 0.2)
+    assert np.array_equal(mask, hash_split_mask(keys, labels, 0.2))
+    for label in (0, 1):
+        assert abs(mask[labels.to_numpy() == label].mean() - 0.2) < 0.02
+
+
+def test_rows_keep_their_side_when_data_is_appended(rows):
+    keys, labels = rows
+    head = hash_split_mask(keys[:5000], labels[:5000], 0.3)
+    assert np.array_equal(head, hash_split_mask(keys, labels, 0.3)[:5000])
+
+
+def test_extreme_fractions_do_not_overflow(rows):
+    keys, labels = rows
+    assert hash_split_mask(keys, labels, 1 - 1e-16).all()
+    assert hash_split_mask(keys, labels, 1e-12).sum() == 0
+
+
+@pytest.mark.parametrize("test_size", [0, 1.0, -0.1, 1.5])
+def test_out_of_range_fractions_are_rejected(rows, test_size):
+    keys, labels = rows
+    with pytest.raises(ValueError, match="test_size"):
+        hash_split_mask(keys, labels, test_size)
@@ -0,0 +1,65 @@
+import sys
+import types
+
+import pytest
+
+from source.utiles import cache as stage_cache
+from source.utiles.cache import project_modules, run_cached
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A stage workspace with one input, one project module and a counting stage"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("STAGE_CACHE", raising=False)
+
+    source_root = tmp_path / "source"
+    source_root.mkdir()
+    module_path = source_root / "helpers.py"
+    module_path.write_text("SCALE = 1\n")
+    monkeypatch.setattr(stage_cache, "SOURCE_ROOT", str(source_root))
+    monkeypatch.setitem(sys.modules, "test_stage_cache_helpers",
+                        types.SimpleNamespace(__file__=str(module_path)))
+
+    (tmp_path / "input.txt").write_text("rows\n")
+    runs = []
+
+    def stage():
+        runs.append(1)
+        (tmp_path / "out").mkdir(exist_ok=True)
+        (tmp_path / "out" / "result.txt").write_text(f"run {len(runs)}\n")
+
+    def run():
+        run_cached("stage", stage, deps=["input.txt"], params=[], outs=["out"])
+        return len(runs), (tmp_path / "out" / "result.txt").read_text()
+
+    return types.SimpleNamespace(run=run, module=module_path, input=tmp_path / "input.txt")
+
+
+def test_unchanged_stage_is_restored(workspace):
+    assert workspace.run() == (1, "run 1\n")
+    assert workspace.run() == (1, "run 1\n")
+
+
+def test_input_change_misses(workspace):
+    workspace.run()
+    workspace.input.write_text("more rows\n")
+    assert workspace.run() == (2, "run 2\n")
+
+
+def test_imported_module_change_misses(workspace):
+    workspace.run()
+    workspace.module.write_text("SCALE = 2\n")
+    assert workspace.run() == (2, "run 2\n")
+    # reverting restores the first entry without running the stage
+    workspace.module.write_text("SCALE = 1\n")
+    assert workspace.run() == (2, "run 1\n")
+
+
+def test_stage_modules_are_derived_from_imports():
+    import source.data.data_preprocessing  # noqa: F401
+    import source.data.data_transformation  # noqa: F401
+
+    modules = project_modules()
+    for path in ("source/utiles/dtypes.py", "source/data/blob_storage.py", "source/utiles/__init__.py"):
+        assert any(m.endswith(path) for m in modules)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from source.data.data_transformation import write_transformed
+from source.utiles import load_transformed_data
+
+
+def chunks(n_rows, n_features, value):
+    X = np.full((n_rows, n_features), value)
+    return [(X[: n_rows // 2], np.zeros(n_rows // 2)), (X[n_rows // 2:], np.ones(n_rows - n_rows // 2))]
+
+
+@pytest.mark.parametrize("first, second", [(True, False), (False, True)])
+def test_switching_layout_replaces_the_old_files(tmp_path, first, second):
+    write_transformed(chunks(10, 3, 1.0), "train", 10, 3, sparse_output=first, path=str(tmp_path))
+    write_transformed(chunks(6, 3, 2.0), "train", 6, 3, sparse_output=second, path=str(tmp_path))
+
+    X, y = load_transformed_data("train", str(tmp_path), mmap_mode="r")
+    assert sp.issparse(X) == second
+    assert X.shape == (6, 3) and y.shape == (6,)
+    assert np.all((X.toarray() if second else X) == 2.0)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["X_train.npz" if second else "X_train.npy", "y_train.npy"]
+    )
+
+
+def test_misaligned_labels_are_rejected(tmp_path):
+    write_transformed(chunks(10, 3, 1.0), "test", 10, 3, sparse_output=True, path=str(tmp_path))
+    np.save(tmp_path / "y_test.npy", np.zeros(4))
+    with pytest.raises(Exception, match="10 rows but its labels 4"):
+        load_transformed_data("test", str(tmp_path))